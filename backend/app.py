@@ -5,14 +5,25 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__))))
 
 from functools import wraps
 
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, Response, request, jsonify, render_template, stream_with_context
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager, jwt_required, get_jwt_identity
 import json
+import time
+import threading
 from datetime import datetime
 
 from backend.utils.scheduled import start_scheduler
+from backend.utils.schema_upgrades import prepare_database, apply_schema_upgrades
+from backend.utils.sql_profiler import install_sql_profiler
+from backend.utils.report_jobs import ReportJobExecutor, report_events, report_single_flight, FINISHED_STAGES
+from backend.utils.report_checkpoints import has_checkpoints
 from backend.utils.config import Config
+from backend.utils.thread_budget import apply_thread_budget, inference_pool
+
+# must run before the services below import torch/transformers
+apply_thread_budget()
+
 from models import db, User
 from backend.wrappers.llm_wrapper import chat
 
@@ -114,13 +125,16 @@ def create_app():
     jwt = JWTManager(app)
     CORS(app)
     
-    start_scheduler(db)
-    
     # Create tables
     with app.app_context():
+        prepare_database(db)
         db.create_all()
+        apply_schema_upgrades(db)
+    
+    start_scheduler(db, app)
         
     register_security_hooks(app)
+    install_sql_profiler(app)
     
     return app
 
@@ -142,6 +156,7 @@ analytics_engine = AdminService(db)
 rag_engine = RagEngine()
 
 report_service = ReportService(db)
+report_jobs = ReportJobExecutor(app)
 assistant_service = AssistantService(db)
 
 def admin_required(f):
@@ -232,13 +247,57 @@ def search():
         query = data.get('query', '').strip()
         is_general_search = data.get('general_search', True)
         is_facebook_search = data.get('facebook_search', False)
+        force_refresh = bool(data.get('force_refresh', False))
+        
+        # Same query and sources as a recent completed report of this user: answer from it (no scraping)
+        if not force_refresh:
+            cached_report_id = report_service.use_cached_report(current_user_email, query, is_general_search, is_facebook_search)
+            if cached_report_id:
+                return jsonify({'success': True, 'report_id': cached_report_id, 'status': 'completed', 'cached': True}), 200
         
         # Get Facebook cookies if available
         fb_cookies = fb_auth_service.get_cookies(current_user_email)
         
-        # Create report using service
-        report = report_service.create_report(current_user_email, query, fb_cookies, use_facebook=is_facebook_search, use_general=is_general_search)
-        return jsonify({'success': True, 'report': report}), 200
+        # Create the report row now, generate it in the background.
+        # Identical requests (double-click, retry) attach to the report already being generated.
+        if Config.REPORT_QUEUE_BACKEND == 'database':
+            # generated on worker nodes, which never settle this process's flights: match the job rows
+            # instead (any API process), the flight below only covers creating the job
+            active_report_id = report_service.job_queue.active_report(
+                current_user_email, query, is_general_search, is_facebook_search
+            )
+            if active_report_id:
+                return jsonify({'success': True, 'report_id': active_report_id, 'status': 'processing', 'attached': True}), 202
+        
+        flight_key = report_single_flight.key(current_user_email, query, is_general_search, is_facebook_search)
+        report_id, started = report_single_flight.join(
+            flight_key,
+            lambda: report_service.start_report(current_user_email, query, is_general_search, is_facebook_search),
+            reuse_finished=not force_refresh
+        )
+        if not started:
+            return jsonify({'success': True, 'report_id': report_id, 'status': 'processing', 'attached': True}), 202
+        
+        is_admin = bool(db.session.query(User.is_admin).filter_by(email=current_user_email).scalar())
+        try:
+            if Config.REPORT_QUEUE_BACKEND == 'database':
+                # durable queue, generated by a report worker node (python -m backend.report_worker)
+                report_service.job_queue.enqueue(
+                    report_id, current_user_email,
+                    use_general=is_general_search, use_facebook=is_facebook_search, admin=is_admin
+                )
+                report_single_flight.forget(report_id)
+            else:
+                report_jobs.submit(
+                    report_id, current_user_email, report_service.run_report, report_id, query, fb_cookies,
+                    use_facebook=is_facebook_search, use_general=is_general_search, admin=is_admin
+                )
+        except RuntimeError as e:
+            report_service.mark_failed(report_id)
+            report_single_flight.finished(report_id, failed=True)
+            return jsonify({'success': False, 'message': str(e)}), 503
+        
+        return jsonify({'success': True, 'report_id': report_id, 'status': 'processing'}), 202
         
     except ValueError as e:
         return jsonify({'success': False, 'message': str(e)}), 400
@@ -263,6 +322,178 @@ def get_report(report_id):
         return jsonify({'success': False, 'message': 'Failed to retrieve report.'}), 500
 
 
+@app.route('/api/report/<report_id>/retry', methods=['POST'])
+@jwt_required()
+@active_required
+def retry_report(report_id):
+    """Generates a failed report again, resuming from its last checkpointed stage"""
+    try:
+        current_user_email = get_jwt_identity()
+        status = report_service.get_report_status(current_user_email, report_id)
+        if status['status'] not in ('failed', 'cancelled'):
+            return jsonify({'success': False, 'message': 'Only failed or cancelled reports can be retried.'}), 409
+        
+        resumed = has_checkpoints(db, report_id)
+        
+        if Config.REPORT_QUEUE_BACKEND == 'database' and report_service.job_queue.requeue(report_id):
+            report_service.reset_status(report_id)
+        else:
+            # sources as stored with the report; older reports take them from the request, like /api/search
+            # (only used without a 'collected' checkpoint)
+            data = request.get_json(silent=True) or {}
+            use_general, use_facebook = report_service.get_report_sources(report_id)
+            if use_general is None:
+                use_general, use_facebook = data.get('general_search', True), data.get('facebook_search', False)
+            is_admin = bool(db.session.query(User.is_admin).filter_by(email=current_user_email).scalar())
+            fb_cookies = fb_auth_service.get_cookies(current_user_email)
+            query = report_service.get_report_query(report_id)
+            report_service.reset_status(report_id)
+            report_jobs.submit(
+                report_id, current_user_email, report_service.run_report, report_id, query, fb_cookies,
+                use_facebook=use_facebook, use_general=use_general, admin=is_admin
+            )
+        
+        return jsonify({'success': True, 'report_id': report_id, 'status': 'processing', 'resumed': resumed}), 202
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 404
+    except RuntimeError as e:
+        report_service.mark_failed(report_id)
+        return jsonify({'success': False, 'message': str(e)}), 503
+    except Exception as e:
+        print(f"Retry error: {e}")
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Retry failed. Please try again.'}), 500
+
+
+def cancel_report_generation(report_id):
+    """
+    Cancels a queued or running report: 'queued' (dropped before it started), 'running' (its pipeline
+    stops within about a second and marks the report) or None when it is not being generated.
+    """
+    if Config.REPORT_QUEUE_BACKEND == 'database':
+        return report_service.job_queue.cancel(report_id)
+    state = report_jobs.cancel(report_id)
+    if state == 'queued':
+        report_service.mark_cancelled(report_id)
+    return state
+
+
+def cancel_when_abandoned(report_id):
+    """Cancels the report unless a client reconnects to its event stream within the grace period."""
+    def cancel_if_no_readers():
+        if report_events.readers(report_id):
+            return
+        with app.app_context():
+            try:
+                if cancel_report_generation(report_id):
+                    print(f"[CANCEL] Report {report_id}: no client follows it any more, cancelled")
+            except Exception as e:
+                db.session.rollback()
+                print(f"[CANCEL] Report {report_id}: cancel failed: {e}")
+            finally:
+                db.session.remove()
+    
+    timer = threading.Timer(Config.REPORT_CANCEL_DISCONNECT_GRACE_SECONDS, cancel_if_no_readers)
+    timer.daemon = True
+    timer.start()
+
+
+@app.route('/api/report/<report_id>/job', methods=['DELETE'])
+@jwt_required()
+@active_required
+def cancel_report(report_id):
+    """Stops the generation of a queued or running report (checkpoints are kept, it can be retried)"""
+    try:
+        current_user_email = get_jwt_identity()
+        report_service.get_report_status(current_user_email, report_id)  # ownership check
+        
+        state = cancel_report_generation(report_id)
+        if state is None:
+            return jsonify({'success': False, 'message': 'This report is not being generated.'}), 409
+        
+        # a running report is marked "cancelled" by its pipeline once it stopped
+        return jsonify({'success': True, 'report_id': report_id, 'status': 'cancelled' if state == 'queued' else 'cancelling'}), 202
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 404
+    except Exception as e:
+        print(f"Cancel error: {e}")
+        db.session.rollback()
+        return jsonify({'success': False, 'message': 'Failed to cancel the report.'}), 500
+
+
+@app.route('/api/report/<report_id>/status', methods=['GET'])
+@jwt_required()
+@active_required
+def get_report_status(report_id):
+    """Stage and progress of a report being generated"""
+    try:
+        current_user_email = get_jwt_identity()
+        status = report_service.get_report_status(current_user_email, report_id)
+        return jsonify({'success': True, **status}), 200
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 404
+    except Exception as e:
+        return jsonify({'success': False, 'message': 'Failed to retrieve report status.'}), 500
+
+
+@app.route('/api/report/<report_id>/events', methods=['GET'])
+@jwt_required()
+@active_required
+def stream_report_events(report_id):
+    """
+    Server-Sent Events stream of a report being generated: 'stage' events, one 'finding' event per
+    committed InformationPiece (InformationPiece.to_dict shape) and a final 'summary' event.
+    Reconnecting clients send Last-Event-ID and only get what they missed.
+    With report_cancel_on_disconnect, a report nobody follows any more is cancelled.
+    """
+    try:
+        current_user_email = get_jwt_identity()
+        status = report_service.get_report_status(current_user_email, report_id)
+    except ValueError as e:
+        return jsonify({'success': False, 'message': str(e)}), 404
+    
+    after_id = request.headers.get('Last-Event-ID', 0, type=int)
+    
+    def generate():
+        report_events.attach(report_id)
+        finished = False
+        try:
+            if not report_events.has_channel(report_id):
+                # finished long ago or generated on a report worker node: stage changes from the database
+                yield from poll_stored_status(status)
+            else:
+                for item in report_events.stream(report_id, after_id, Config.REPORT_EVENTS_HEARTBEAT_SECONDS):
+                    if item is None:
+                        yield ": keep-alive\n\n"
+                        continue
+                    event_id, event, data = item
+                    yield f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+            finished = True
+        finally:
+            # client gone (GeneratorExit at a yield): cancel the report unless it reconnects within the grace period
+            if report_events.detach(report_id) == 0 and not finished and Config.REPORT_CANCEL_ON_DISCONNECT:
+                cancel_when_abandoned(report_id)
+    
+    def poll_stored_status(status):
+        last_stage = None
+        while True:
+            if status['stage'] != last_stage:
+                last_stage = status['stage']
+                yield f"event: stage\ndata: {json.dumps({k: status[k] for k in ('stage', 'progress', 'queue')})}\n\n"
+            else:
+                yield ": keep-alive\n\n"
+            if status['status'] in FINISHED_STAGES:
+                return
+            db.session.rollback()  # don't hold a transaction between polls
+            time.sleep(Config.REPORT_EVENTS_POLL_SECONDS)
+            status = report_service.get_report_status(current_user_email, report_id)
+    
+    return Response(stream_with_context(generate()), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # no proxy buffering (nginx)
+    })
+
+
 @app.route('/api/history', methods=['GET'])
 @jwt_required()
 @active_required
@@ -737,6 +968,9 @@ def health_check():
         checks['s3'] = f'error: {str(e)}'
         overall_ok = False
 
+    # model inference pool utilization (informational, does not affect status)
+    checks['inference'] = inference_pool.stats()
+
     status = 'healthy' if overall_ok else 'bad'
 
     return jsonify({
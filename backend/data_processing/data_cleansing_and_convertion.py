@@ -9,8 +9,10 @@ sys.path.append(models_path)
 from backend.models import InformationPiece, DiscoverSource, InformationCategory, Report
 
 from backend.utils.config import Config
+from backend.utils.thread_budget import inference_pool
 
 from backend.data_processing.formulas import total_relevance_score
+from backend.data_processing.query_matcher import QueryMatcher
 
 import re
 from typing import List, Tuple
@@ -29,6 +31,7 @@ def parse_search_results_to_information_pieces(data, report_id, db):
     
     report = db.session.query(Report).filter_by(report_id=report_id).first()
     report_query = report.user_query if report else None
+    query_matcher = QueryMatcher(report_query)
 
     answer_list = []
     seen_contents = set()  # track duplicates in this batch
@@ -38,13 +41,13 @@ def parse_search_results_to_information_pieces(data, report_id, db):
             for item in sublist:
                 if isinstance(item, str) and item.strip():
                     pieces = multiple_create_string_information_piece(
-                        db, item, platform_scraping_source_id, report_id, report_query, seen_contents
+                        db, item, platform_scraping_source_id, report_id, report_query, seen_contents, query_matcher
                     )
                     if pieces:
                         answer_list.extend(pieces)
                 elif isinstance(item, dict):
                     pieces = multiple_create_dict_information_piece(
-                        db, item, web_search_source_id, report_id, report_query, seen_contents
+                        db, item, web_search_source_id, report_id, report_query, seen_contents, query_matcher
                     )
                     if pieces:
                         answer_list.extend(pieces)
@@ -57,7 +60,7 @@ def parse_search_results_to_information_pieces(data, report_id, db):
     return answer_list
 
 
-def multiple_create_string_information_piece(db, content, source_id, report_id, report_query, seen_contents):
+def multiple_create_string_information_piece(db, content, source_id, report_id, report_query, seen_contents, query_matcher=None):
     extracted_content = extract_entities_from_data(content)
     created_pieces = []
 
@@ -68,7 +71,8 @@ def multiple_create_string_information_piece(db, content, source_id, report_id,
 
         info_piece = create_string_information_piece(
             db, item[0], source_id, report_id, category_name=item[1],
-            source="facebook.com", snippet=item[0], report_query=report_query
+            source="facebook.com", snippet=item[0], report_query=report_query,
+            query_matcher=query_matcher
         )
         if info_piece:
             created_pieces.append(info_piece)
@@ -77,7 +81,7 @@ def multiple_create_string_information_piece(db, content, source_id, report_id,
     return created_pieces if created_pieces else None
 
 
-def multiple_create_dict_information_piece(db, item_dict, source_id, report_id, report_query, seen_contents):
+def multiple_create_dict_information_piece(db, item_dict, source_id, report_id, report_query, seen_contents, query_matcher=None):
     if not isinstance(item_dict, dict) or not item_dict.get('valuable_text'):
         return None
 
@@ -95,7 +99,8 @@ def multiple_create_dict_information_piece(db, item_dict, source_id, report_id,
 
         info_piece = create_string_information_piece(
             db, item[0], source_id, report_id, category_name=item[1],
-            source=link, snippet=item[0], report_query=report_query
+            source=link, snippet=item[0], report_query=report_query,
+            query_matcher=query_matcher
         )
         if info_piece:
             created_pieces.append(info_piece)
@@ -104,11 +109,15 @@ def multiple_create_dict_information_piece(db, item_dict, source_id, report_id,
     return created_pieces if created_pieces else None
 
 
-def create_string_information_piece(db, content, source_id, report_id, category_name = None,  source="facebook.com", snippet=None, report_query=None) -> InformationPiece:
+def create_string_information_piece(db, content, source_id, report_id, category_name = None,  source="facebook.com", snippet=None, report_query=None, query_matcher=None) -> InformationPiece:
     """Create InformationPiece from string content"""
     
-    if report_query and content:
-        if report_query.strip().lower() in content.strip().lower() or content.strip().lower() in report_query.strip().lower():
+    # shared with DataProcessingEngine; callers processing a whole report pass one prebuilt matcher
+    if query_matcher is None:
+        query_matcher = QueryMatcher(report_query)
+    
+    if query_matcher and content:
+        if query_matcher.is_query_like(content.strip()):
             print("Skipping content as it matches the report query:", content)
             return None
     
@@ -138,7 +147,7 @@ def extract_entities_from_data(datapiece: str) -> List[Tuple[str, str]]:
     relevant_data = []
     
     # 1. Named Entity Recognition
-    entities = nlp(datapiece)
+    entities = inference_pool.run(nlp, datapiece)
     for entity in entities:
         
         # group and sort by entities
@@ -7,6 +7,7 @@ from sentence_transformers import SentenceTransformer, util
 import math
 
 from backend.utils.config import Config
+from backend.utils.thread_budget import inference_pool
 
 semantic_model = SentenceTransformer(Config.SEMANTIC_MODEL)
 
@@ -35,8 +36,8 @@ def semantic_score(a: str, b: str, model=None) -> float:
     if not a or not b:
         return 0.0
     model = model or semantic_model
-    emb1 = model.encode(a, convert_to_tensor=True)
-    emb2 = model.encode(b, convert_to_tensor=True)
+    emb1 = inference_pool.run(model.encode, a, convert_to_tensor=True)
+    emb2 = inference_pool.run(model.encode, b, convert_to_tensor=True)
     cos = util.cos_sim(emb1, emb2).item()
     return max(0.0, float(cos))
 
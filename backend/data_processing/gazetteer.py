@@ -0,0 +1,95 @@
+# backend/data_processing/gazetteer.py
+import os
+import re
+from typing import Dict, List
+
+import yaml
+
+from backend.data_processing.transliteration import variants
+
+
+class Gazetteer:
+    """
+    Compiled dictionary of well-known entities (cities, countries, universities, companies).
+
+    Every name, alias and their transliterations are tokenized into a token trie, so a text
+    is tagged in a single left-to-right pass (longest match wins). Tagged mentions get their
+    category directly and do not need NER or the specificity check.
+
+    File format (YAML), top-level keys are information categories:
+        Location Data:
+          - name: Kharkiv
+            aliases: [Харків, Kharkov]
+    """
+
+    _TOKEN_RE = re.compile(r'\w+')
+    _END = '__entry__'
+
+    def __init__(self, entries: Dict[str, list] = None):
+        self._trie = {}
+        self.size = 0
+        for category, items in (entries or {}).items():
+            for item in items or []:
+                if isinstance(item, str):
+                    item = {'name': item}
+                self.add(item['name'], category, item.get('aliases') or [])
+
+    @classmethod
+    def from_file(cls, path: str) -> "Gazetteer":
+        if not path or not os.path.exists(path):
+            print(f"[GAZETTEER] File not found: {path}, fast path disabled")
+            return cls()
+        with open(path, 'r') as f:
+            gazetteer = cls(yaml.safe_load(f) or {})
+        print(f"[GAZETTEER] Loaded {gazetteer.size} entries from {path}")
+        return gazetteer
+
+    def add(self, name: str, category: str, aliases: List[str] = ()):
+        for surface in [name, *aliases]:
+            for variant in variants(surface):
+                tokens = self._TOKEN_RE.findall(variant)
+                if not tokens:
+                    continue
+                node = self._trie
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                node[self._END] = (name, category)
+        self.size += 1
+
+    def tag(self, text: str) -> List[dict]:
+        """
+        Returns non-overlapping mentions as candidate dicts:
+        {'word': canonical name, 'category': str, 'method': 'GAZETTEER', 'start': int, 'end': int}
+        Only capitalized mentions are tagged to avoid matching common words.
+        """
+        if not self._trie or not text:
+            return []
+
+        tokens = [(m.group(0).lower(), m.start(), m.end()) for m in self._TOKEN_RE.finditer(text)]
+        mentions = []
+        i = 0
+        while i < len(tokens):
+            node = self._trie
+            match, match_end = None, i
+            j = i
+            while j < len(tokens) and tokens[j][0] in node:
+                node = node[tokens[j][0]]
+                j += 1
+                if self._END in node:
+                    match, match_end = node[self._END], j
+
+            start = tokens[i][1]
+            if match and text[start].isupper():
+                name, category = match
+                mentions.append({
+                    'word': name,
+                    'category': category,
+                    'method': 'GAZETTEER',
+                    'start': start,
+                    'end': tokens[match_end - 1][2]
+                })
+                i = match_end
+            else:
+                i += 1
+
+        return mentions
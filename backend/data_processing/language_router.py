@@ -0,0 +1,108 @@
+# backend/data_processing/language_router.py
+import re
+import threading
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+from transformers import pipeline
+
+from backend.utils.thread_budget import inference_pool
+
+_CYRILLIC_RE = re.compile(r'[а-яёіїєґ]', re.IGNORECASE)
+_LATIN_RE = re.compile(r'[a-z]', re.IGNORECASE)
+_WORD_RE = re.compile(r'[a-z]+', re.IGNORECASE)
+
+_UKRAINIAN_ONLY = set('іїєґ')
+_RUSSIAN_ONLY = set('ыэъё')
+_LATIN_DIACRITICS = set('ąčęėįšųūžäöüßłńśźżåøæéèêàçñõ')
+
+_ENGLISH_STOPWORDS = {
+    'the', 'and', 'of', 'to', 'in', 'is', 'for', 'on', 'with', 'at', 'by', 'from',
+    'as', 'an', 'are', 'was', 'this', 'that', 'it', 'be', 'or', 'his', 'her', 'has', 'have'
+}
+
+
+def detect_language(text: str, sample_size: int = 2000) -> str:
+    """
+    Cheap script/stopword based language identification, no model involved.
+    Returns 'en', 'uk', 'ru' or 'other' (mixed, unknown latin languages, no letters).
+    """
+    sample = (text or "")[:sample_size].lower()
+    cyrillic = len(_CYRILLIC_RE.findall(sample))
+    latin = len(_LATIN_RE.findall(sample))
+    letters = cyrillic + latin
+    if not letters:
+        return 'other'
+
+    if cyrillic / letters > 0.7:
+        chars = set(sample)
+        if chars & _UKRAINIAN_ONLY:
+            return 'uk'
+        if chars & _RUSSIAN_ONLY:
+            return 'ru'
+        return 'other'
+
+    if latin / letters > 0.9 and not set(sample) & _LATIN_DIACRITICS:
+        words = _WORD_RE.findall(sample)
+        if words and sum(w in _ENGLISH_STOPWORDS for w in words) / len(words) > 0.08:
+            return 'en'
+
+    return 'other'
+
+
+class NerRouter:
+    """
+    Routes texts to per-language NER models (configured as NER_models_by_language in cfg.yaml)
+    and runs each model once over its whole batch. Languages without a dedicated model, and any
+    model that fails to load, go to the multilingual fallback pipeline.
+    """
+
+    def __init__(self, fallback_pipeline, models_by_language: Optional[Dict[str, str]] = None, batch_size: int = 8):
+        self.fallback_pipeline = fallback_pipeline
+        self.models_by_language = {lang: m for lang, m in (models_by_language or {}).items() if m}
+        self.batch_size = batch_size
+
+        self._pipelines = {}
+        self._lock = threading.Lock()
+
+    def run(self, texts: List[str]) -> List[list]:
+        """Returns grouped NER entities for every text, in input order."""
+        results = [[] for _ in texts]
+
+        batches = defaultdict(list)
+        for i, text in enumerate(texts):
+            if text:
+                batches[self._pipeline_for(detect_language(text))].append(i)
+
+        for ner, indices in batches.items():
+            batch = [texts[i] for i in indices]
+            try:
+                outputs = inference_pool.run(ner, batch, batch_size=self.batch_size)
+            except Exception as e:
+                print(f"[NER] Batch of {len(batch)} failed ({e}), retrying one by one")
+                outputs = []
+                for text in batch:
+                    try:
+                        outputs.append(inference_pool.run(ner, text))
+                    except Exception:
+                        outputs.append([])
+
+            for i, entities in zip(indices, outputs):
+                results[i] = list(entities or [])
+
+        return results
+
+    def _pipeline_for(self, language: str):
+        model_name = self.models_by_language.get(language)
+        if not model_name:
+            return self.fallback_pipeline
+
+        with self._lock:
+            if model_name not in self._pipelines:
+                print(f"[INIT] Loading NER Model for '{language}': {model_name}")
+                try:
+                    self._pipelines[model_name] = pipeline("ner", model=model_name, grouped_entities=True)
+                except Exception as e:
+                    print(f"[NER] Could not load {model_name} ({e}), using multilingual model")
+                    self._pipelines[model_name] = self.fallback_pipeline
+            return self._pipelines[model_name]
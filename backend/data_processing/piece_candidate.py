@@ -0,0 +1,30 @@
+# backend/data_processing/piece_candidate.py
+from datetime import datetime
+
+
+class PieceCandidate:
+    """
+    Lightweight in-memory record of an extracted entity.
+
+    Used for the whole processing pipeline (merging, deduplication, scoring) instead of
+    InformationPiece, so nothing enters the session identity map or the EncryptedString
+    bind path until the piece is known to survive. Converted to ORM objects only on persist.
+    """
+
+    __slots__ = (
+        'content', 'category', 'source', 'snippet',
+        'relevance_score', 'repetition_count', 'created_at', 'piece_id'
+    )
+
+    def __init__(self, content, category, source, snippet, relevance_score=None, created_at=None):
+        self.content = content
+        self.category = category
+        self.source = source
+        self.snippet = snippet
+        self.relevance_score = relevance_score
+        self.repetition_count = 1
+        self.created_at = created_at or datetime.utcnow()
+        self.piece_id = None  # InformationPiece id once persisted by an earlier phase of the report
+
+    def __repr__(self):
+        return f"PieceCandidate({self.category}:{self.content!r} x{self.repetition_count})"
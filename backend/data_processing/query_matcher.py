@@ -0,0 +1,73 @@
+# backend/data_processing/query_matcher.py
+import re
+from typing import List
+
+from rapidfuzz import fuzz, process
+
+from backend.data_processing.transliteration import variants
+
+
+class QueryMatcher:
+    """
+    Per-report matcher that decides whether an extracted entity is just the searched query itself
+    (e.g. 'Andrii' or 'Matsevytyi Andrii' for the query 'Андрій Мацевитий').
+
+    Built once per report: the query is normalized, tokenized and transliterated a single time,
+    and candidates are scored against all query variants in one vectorized rapidfuzz call.
+    """
+
+    FUZZY_THRESHOLD = 85
+
+    _TOKEN_RE = re.compile(r'\w+')
+
+    def __init__(self, query: str):
+        self.query = query or ""
+        self.variants = variants(self.query)
+        self.normalized = self.variants[0] if self.variants else ""
+
+        self.tokens = set()
+        for variant in self.variants:
+            self.tokens.update(self._TOKEN_RE.findall(variant))
+
+        self._scorer = fuzz.ratio
+
+    def __bool__(self):
+        return bool(self.normalized)
+
+    def is_query_like(self, text: str) -> bool:
+        return self.query_like_mask([text])[0]
+
+    def query_like_mask(self, texts: List[str]) -> List[bool]:
+        """
+        For every text returns True if it repeats the query:
+        A. substring of (or superstring of) any query variant
+        B. all of its tokens are query tokens (rotation / split check)
+        C. fuzzy ratio above FUZZY_THRESHOLD against any query variant
+        """
+        if not texts:
+            return []
+        if not self:
+            return [False] * len(texts)
+
+        lowered = [(t or "").lower() for t in texts]
+        mask = [self._matches_exactly(t) for t in lowered]
+
+        pending = [i for i, hit in enumerate(mask) if not hit]
+        if pending:
+            scores = process.cdist(
+                [lowered[i] for i in pending], self.variants,
+                scorer=self._scorer, workers=1
+            )
+            for i, row in zip(pending, scores):
+                if row.max() > self.FUZZY_THRESHOLD:
+                    mask[i] = True
+
+        return mask
+
+    def _matches_exactly(self, t_lower: str) -> bool:
+        for variant in self.variants:
+            if t_lower in variant or variant in t_lower:
+                return True
+
+        t_tokens = set(self._TOKEN_RE.findall(t_lower))
+        return t_tokens.issubset(self.tokens)
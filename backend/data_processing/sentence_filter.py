@@ -0,0 +1,80 @@
+# backend/data_processing/sentence_filter.py
+import re
+
+from backend.data_processing.query_matcher import QueryMatcher
+
+
+class SentenceFilterStats:
+    """Per-report counters showing how much text the filter kept away from NER."""
+
+    __slots__ = ('entries', 'sentences_total', 'sentences_kept', 'chars_total', 'chars_kept')
+
+    def __init__(self):
+        self.entries = 0
+        self.sentences_total = 0
+        self.sentences_kept = 0
+        self.chars_total = 0
+        self.chars_kept = 0
+
+    def __str__(self):
+        share = (self.chars_kept / self.chars_total * 100.0) if self.chars_total else 100.0
+        return (f"kept {self.sentences_kept}/{self.sentences_total} sentences "
+                f"({share:.1f}% of text) in {self.entries} entries")
+
+
+class SentenceFilter:
+    """
+    Query-focused pre-NER filter for crawled pages.
+
+    Splits an entry into sentences and keeps only those within `window` sentences of a mention
+    of the query name. Mentions are found through a token prefix index built from the query and
+    its transliterations, so inflected forms ('Мацевитого') and romanized spellings still match.
+    """
+
+    _SENTENCE_SPLIT_RE = re.compile(r'(?<=[.!?…·|])\s+')
+    _TOKEN_RE = re.compile(r'\w+')
+
+    def __init__(self, query_matcher: QueryMatcher, window: int = 1, prefix_len: int = 5):
+        self.window = max(0, window)
+        self.prefix_len = prefix_len
+        self.stats = SentenceFilterStats()
+
+        # one-letter initials / short particles would match almost every sentence
+        self.name_prefixes = {tok[:prefix_len] for tok in query_matcher.tokens if len(tok) >= 3}
+        self._prefix_lengths = sorted({len(p) for p in self.name_prefixes})
+
+    def __bool__(self):
+        return bool(self.name_prefixes)
+
+    def filter(self, text: str) -> str:
+        """Returns the kept sentences joined back together ('' if the name is never mentioned)."""
+        if not self or not text:
+            return text
+
+        sentences = self._SENTENCE_SPLIT_RE.split(text)
+        mentioned = [self._mentions_query(s) for s in sentences]
+
+        keep = [False] * len(sentences)
+        for i, hit in enumerate(mentioned):
+            if hit:
+                for j in range(max(0, i - self.window), min(len(sentences), i + self.window + 1)):
+                    keep[j] = True
+
+        filtered = " ".join(s for s, k in zip(sentences, keep) if k)
+
+        self.stats.entries += 1
+        self.stats.sentences_total += len(sentences)
+        self.stats.sentences_kept += sum(keep)
+        self.stats.chars_total += len(text)
+        self.stats.chars_kept += len(filtered)
+
+        return filtered
+
+    def _mentions_query(self, sentence: str) -> bool:
+        for token in self._TOKEN_RE.findall(sentence.lower()):
+            if len(token) < 3:
+                continue
+            for length in self._prefix_lengths:
+                if token[:length] in self.name_prefixes:
+                    return True
+        return False
@@ -0,0 +1,95 @@
+# backend/data_processing/transliteration.py
+import re
+
+# Ukrainian national romanization (KMU 2010), extended with the few russian-only letters
+# that appear in crawled pages. Word-initial forms differ for є, ї, й, ю, я.
+_CYR_TO_LAT = {
+    'а': 'a', 'б': 'b', 'в': 'v', 'г': 'h', 'ґ': 'g', 'д': 'd', 'е': 'e', 'є': 'ie',
+    'ж': 'zh', 'з': 'z', 'и': 'y', 'і': 'i', 'ї': 'i', 'й': 'i', 'к': 'k', 'л': 'l',
+    'м': 'm', 'н': 'n', 'о': 'o', 'п': 'p', 'р': 'r', 'с': 's', 'т': 't', 'у': 'u',
+    'ф': 'f', 'х': 'kh', 'ц': 'ts', 'ч': 'ch', 'ш': 'sh', 'щ': 'shch', 'ь': '', 'ю': 'iu',
+    'я': 'ia', 'ы': 'y', 'э': 'e', 'ё': 'io', 'ъ': '', '\'': '', '’': '', 'ʼ': '',
+}
+
+_CYR_TO_LAT_INITIAL = {'є': 'ye', 'ї': 'yi', 'й': 'y', 'ю': 'yu', 'я': 'ya'}
+
+# Reverse direction is ambiguous, so it is a best-effort greedy mapping (longest chunk first)
+_LAT_TO_CYR = [
+    ('shch', 'щ'), ('zh', 'ж'), ('kh', 'х'), ('ts', 'ц'), ('ch', 'ч'), ('sh', 'ш'),
+    ('ya', 'я'), ('ia', 'я'), ('yu', 'ю'), ('iu', 'ю'), ('ye', 'є'), ('ie', 'є'),
+    ('a', 'а'), ('b', 'б'), ('v', 'в'), ('w', 'в'), ('h', 'г'), ('g', 'г'), ('d', 'д'),
+    ('e', 'е'), ('z', 'з'), ('y', 'и'), ('i', 'і'), ('j', 'й'), ('k', 'к'), ('c', 'к'),
+    ('q', 'к'), ('x', 'кс'), ('l', 'л'), ('m', 'м'), ('n', 'н'), ('o', 'о'), ('p', 'п'),
+    ('r', 'р'), ('s', 'с'), ('t', 'т'), ('u', 'у'), ('f', 'ф'),
+]
+
+# word endings that romanize from "-ій" / "-ий" (Andrii, Matsevytyi)
+_LAT_ENDINGS = [('yi', 'ий'), ('ii', 'ій'), ('iy', 'ій')]
+
+_WORD_RE = re.compile(r'\w+|\W+')
+_CYRILLIC_RE = re.compile(r'[а-яёіїєґ]', re.IGNORECASE)
+_LATIN_RE = re.compile(r'[a-z]', re.IGNORECASE)
+
+
+def has_cyrillic(text: str) -> bool:
+    return bool(text) and bool(_CYRILLIC_RE.search(text))
+
+
+def has_latin(text: str) -> bool:
+    return bool(text) and bool(_LATIN_RE.search(text))
+
+
+def to_latin(text: str) -> str:
+    """Romanize cyrillic letters of a lowercase string ('андрій' -> 'andrii')."""
+    if not text:
+        return ""
+    out = []
+    for chunk in _WORD_RE.findall(text.lower()):
+        for i, ch in enumerate(chunk):
+            if i == 0 and ch in _CYR_TO_LAT_INITIAL:
+                out.append(_CYR_TO_LAT_INITIAL[ch])
+            else:
+                out.append(_CYR_TO_LAT.get(ch, ch))
+    return "".join(out)
+
+
+def to_cyrillic(text: str) -> str:
+    """Best-effort reverse transliteration of a lowercase string ('andrii' -> 'андрій')."""
+    if not text:
+        return ""
+    out = []
+    for chunk in _WORD_RE.findall(text.lower()):
+        if not chunk[0].isalnum():
+            out.append(chunk)
+            continue
+
+        ending = ""
+        for lat, cyr in _LAT_ENDINGS:
+            if len(chunk) > len(lat) and chunk.endswith(lat):
+                chunk, ending = chunk[:-len(lat)], cyr
+                break
+
+        i = 0
+        while i < len(chunk):
+            for lat, cyr in _LAT_TO_CYR:
+                if chunk.startswith(lat, i):
+                    out.append(cyr)
+                    i += len(lat)
+                    break
+            else:
+                out.append(chunk[i])
+                i += 1
+        out.append(ending)
+    return "".join(out)
+
+
+def variants(text: str) -> list:
+    """Lowercase text plus its latin and cyrillic spellings, deduplicated, original first."""
+    base = " ".join((text or "").lower().split())
+    if not base:
+        return []
+    result = [base]
+    for candidate in (to_latin(base), to_cyrillic(base)):
+        if candidate and candidate not in result:
+            result.append(candidate)
+    return result
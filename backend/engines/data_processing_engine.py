@@ -1,4 +1,6 @@
 import re
+import threading
+from queue import Queue
 from datetime import datetime, timedelta
 from transformers import pipeline
 from sentence_transformers import SentenceTransformer, util
@@ -6,7 +8,21 @@ from rapidfuzz import fuzz
 
 
 from backend.models import InformationPiece, InformationCategory, DiscoverSource, User, SearchHistory
+from backend.data_processing.query_matcher import QueryMatcher
+from backend.data_processing.piece_candidate import PieceCandidate
+from backend.data_processing.gazetteer import Gazetteer
+from backend.data_processing.language_router import NerRouter
+from backend.data_processing.sentence_filter import SentenceFilter
 from backend.utils.config import Config
+from backend.utils.cancellation import CancellationToken
+from backend.utils.safe_regex import SafePattern, RegexBudget
+from backend.utils.thread_budget import inference_pool
+from backend.utils.corroboration import record_occurrences
+from backend.utils.blind_index import blind_index
+
+
+# end-of-stream marker passed through the pipelined mode queues
+_PIPELINE_DONE = object()
 
 
 class DataProcessingEngine:
@@ -20,6 +36,18 @@ class DataProcessingEngine:
         'linkedin', 'facebook', 'instagram', 'twitter', 'google', 
         'tiktok', 'youtube', 'social media', 'profile', 'posts'
     }
+    
+    # Regex extractors run over untrusted crawled text: precompiled on the linear-time engine when available
+    EMAIL_PATTERN = SafePattern(r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+', name='email')
+    FINANCIAL_PATTERN = SafePattern(r'\$\d+(?:,\d{3})*(?:\.\d{2})?|\b(?:UAH|EUR|USD|грн|долар|євро|euro|buck|dollar|$|€|£)\b', name='financial')
+    PHONE_PATTERN = SafePattern(r'(?<!\d)(?:\+?\d{1,3}[ -]?)?\(?\d{2,3}\)?[ -]?\d{3}[ -]?\d{2,4}(?!\d)', name='phone')
+    SOCIAL_PATTERN = SafePattern(r' @\S+', name='social')
+    PROFESSION_PATTERNS = {
+        prof: SafePattern(r'\b' + re.escape(prof) + r'\b', re.IGNORECASE, name=prof)
+        for prof in ['CEO', 'founder', 'developer', 'manager', 'engineer', 'analyst', 'specialist', 'student']
+    }
+    STATEMENT_PATTERN = SafePattern(r'\b(said|stated|tweeted|posted|commented)\b', re.IGNORECASE, name='statement')
+    IDENTIFIER_PATTERN = SafePattern(r'\bID[:\s]*\d+|passport[:\s]*\w+\d+', re.IGNORECASE, name='identifier')
 
     def __new__(cls, *args, **kwargs):
         if not cls._instance:
@@ -34,108 +62,87 @@ class DataProcessingEngine:
         print("[INIT] Loading NER Model...")
         self.ner_pipeline = pipeline("ner", model=Config.NER_MODEL, grouped_entities=True)
         
+        # language-specific models are loaded lazily, the multilingual one stays the fallback
+        self.ner_router = NerRouter(self.ner_pipeline, Config.NER_MODELS_BY_LANGUAGE, batch_size=Config.NER_BATCH_SIZE)
+        
         print("[INIT] Loading Semantic Model...")
         self.semantic_model = SentenceTransformer(Config.SEMANTIC_MODEL)
+        self.embedding_model = None  # piece embeddings (cross-report corroboration), loaded on first persist
+        
+        print("[INIT] Loading Gazetteer...")
+        self.gazetteer = Gazetteer.from_file(Config.GAZETTEER_PATH)
         
         self.db = db
         
         self.categories_cache = {}
+        self.sources_cache = {}
         self._initialized = True
         
         
     # =============== Public API ===============
 
-    def process_raw_data(self, data_list, report_id, report_query, db):
+    def process_raw_data(self, data_list, report_id, report_query, db, mode=None, local_cache=None, cancel_token=None):
         """
         Main pipeline entry point corresponding to DFD Level 2.
+        Works on PieceCandidate records; InformationPiece rows are created only for survivors on persist.
+        
+        mode: 'sequential' (default from cfg.yaml) or 'pipelined', where NER, scoring and persistence
+        run concurrently on separate threads connected by bounded queues. Both produce identical pieces.
+        
+        local_cache: merge cache shared by the phases of one report (snippet preview, then deep crawl).
+        Entities already persisted by an earlier phase are merged into their existing rows instead of
+        being inserted again. Returns only the newly created pieces.
+        
+        cancel_token: checked between NER batches (pipeline_chunk_size entries) and before anything
+        is persisted; a cancelled report raises ReportCancelled without committing.
         """
-        processed_pieces = []
+        mode = mode or Config.PROCESSING_MODE
+        cancel_token = cancel_token or CancellationToken()
+        phased = local_cache is not None
+        if local_cache is None:
+            local_cache = {}
         
-        # dictionary {canonized_key: piece_object} for intelligent merging
-        # key format: "Category:LowerCaseContent"
-        local_cache = {} 
+        # query is fixed for the whole report, so it is normalized/transliterated only once
+        query_matcher = QueryMatcher(report_query)
         
         # 1. Normalization
         clean_entries = self._normalize_inputs(data_list)
 
-        for entry in clean_entries:
-            text = entry['text']
-            source = entry['source']
-            
-            # 2. Entity Extraction (NER + Regex)
-            # Returns list of dicts: {'word': str, 'category': str, 'start': int, 'end': int}
-            candidates = self._extract_candidates(text)
+        # 2. Query-focused filtering: crawled pages send only sentences around the query name to NER
+        ner_texts = self._filter_ner_inputs(clean_entries, query_matcher, report_id)
+        
+        if mode == 'pipelined':
+            processed_pieces = self._process_pipelined(
+                clean_entries, ner_texts, query_matcher, report_query, db, local_cache, cancel_token
+            )
+        else:
+            # 3. Entity Extraction (NER + Regex), in batches so a cancelled report stops between them
+            chunk_size = max(1, Config.PIPELINE_CHUNK_SIZE)
+            extracted = []
+            for start in range(0, len(clean_entries), chunk_size):
+                cancel_token.raise_if_cancelled()
+                end = start + chunk_size
+                extracted.extend(self._extract_stage(clean_entries[start:end], ner_texts[start:end], query_matcher))
             
-            for candidate in candidates:
-                val_text = candidate['word']
-                cat_type = candidate['category']
-                method = candidate['method']
-                
-                # 3. Validation & Cleaning
-                # Fix "Harlequin DefenseWe" -> "Harlequin Defense We"
-                val_text = self._clean_glued_words(val_text)
-                
-                # Fix "##edIn" artifacts manually
-                val_text = val_text.replace("##", "")
-
-                if not self._validate_rules(val_text, report_query, cat_type):
-                    continue
-                
-                # 4. Canonization (Standardize format)
-                # "LITHUANIA" -> "Lithuania"
-                final_text = self._canonize(val_text, cat_type)
-                
-                # 5. Merge & Deduplicate
-                # check if a similar entity already exists in this batch
-                merge_key = f"{cat_type}:{final_text.lower()}"
-                
-                if merge_key in local_cache:
-                    # Already exists: just increment occurrence or update metadata
-                    existing_piece = local_cache[merge_key]
-                    existing_piece.repetition_count += 1
-                    # If the new text is "better" (e.g. title case vs upper case), update it
-                    if final_text[0].isupper() and not existing_piece.content[0].isupper():
-                        existing_piece.content = final_text
-                    continue
-                if method == 'NER':
-                    # Check for substrings (Harlequin Defense vs Harlequin DefenseWe)
-                    
-                    if self._validate_entity_specificity(final_text, cat_type):
-                        continue
-                    
-                    found_fuzzy = False
-                    for key, existing_piece in local_cache.items():
-                        existing_cat = key.split(':')[0]
-                        if existing_cat != cat_type: continue
-                        
-                        # one is contained in the other and difference is short
-                        s1 = final_text.lower()
-                        s2 = existing_piece.content.lower()
-                        
-                        if (s1 in s2 or s2 in s1) and abs(len(s1) - len(s2)) < 4:
-                            # merge into the shorter/cleaner one 
-                            target_piece = existing_piece if len(s2) <= len(s1) else None
-                            
-                            if target_piece:
-                                target_piece.repetition_count += 1
-                                found_fuzzy = True
-                                break
-                            
-                    if found_fuzzy:
-                        continue
-
-                # 6. Vector Embedding
-                similarity = self._calculate_context_relevance(content=final_text, snippet=text, user_query=report_query)
-                
-                # Create and Cache
-                piece = self._create_information_piece(
-                    db, final_text, cat_type, source, report_id, similarity, text
+            # 4. Validation, Merge & Scoring
+            # local_cache: dictionary {canonized_key: PieceCandidate} for intelligent merging
+            # key format: "Category:LowerCaseContent"
+            processed_pieces = []
+            for entry, candidates, query_like in extracted:
+                processed_pieces.extend(
+                    self._score_stage(entry, candidates, query_like, query_matcher, report_query, local_cache)
                 )
-                local_cache[merge_key] = piece
-                processed_pieces.append(piece)
                 
+        # 5. Persist survivors
+        cancel_token.raise_if_cancelled()
+        information_pieces = self._persist_candidates(db, processed_pieces, report_id, report_query)
+        if phased:
+            self._update_merged_pieces(db, local_cache)
+            db.session.flush()  # assigns ids, later phases merge into these rows
+            for candidate, piece in zip(processed_pieces, information_pieces):
+                candidate.piece_id = piece.id
         db.session.commit()
-        return processed_pieces
+        return information_pieces
     
     # detect misusers (on user request)
     def get_local_misuse_score(self, user_id, current_query):
@@ -146,7 +153,7 @@ class DataProcessingEngine:
         u2 = (user.email.split('@')[0] if user.email else "").lower().strip()
         
         # extract Entities
-        ner_results = self.ner_pipeline(current_query, grouped_entities=True)
+        ner_results = inference_pool.run(self.ner_pipeline, current_query, grouped_entities=True)
         r_words = re.findall(r'\b[A-Z][a-z]+\b', current_query)
         ignored = {'Report', 'Search', 'Find', 'Who', 'Where', 'When', 'The'}
         
@@ -157,7 +164,7 @@ class DataProcessingEngine:
                 candidates[ent['word'].replace("##", "").strip()] = True
         for word in r_words:
             if word not in ignored:
-                ner_results_2 = self.ner_pipeline(word, grouped_entities=True)
+                ner_results_2 = inference_pool.run(self.ner_pipeline, word, grouped_entities=True)
                 if len(ner_results_2) > 0 and ner_results_2[0].get('entity_group'):
                     if ner_results_2[0]['entity_group'] == 'PER':
                             candidates[ent['word'].replace("##", "").strip()] = True
@@ -198,6 +205,187 @@ class DataProcessingEngine:
 
         return min(1.0, max(0.0, local_score))
     
+    # =============== Pipeline Stages ===============
+
+    def _extract_stage(self, entries, ner_texts, query_matcher):
+        """
+        NER (batched per language model) + regex + gazetteer for a group of entries.
+        Returns [(entry, candidates, query_like_flags)], flags computed in one vectorized pass.
+        Candidates are dicts: {'word': str, 'category': str, 'method': str}
+        """
+        ner_batch = self.ner_router.run(ner_texts)
+        
+        extracted = []
+        for entry, ner_text, ner_results in zip(entries, ner_texts, ner_batch):
+            candidates = self._extract_candidates(entry['text'], ner_results=ner_results, ner_text=ner_text)
+            
+            for candidate in candidates:
+                # gazetteer hits already carry the canonical name
+                if candidate['method'] == 'GAZETTEER':
+                    continue
+                
+                # Fix "Harlequin DefenseWe" -> "Harlequin Defense We"
+                val_text = self._clean_glued_words(candidate['word'])
+                
+                # Fix "##edIn" artifacts manually
+                candidate['word'] = val_text.replace("##", "")
+                
+            extracted.append((entry, candidates))
+            
+        query_like = iter(query_matcher.query_like_mask(
+            [c['word'] for _, candidates in extracted for c in candidates]
+        ))
+        return [(entry, candidates, [next(query_like) for _ in candidates]) for entry, candidates in extracted]
+
+    def _score_stage(self, entry, candidates, query_like, query_matcher, report_query, local_cache):
+        """
+        Validation, canonization, merging into `local_cache` and context scoring for one entry.
+        Must see entries in input order (merging is order dependent). Returns new PieceCandidates.
+        """
+        text = entry['text']
+        source = entry['source']
+        new_pieces = []
+        
+        for candidate, is_query_like in zip(candidates, query_like):
+            val_text = candidate['word']
+            cat_type = candidate['category']
+            method = candidate['method']
+            
+            # Validation
+            if not self._validate_rules(val_text, query_matcher, cat_type, query_like=is_query_like):
+                continue
+            
+            # Canonization (Standardize format)
+            # "LITHUANIA" -> "Lithuania"; gazetteer hits keep their canonical casing ("EPAM Systems")
+            final_text = val_text.strip() if method == 'GAZETTEER' else self._canonize(val_text, cat_type)
+            
+            # Merge & Deduplicate
+            # check if a similar entity already exists in this batch
+            merge_key = f"{cat_type}:{final_text.lower()}"
+            
+            if merge_key in local_cache:
+                # Already exists: just increment occurrence or update metadata
+                existing_piece = local_cache[merge_key]
+                existing_piece.repetition_count += 1
+                # If the new text is "better" (e.g. title case vs upper case), update it
+                if final_text[0].isupper() and not existing_piece.content[0].isupper():
+                    existing_piece.content = final_text
+                continue
+            if method == 'NER':
+                # Check for substrings (Harlequin Defense vs Harlequin DefenseWe)
+                
+                if self._validate_entity_specificity(final_text, cat_type):
+                    continue
+                
+                found_fuzzy = False
+                for key, existing_piece in local_cache.items():
+                    existing_cat = key.split(':')[0]
+                    if existing_cat != cat_type: continue
+                    
+                    # one is contained in the other and difference is short
+                    s1 = final_text.lower()
+                    s2 = existing_piece.content.lower()
+                    
+                    if (s1 in s2 or s2 in s1) and abs(len(s1) - len(s2)) < 4:
+                        # merge into the shorter/cleaner one 
+                        target_piece = existing_piece if len(s2) <= len(s1) else None
+                        
+                        if target_piece:
+                            target_piece.repetition_count += 1
+                            found_fuzzy = True
+                            break
+                        
+                if found_fuzzy:
+                    continue
+
+            # Vector Embedding
+            similarity = self._calculate_context_relevance(content=final_text, snippet=text, user_query=report_query)
+            
+            # Create and Cache
+            piece = PieceCandidate(final_text, cat_type, source, text[:500], relevance_score=similarity)
+            local_cache[merge_key] = piece
+            new_pieces.append(piece)
+            
+        return new_pieces
+
+    def _process_pipelined(self, entries, ner_texts, query_matcher, report_query, db, local_cache=None, cancel_token=None):
+        """
+        NER thread -> scoring thread -> persistence (calling thread, owns the DB session).
+        Entries flow in chunks through bounded queues; the scoring thread keeps input order,
+        so merging and therefore the result are identical to the sequential path.
+        """
+        chunk_size = max(1, Config.PIPELINE_CHUNK_SIZE)
+        extracted_queue = Queue(maxsize=Config.PIPELINE_QUEUE_SIZE)
+        scored_queue = Queue(maxsize=Config.PIPELINE_QUEUE_SIZE)
+        errors = []
+        
+        def ner_worker():
+            try:
+                for start in range(0, len(entries), chunk_size):
+                    if errors:
+                        break
+                    if cancel_token:
+                        cancel_token.raise_if_cancelled()  # recorded in errors like any stage failure
+                    end = start + chunk_size
+                    extracted_queue.put(self._extract_stage(entries[start:end], ner_texts[start:end], query_matcher))
+            except Exception as e:
+                errors.append(e)
+            finally:
+                extracted_queue.put(_PIPELINE_DONE)
+        
+        if local_cache is None:
+            local_cache = {}
+        
+        def scoring_worker():
+            try:
+                while True:
+                    chunk = extracted_queue.get()
+                    if chunk is _PIPELINE_DONE:
+                        break
+                    if errors:
+                        continue  # drain so the NER thread never blocks on a full queue
+                    for entry, candidates, query_like in chunk:
+                        scored_queue.put(
+                            self._score_stage(entry, candidates, query_like, query_matcher, report_query, local_cache)
+                        )
+            except Exception as e:
+                errors.append(e)
+                while extracted_queue.get() is not _PIPELINE_DONE:
+                    pass
+            finally:
+                scored_queue.put(_PIPELINE_DONE)
+        
+        workers = [
+            threading.Thread(target=ner_worker, name="ner-stage", daemon=True),
+            threading.Thread(target=scoring_worker, name="scoring-stage", daemon=True)
+        ]
+        for worker in workers:
+            worker.start()
+        
+        # persistence stage: resolve category/source rows while the other stages are still running;
+        # ORM objects are built only after merging has finished (candidates may still change until then)
+        processed_pieces = []
+        try:
+            while True:
+                new_pieces = scored_queue.get()
+                if new_pieces is _PIPELINE_DONE:
+                    break
+                for piece in new_pieces:
+                    self._resolve_category_id(db, piece.category)
+                    self._resolve_source_id(db, piece.source)
+                processed_pieces.extend(new_pieces)
+        except Exception as e:
+            # stop upstream stages and unblock them before re-raising
+            errors.append(e)
+            while scored_queue.get() is not _PIPELINE_DONE:
+                pass
+        
+        for worker in workers:
+            worker.join()
+        if errors:
+            raise errors[0]
+        return processed_pieces
+
     # =============== Helper Functions ===============
 
     def _normalize_inputs(self, data):
@@ -220,14 +408,51 @@ class DataProcessingEngine:
                  normalized.append({'text': clean(text), 'source': item.get('link', 'Web Search')})
         return normalized
 
-    def _extract_candidates(self, text):
+    def _filter_ner_inputs(self, entries, query_matcher, report_id):
+        """Texts to run NER on: crawled web pages are reduced to sentences near a query mention."""
+        if not Config.SENTENCE_FILTER_ENABLED:
+            return [entry['text'] for entry in entries]
+        
+        sentence_filter = SentenceFilter(query_matcher, window=Config.SENTENCE_FILTER_WINDOW)
+        ner_texts = []
+        for entry in entries:
+            if sentence_filter and (entry['source'] or '').startswith('http') and 'facebook.com' not in entry['source']:
+                ner_texts.append(sentence_filter.filter(entry['text']))
+            else:
+                ner_texts.append(entry['text'])
+                
+        if sentence_filter.stats.entries:
+            print(f"[FILTER] Report {report_id}: {sentence_filter.stats}")
+        return ner_texts
+
+    def _extract_candidates(self, text, ner_results=None, ner_text=None):
+        """
+        Regex extractors scan the whole `text`; gazetteer and NER work on `ner_text`
+        (the query-focused part of it, defaults to the whole text). NER offsets refer to `ner_text`.
+        """
         candidates = [] 
         
+        if ner_text is None:
+            ner_text = text
+        
+        # 0. Gazetteer fast path: known locations/organizations get their category directly
+        # (method 'GAZETTEER' also skips the NER-only specificity check downstream)
+        known_mentions = self.gazetteer.tag(ner_text)
+        candidates.extend(known_mentions)
+        
         # A. NER Extraction
         try:
-            # 1. Raw NER
-            ner_results = self.ner_pipeline(text, grouped_entities=True) 
-            ner_results.sort(key=lambda x: x['start'])
+            # 1. Raw NER (precomputed in batch by the caller, or routed for this single text)
+            if ner_results is None:
+                ner_results = self.ner_router.run([ner_text])[0]
+            ner_results = sorted(ner_results, key=lambda x: x['start'])
+            
+            # spans already resolved by the gazetteer are not re-tagged by the model
+            if known_mentions:
+                ner_results = [
+                    ent for ent in ner_results
+                    if not any(ent['start'] < m['end'] and m['start'] < ent['end'] for m in known_mentions)
+                ]
 
             # 2. Merge Adjacent Persons
             merged_results = []
@@ -236,7 +461,7 @@ class DataProcessingEngine:
                 
                 for next_ent in ner_results[1:]:
                     
-                    gap = text[curr['end']:next_ent['start']]
+                    gap = ner_text[curr['end']:next_ent['start']]
 
                     if (curr['entity_group'] == 'PER' and next_ent['entity_group'] == 'PER' and 
                         gap in ['', ' ', '-']):
@@ -260,7 +485,7 @@ class DataProcessingEngine:
                 end_pos = entity['end']
                 
                 #  Check for cut-off words
-                suffix = text[end_pos:]
+                suffix = ner_text[end_pos:]
                 
                 #  matches continuous letters at the start of the suffix
                 continuation_match = re.match(r'^([a-zа-яёіїє]+)', suffix)
@@ -280,39 +505,41 @@ class DataProcessingEngine:
             pass
 
         # B. Regex Extraction
-         # 2. Emails
-        emails = re.findall(r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+', text)
+        # one size/time budget per text, shared by all patterns (clipped text, then nothing once exhausted)
+        budget = RegexBudget()
+        
+        # 2. Emails
+        emails = self.EMAIL_PATTERN.findall(text, budget)
         candidates.extend([{'word': email, 'category': 'Contact Information', 'method': 'REGEX'} for email in emails])
         
         # 3. Financial info (keywords or patterns like $1000, UAH, etc.)
-        financial = re.findall(r'\$\d+(?:,\d{3})*(?:\.\d{2})?|\b(?:UAH|EUR|USD|грн|долар|євро|euro|buck|dollar|$|€|£)\b', text)
+        financial = self.FINANCIAL_PATTERN.findall(text, budget)
         candidates.extend([{'word': fin, 'category': 'Financial Information', 'method': 'REGEX'} for fin in financial])
 
         # 4. Phone numbers (with extended cases support)
-        phones = re.findall(r'(?<!\d)(?:\+?\d{1,3}[ -]?)?\(?\d{2,3}\)?[ -]?\d{3}[ -]?\d{2,4}(?!\d)', text)
+        phones = self.PHONE_PATTERN.findall(text, budget)
         candidates.extend([{'word': m, 'category': 'Contact Information', 'method': 'REGEX'} for m in phones])
 
         # 5. Social media (usernames or links)
-        social = re.findall(r' @\S+', text)
+        social = self.SOCIAL_PATTERN.findall(text, budget)
         candidates.extend([{'word': item, 'category': 'Contact Information', 'method': 'REGEX'} for item in social])
         
         # 6. Professional titles (simple keyword match)
-        professions = ['CEO', 'founder', 'developer', 'manager', 'engineer', 'analyst', 'specialist', 'student']
-        for prof in professions:
-            if re.search(r'\b' + re.escape(prof) + r'\b', text, re.IGNORECASE):
+        for prof, pattern in self.PROFESSION_PATTERNS.items():
+            if pattern.search(text, budget):
                 candidates.append({'word': prof, 'category': 'Professional Details', 'method': 'REGEX'})
 
         # 7. Public statements (e.g., quotes or keywords like "said", "tweeted")
-        if re.search(r'\b(said|stated|tweeted|posted|commented)\b', text, re.IGNORECASE):
+        if self.STATEMENT_PATTERN.search(text, budget):
             candidates.append({'word': 'Public Statement', 'category': 'Public Statement', 'method': 'REGEX'})
 
         # 8. Other personal identifiers (passport, ID, etc. — extend as needed)
-        identifiers = re.findall(r'\bID[:\s]*\d+|passport[:\s]*\w+\d+', text, re.IGNORECASE)
+        identifiers = self.IDENTIFIER_PATTERN.findall(text, budget)
         candidates.extend([{'word': id_val, 'category': 'Personal Identifiers', 'method': 'REGEX'} for id_val in identifiers])
 
         return candidates
 
-    def _validate_rules(self, text, query, category):
+    def _validate_rules(self, text, query_matcher, category, query_like=None):
         # 1. Min length
         if len(text) < 3: return False
         
@@ -326,29 +553,12 @@ class DataProcessingEngine:
             # If it's mostly 0s or small numbers
             if text.strip() == "0": return False
 
-        # 4. Input Query Check (Rotation & Split)
-        if query:
-            q_lower = query.lower()
-            t_lower = text.lower()
-            
-            # A. Exact substring check
-            if t_lower in q_lower or q_lower in t_lower:
-                return False
-                
-            # B. Token subset check (Rotation check)
-            # If entity is "Andrii Matsev" and query is "Matsevytyi Andrii"
-            # We break both into sets of words/subwords and check overlap
-            q_tokens = set(re.findall(r'\w+', q_lower))
-            t_tokens = set(re.findall(r'\w+', t_lower))
-            
-            # If all significant tokens of the text are in the query, it's not new info
-            # e.g. text="Andrii", query="Andrii Matsevytyi" -> Skip
-            if t_tokens.issubset(q_tokens):
-                return False
-                
-            # C. Fuzzy Check
-            ratio = fuzz.ratio(t_lower, q_lower)
-            if ratio > 85: return False
+        # 4. Input Query Check (Substring, Rotation & Split, Fuzzy; incl. transliterated query)
+        # query_like may be precomputed in batch by QueryMatcher.query_like_mask
+        if query_like is None:
+            query_like = bool(query_matcher) and query_matcher.is_query_like(text)
+        if query_like:
+            return False
                 
         return True
 
@@ -377,6 +587,10 @@ class DataProcessingEngine:
                 
         return text
 
+    def _encode(self, *args, **kwargs):
+        """Sentence embedding on the shared inference pool (see utils/thread_budget.py)."""
+        return inference_pool.run(self.semantic_model.encode, *args, **kwargs)
+
     def _validate_entity_specificity(self, text: str, category: str) -> float:
         """
         (a) Specificity Score: Determines if an extracted entry is a specific named entity 
@@ -413,9 +627,9 @@ class DataProcessingEngine:
         pos_ref, neg_ref = refs.get(category, ('A specific named entity', 'A general category or noise'))
 
         # Encode all inputs
-        emb_text = self.semantic_model.encode(text, convert_to_tensor=True)
-        emb_pos = self.semantic_model.encode(pos_ref, convert_to_tensor=True)
-        emb_neg = self.semantic_model.encode(neg_ref, convert_to_tensor=True)
+        emb_text = self._encode(text, convert_to_tensor=True)
+        emb_pos = self._encode(pos_ref, convert_to_tensor=True)
+        emb_neg = self._encode(neg_ref, convert_to_tensor=True)
 
         # Calculate distances
         similarity_to_specific = float(util.cos_sim(emb_text, emb_pos).item())
@@ -466,13 +680,13 @@ class DataProcessingEngine:
         exclusion_scores = []
 
         # 2. Encode Inputs
-        emb_snippet = self.semantic_model.encode(snippet, convert_to_tensor=True)
+        emb_snippet = self._encode(snippet, convert_to_tensor=True)
         for attribution_ref in attribution_refs:
-            attribution_embs.append(self.semantic_model.encode(attribution_ref, convert_to_tensor=True))
+            attribution_embs.append(self._encode(attribution_ref, convert_to_tensor=True))
         for exclusion_ref in exclusion_refs:
-            exclusion_embs.append(self.semantic_model.encode(exclusion_ref, convert_to_tensor=True))
+            exclusion_embs.append(self._encode(exclusion_ref, convert_to_tensor=True))
 
-        emb_noise = self.semantic_model.encode(noise_ref, convert_to_tensor=True)
+        emb_noise = self._encode(noise_ref, convert_to_tensor=True)
 
         # 3. Calculate Similarities
         for emb_attr in attribution_embs:
@@ -504,8 +718,71 @@ class DataProcessingEngine:
 
         return max(0.0, min(final_score, 1.0))
 
-    def _create_information_piece(self, db, content, cat_name, source, report_id, score, snippet):
-        # Resolve Category
+    def _persist_candidates(self, db, candidates, report_id, report_query):
+        """
+        Converts final PieceCandidate records into InformationPiece rows and updates the corroboration
+        summary for them (added, not committed - both land in the caller's transaction).
+        """
+        pieces = []
+        for candidate in candidates:
+            piece = InformationPiece(
+                report_id=report_id,
+                source_id=self._resolve_source_id(db, candidate.source),
+                category_id=self._resolve_category_id(db, candidate.category),
+                relevance_score=candidate.relevance_score,
+                source=candidate.source,
+                content=candidate.content,
+                snippet=candidate.snippet,
+                created_at=candidate.created_at,
+                repetition_count=candidate.repetition_count
+            )
+            pieces.append(piece)
+            
+        if Config.PIECE_EMBEDDINGS_ENABLED and pieces:
+            # one batched encode for all survivors
+            for piece, vector in zip(pieces, self._embed_contents([c.content for c in candidates])):
+                piece.embedding = vector
+            
+        db.session.add_all(pieces)
+        record_occurrences(db, ((c.content, report_query, c.created_at) for c in candidates))
+        return pieces
+
+    def _update_merged_pieces(self, db, local_cache):
+        """
+        Writes pieces persisted by an earlier phase back to their rows (one bulk UPDATE). Later merges
+        change their occurrence count and may change their content (better casing), so every candidate
+        field is written: the rows end up as if the report had been processed in one go.
+        """
+        mappings = [
+            {
+                'id': candidate.piece_id,
+                'content': candidate.content,
+                'content_hash': blind_index(candidate.content),  # bulk updates skip the before_update hook
+                'snippet': candidate.snippet,
+                'category_id': self._resolve_category_id(db, candidate.category),
+                'relevance_score': candidate.relevance_score,
+                'repetition_count': candidate.repetition_count
+            }
+            for candidate in local_cache.values() if candidate.piece_id is not None
+        ]
+        if mappings:
+            db.session.bulk_update_mappings(InformationPiece, mappings)
+
+    def _embed_contents(self, contents):
+        """Normalized embeddings (lists of floats) for InformationPiece.embedding."""
+        if self.embedding_model is None:
+            if Config.PIECE_EMBEDDING_MODEL == Config.SEMANTIC_MODEL:
+                self.embedding_model = self.semantic_model
+            else:
+                print(f"[INIT] Loading Piece Embedding Model: {Config.PIECE_EMBEDDING_MODEL}")
+                self.embedding_model = SentenceTransformer(Config.PIECE_EMBEDDING_MODEL)
+        
+        vectors = inference_pool.run(
+            self.embedding_model.encode, contents, batch_size=64, normalize_embeddings=True, convert_to_numpy=True
+        )
+        return [vector.tolist() for vector in vectors]
+
+    def _resolve_category_id(self, db, cat_name):
         if cat_name not in self.categories_cache:
             cat = db.session.query(InformationCategory).filter_by(name=cat_name).first()
             if not cat:
@@ -513,28 +790,18 @@ class DataProcessingEngine:
                 db.session.add(cat)
                 db.session.commit()
             self.categories_cache[cat_name] = cat.id
-            
-        # Resolve Source
+        return self.categories_cache[cat_name]
+
+    def _resolve_source_id(self, db, source):
         discovered_from = "Social Media" if "facebook.com" in (source or "") else "Web Data"
-        src = db.session.query(DiscoverSource).filter_by(name=discovered_from).first()
-        if not src:
-            src = DiscoverSource(name=discovered_from)
-            db.session.add(src)
-            db.session.commit()
-
-        piece = InformationPiece(
-            report_id=report_id,
-            source_id=src.id,
-            category_id=self.categories_cache[cat_name],
-            relevance_score=score,
-            source=source,
-            content=content,
-            snippet=snippet[:500],
-            created_at=datetime.utcnow(),
-            repetition_count=1
-        )
-        db.session.add(piece)
-        return piece
+        if discovered_from not in self.sources_cache:
+            src = db.session.query(DiscoverSource).filter_by(name=discovered_from).first()
+            if not src:
+                src = DiscoverSource(name=discovered_from)
+                db.session.add(src)
+                db.session.commit()
+            self.sources_cache[discovered_from] = src.id
+        return self.sources_cache[discovered_from]
 
 # Singleton Instance
 from models import db
@@ -1,7 +1,12 @@
+import re
 import math
+import numpy as np
 from datetime import datetime, timezone
-from sqlalchemy import func
-from backend.models import InformationPiece, InformationCategory, Report
+from sqlalchemy import func, case, text, bindparam
+from backend.models import InformationPiece, InformationCategory, Report, ContentCorroboration
+from backend.utils.blind_index import blind_index
+from backend.utils.corroboration import query_key
+from backend.utils.config import Config
 
 class RiskAssessmentEngine:
     """
@@ -9,21 +14,14 @@ class RiskAssessmentEngine:
     Flow: Context Relevance -> Word Risk -> Validation -> Recency -> Impact -> Total Risk.
     """
 
-    # Constants
-    ALPHA = 0.7  # Weighting factor for relevance
-    LAMBDA_DECAY = 0.15  # Decay constant for recency
+    # Constants (model parameters live in cfg.yaml)
+    ALPHA = Config.RISK_ALPHA  # Weighting factor for relevance
+    LAMBDA_DECAY = Config.RISK_LAMBDA_DECAY  # Decay constant for recency
     EPSILON = 1e-9  # Prevent division by zero
+    
+    VALIDATION_CHUNK_SIZE = 500  # contents per grouped corroboration query (bounded IN list)
 
-    IMPACT_SCORES = {
-        "Financial Information": 1.0,
-        "Personal Identifiers": 1.0,
-        "Contact Information": 0.9,
-        "Location Data": 0.9,
-        "Social Connections": 0.5,
-        "Professional Details": 0.5,
-        "Public Statements": 0.5,
-        "Uncategorized": 0.5
-    }
+    IMPACT_SCORES = Config.RISK_IMPACT_SCORES
 
     RISK_KEYWORDS = [
         # Status
@@ -34,6 +32,33 @@ class RiskAssessmentEngine:
         'confidential', 'restricted', 'sensitive', 'private', 'internal_use'
     ]
 
+    # one pass over the text for all keywords (plain substring semantics, like `w in text`)
+    RISK_KEYWORDS_RE = re.compile('|'.join(re.escape(w) for w in RISK_KEYWORDS))
+
+    # kNN corroboration: for every distinct content of the batch, its nearest stored pieces by embedding
+    # (HNSW index on information_piece.embedding), counted per same/other query above the threshold.
+    # Cached copies of reports (cached_from) are skipped, their pieces are the source report's.
+    EMBEDDING_CORROBORATION_SQL = text("""
+        SELECT q.content_hash,
+               SUM(CASE WHEN n.user_query = :query THEN 1 ELSE 0 END) AS supporting,
+               SUM(CASE WHEN n.user_query <> :query THEN 1 ELSE 0 END) AS contradicting
+        FROM (
+            SELECT DISTINCT ON (content_hash) content_hash, embedding
+            FROM information_piece
+            WHERE content_hash IN :keys AND embedding IS NOT NULL
+        ) AS q
+        CROSS JOIN LATERAL (
+            SELECT r.user_query, ip.embedding <=> q.embedding AS distance
+            FROM information_piece ip
+            JOIN report r ON r.report_id = ip.report_id
+            WHERE ip.embedding IS NOT NULL AND r.cached_from IS NULL
+            ORDER BY ip.embedding <=> q.embedding
+            LIMIT :neighbours
+        ) AS n
+        WHERE n.distance <= :max_distance
+        GROUP BY q.content_hash
+    """).bindparams(bindparam('keys', expanding=True))
+
     def __init__(self, db):
         self.db = db
 
@@ -42,120 +67,270 @@ class RiskAssessmentEngine:
         Main pipeline processing a list of InformationPiece objects.
         Returns: (processed_pieces, risk_values_list)
         """
-        risk_values = []
-        processed = []
-        
-        # Cache category names for performance
-        cat_map = {c.id: c.name for c in self.db.session.query(InformationCategory).all()}
-
-        for piece in information_pieces:
-            
-            # 1. Relevance Score (Context + Word-based)
-            s_relevance = self._calculate_relevance(piece)
-            
-            # 2. Validation Score (Corroboration)
-            s_validation = self._calculate_validation(piece, current_query_text=current_query_text)
-            
-            # 3. Recency Score (Time Decay)
-            s_recency = self._calculate_recency(piece)
-            
-            # 4. Likelihood Calculation
-            # Formula: (S_rel + S_val + S_rec) / 3
-            r_likelihood = (s_relevance + s_validation + s_recency) / 3.0
-            
-            # 5. Impact Score
-            cat_name = cat_map.get(piece.category_id, "Uncategorized")
-            r_impact = self.IMPACT_SCORES.get(cat_name, 0.5)
-            
-            # 6. Total Risk Calculation
-            # Formula: R_impact * R_likelihood * 10
-            r_total = r_impact * r_likelihood * 10.0
-            
-            # Clamp to (0, 10] range
-            r_total = max(0.1, min(r_total, 10.0))
-            
-            print(f"ID: {piece.content}, Relevance: {s_relevance:.2f}, Validation: {s_validation:.2f}, Recency: {s_recency:.2f}, Likelihood: {r_likelihood:.2f}, Impact: {r_impact:.2f}, Total Risk: {r_total:.2f}")
-            
-            # Update Object
+        if not information_pieces:
+            return [], []
+
+        risk_scores, risk_levels = self.score(information_pieces, current_query_text)
+
+        # Update Objects
+        for piece, r_total, level in zip(information_pieces, risk_scores.tolist(), risk_levels.tolist()):
             piece.risk_score = r_total
-            piece.risk_level = self._get_label(r_total)
-            
-            risk_values.append(r_total)
-            processed.append(piece)
-            
-        return processed, risk_values
+            piece.risk_level = level
+
+        print(f"[RISK] Scored {len(information_pieces)} pieces, mean {risk_scores.mean():.2f}, "
+              f"high {int((risk_levels == 'high').sum())}, medium {int((risk_levels == 'medium').sum())}")
+
+        return list(information_pieces), risk_scores.tolist()
+
+    def score(self, pieces, current_query_text, cat_map=None) -> tuple:
+        """
+        Vectorized risk model over a batch of pieces. Pieces only need the attributes content, snippet,
+        relevance_score, category_id, created_at and content_hash, so ORM objects and query rows both work.
+        Returns: (risk_scores float array, risk_levels str array), nothing is written back.
+        """
+        # Cache category names for performance
+        if cat_map is None:
+            cat_map = {c.id: c.name for c in self.db.session.query(InformationCategory).all()}
+        
+        # Corroboration counts and earliest occurrences for all pieces at once
+        if Config.RISK_VALIDATION_MODE == 'embedding':
+            # approximate matching: near-duplicate / translated contents corroborate each other too,
+            # exact-content lookups are only needed for recency
+            corroboration = self._embedding_corroboration(pieces, current_query_text)
+            if Config.RISK_CORROBORATION_SOURCE == 'summary':
+                earliest = self._summary_earliest(pieces, current_query_text)
+            else:
+                earliest = self._earliest_occurrences(pieces, current_query_text)
+        elif Config.RISK_CORROBORATION_SOURCE == 'summary':
+            corroboration, earliest = self._summary_lookup(pieces, current_query_text)
+        else:
+            corroboration = self._corroboration_counts(pieces, current_query_text)
+            earliest = self._earliest_occurrences(pieces, current_query_text)
+
+        # 1. Relevance Score (Context + Word-based)
+        s_relevance = self._calculate_relevance(pieces)
+
+        # 2. Validation Score (Corroboration)
+        s_validation = self._calculate_validation(pieces, corroboration)
+
+        # 3. Recency Score (Time Decay)
+        s_recency = self._calculate_recency(pieces, earliest)
+
+        # 4. Likelihood Calculation
+        # Formula: (S_rel + S_val + S_rec) / 3
+        r_likelihood = (s_relevance + s_validation + s_recency) / 3.0
 
-    def _calculate_relevance(self, piece) -> float:
+        # 5. Impact Score
+        r_impact = np.array([
+            self.IMPACT_SCORES.get(cat_map.get(piece.category_id, "Uncategorized"), 0.5) for piece in pieces
+        ], dtype=float)
+
+        # 6. Total Risk Calculation
+        # Formula: R_impact * R_likelihood * 10
+        r_total = r_impact * r_likelihood * 10.0
+
+        # Clamp to (0, 10] range
+        r_total = np.clip(r_total, 0.1, 10.0)
+
+        return r_total, self._get_labels(r_total)
+
+    def _calculate_relevance(self, pieces) -> np.ndarray:
         """
         S_relevance = (1 - alpha) * S_word + alpha * CosineSimilarity
         """
         # S_word: 1 if containing flag words, 0 otherwise
-        text = (piece.content or "") + " " + (piece.snippet or "")
-        text_lower = text.lower()
-        
-        s_word = 0.0
-        if any(w in text_lower for w in self.RISK_KEYWORDS):
-            s_word = 1.0
-            
+        s_word = np.array([
+            1.0 if self.RISK_KEYWORDS_RE.search(((piece.content or "") + " " + (piece.snippet or "")).lower()) else 0.0
+            for piece in pieces
+        ])
+
         # Cosine Similarity is to be pre-calculated in 'relevance_score' during Data Processing (Vector Embedding step). Default to 0.5 if missing.
-        cosine_sim = piece.relevance_score if piece.relevance_score is not None else 0.5
-        
+        cosine_sim = np.array([
+            piece.relevance_score if piece.relevance_score is not None else 0.5 for piece in pieces
+        ], dtype=float)
+
         return (1 - self.ALPHA) * s_word + self.ALPHA * cosine_sim
 
-    def _calculate_validation(self, piece, current_query_text) -> float:
+    @staticmethod
+    def _content_key(piece):
+        # pieces loaded from the DB already carry the blind index, fresh objects may not be flushed yet
+        return piece.content_hash or blind_index(piece.content)
+
+    def _summary_lookup(self, pieces, current_query_text) -> tuple:
+        """
+        Reads validation counts and earliest occurrences from the ContentCorroboration summary table.
+        Returns ({content_hash: (supporting, contradicting)}, {content_hash: earliest datetime}),
+        the same shapes as _corroboration_counts / _earliest_occurrences, with one indexed lookup.
+        """
+        keys = list({key for key in map(self._content_key, pieces) if key})
+        current_key = query_key(current_query_text)
+        same_query = ContentCorroboration.query_key == current_key
+        counts, earliest = {}, {}
+
+        for i in range(0, len(keys), self.VALIDATION_CHUNK_SIZE):
+            chunk = keys[i:i + self.VALIDATION_CHUNK_SIZE]
+            rows = self.db.session.query(
+                    ContentCorroboration.content_hash,
+                    func.sum(case((same_query, ContentCorroboration.occurrence_count), else_=0)),
+                    func.sum(case((same_query, 0), else_=ContentCorroboration.occurrence_count)),
+                    func.min(case((same_query, ContentCorroboration.first_seen)))
+                )\
+                .filter(ContentCorroboration.content_hash.in_(chunk))\
+                .group_by(ContentCorroboration.content_hash)\
+                .all()
+
+            for content_hash, supporting, contradicting, first_seen in rows:
+                counts[content_hash] = (int(supporting or 0), int(contradicting or 0))
+                if first_seen:
+                    earliest[content_hash] = first_seen
+
+        return counts, earliest
+
+    def _summary_earliest(self, pieces, current_query_text) -> dict:
+        """
+        Returns {content_hash: earliest first_seen} for the current query from the summary table,
+        the recency half of _summary_lookup (used when validation counts come from embeddings).
+        """
+        keys = list({key for key in map(self._content_key, pieces) if key})
+        earliest = {}
+
+        for i in range(0, len(keys), self.VALIDATION_CHUNK_SIZE):
+            chunk = keys[i:i + self.VALIDATION_CHUNK_SIZE]
+            rows = self.db.session.query(ContentCorroboration.content_hash, ContentCorroboration.first_seen)\
+                .filter(ContentCorroboration.content_hash.in_(chunk))\
+                .filter(ContentCorroboration.query_key == query_key(current_query_text))\
+                .all()
+
+            earliest.update(rows)
+
+        return earliest
+
+    def _embedding_corroboration(self, pieces, current_query_text) -> dict:
+        """
+        Returns {content_hash: (supporting, contradicting)} counted among the EMBEDDING_NEIGHBOURS nearest
+        stored pieces with cosine similarity >= EMBEDDING_MATCH_THRESHOLD. One kNN (LATERAL) query per
+        VALIDATION_CHUNK_SIZE distinct contents. PostgreSQL + pgvector only.
+        """
+        keys = list({key for key in map(self._content_key, pieces) if key})
+        counts = {}
+
+        for i in range(0, len(keys), self.VALIDATION_CHUNK_SIZE):
+            rows = self.db.session.execute(self.EMBEDDING_CORROBORATION_SQL, {
+                'keys': keys[i:i + self.VALIDATION_CHUNK_SIZE],
+                'query': current_query_text,
+                'neighbours': Config.EMBEDDING_NEIGHBOURS,
+                'max_distance': 1.0 - Config.EMBEDDING_MATCH_THRESHOLD,
+            }).all()
+
+            for content_hash, supporting, contradicting in rows:
+                counts[content_hash] = (int(supporting or 0), int(contradicting or 0))
+
+        return counts
+
+    def _corroboration_counts(self, pieces, current_query_text) -> dict:
+        """
+        Returns {content_hash: (supporting, contradicting)} - the number of stored pieces with the
+        same content found for the same query vs. for other queries, not counting cached copies of
+        reports. One grouped aggregate query per VALIDATION_CHUNK_SIZE distinct contents, matched
+        through the indexed blind index column.
+        """
+        keys = list({key for key in map(self._content_key, pieces) if key})
+        counts = {}
+
+        for i in range(0, len(keys), self.VALIDATION_CHUNK_SIZE):
+            chunk = keys[i:i + self.VALIDATION_CHUNK_SIZE]
+            rows = self.db.session.query(
+                    InformationPiece.content_hash,
+                    func.sum(case((Report.user_query == current_query_text, 1), else_=0)),
+                    func.sum(case((Report.user_query != current_query_text, 1), else_=0))
+                )\
+                .join(Report, InformationPiece.report_id == Report.report_id)\
+                .filter(InformationPiece.content_hash.in_(chunk))\
+                .filter(Report.cached_from.is_(None))\
+                .group_by(InformationPiece.content_hash)\
+                .all()
+
+            for content_hash, supporting, contradicting in rows:
+                counts[content_hash] = (int(supporting or 0), int(contradicting or 0))
+
+        return counts
+
+    def _calculate_validation(self, pieces, corroboration) -> np.ndarray:
         """
         S_validation = Sum(W_supporting) / (Sum(W_supporting) + Sum(W_contradicting) + epsilon)
         """
-        
-        sum_w_supporting = self.db.session.query(InformationPiece)\
-            .join(Report, InformationPiece.report_id == Report.report_id)\
-            .filter(InformationPiece.content == piece.content)\
-            .filter(Report.user_query == current_query_text)\
-            .count()
-            
-        sum_w_supporting += 1
-        
-        sum_w_contradicting = self.db.session.query(InformationPiece)\
-            .join(Report, InformationPiece.report_id == Report.report_id)\
-            .filter(InformationPiece.content == piece.content)\
-            .filter(Report.user_query != current_query_text)\
-            .count()
-            
-        print("query: ", current_query_text, "sum_w_supporting: ", sum_w_supporting, "sum_w_contradicting: ", sum_w_contradicting)
-        
+        counts = np.array([corroboration.get(self._content_key(piece), (0, 0)) for piece in pieces], dtype=float)
+        counts = counts.reshape(len(pieces), 2)
+
+        sum_w_supporting = counts[:, 0] + 1
+        sum_w_contradicting = counts[:, 1]
+
         return sum_w_supporting / (sum_w_supporting + sum_w_contradicting + self.EPSILON)
 
-    def _calculate_recency(self, piece) -> float:
-        """
-        S_recency = e^(-lambda * T_diff)
-        """
-        if not piece.created_at:
-            return 0.5
-            
-        # Calculate months elapsed
-        current_query_text = piece.report.user_query
-
-        earliest_occurrence = self.db.session.query(InformationPiece)\
-            .join(Report, InformationPiece.report_id == Report.report_id)\
-            .filter(InformationPiece.content == piece.content)\
-            .filter(Report.user_query == current_query_text)\
-            .order_by(InformationPiece.created_at.asc())\
-            .first()
-            
-        if earliest_occurrence:
-            earliest_date = earliest_occurrence.created_at
-        else:
-            # If nothing found in DB (unlikely if 'piece' is saved), use current
-            earliest_date = piece.created_at
-            
-        now = datetime.now(timezone.utc).replace(tzinfo=None) 
-        delta = now - earliest_date
+    def _earliest_occurrences(self, pieces, current_query_text) -> dict:
+        """
+        Returns {content_hash: earliest created_at} over all stored pieces with the same content
+        found for the current query. One MIN() GROUP BY query per VALIDATION_CHUNK_SIZE contents.
+        """
+        keys = list({key for key in map(self._content_key, pieces) if key})
+        earliest = {}
 
-        t_diff = delta.days / 30.0
+        for i in range(0, len(keys), self.VALIDATION_CHUNK_SIZE):
+            chunk = keys[i:i + self.VALIDATION_CHUNK_SIZE]
+            rows = self.db.session.query(InformationPiece.content_hash, func.min(InformationPiece.created_at))\
+                .join(Report, InformationPiece.report_id == Report.report_id)\
+                .filter(InformationPiece.content_hash.in_(chunk))\
+                .filter(Report.cached_from.is_(None))\
+                .filter(Report.user_query == current_query_text)\
+                .group_by(InformationPiece.content_hash)\
+                .all()
+
+            earliest.update({content_hash: created_at for content_hash, created_at in rows if created_at})
+
+        return earliest
+
+    def _calculate_recency(self, pieces, earliest_occurrences) -> np.ndarray:
+        """
+        S_recency = e^(-lambda * T_diff), T_diff in months (whole days / 30) since the earliest occurrence.
+        Pieces without created_at get a neutral 0.5.
+        """
+        scores = np.full(len(pieces), 0.5)
+        dated = [i for i, piece in enumerate(pieces) if piece.created_at]
+        if not dated:
+            return scores
+
+        # If nothing found in DB (unlikely if 'piece' is saved), use the piece's own timestamp
+        earliest_dates = np.array(
+            [earliest_occurrences.get(self._content_key(pieces[i]), pieces[i].created_at) for i in dated],
+            dtype='datetime64[us]'
+        )
+
+        now = np.datetime64(datetime.now(timezone.utc).replace(tzinfo=None), 'us')
+        days = (now - earliest_dates) // np.timedelta64(1, 'D')
+
+        t_diff = days / 30.0
         
-        return math.exp(-self.LAMBDA_DECAY * t_diff)
+        scores[dated] = np.exp(-self.LAMBDA_DECAY * t_diff)
+        return scores
+
+    @staticmethod
+    def summarize_report_risk(risk_scores) -> tuple:
+        """
+        Report-wide risk from piece scores: (overall score = mean of the top 20% scores, {"high", "medium", "low"} counts).
+        """
+        scores = np.asarray([s for s in risk_scores if s is not None], dtype=float)
+        risk_counts = {
+            "high": int((scores >= 7).sum()),
+            "medium": int(((scores >= 4) & (scores < 7)).sum()),
+            "low": int((scores < 4).sum())
+        }
+        if not scores.size:
+            return 0.0, risk_counts
+
+        # how many items make up the top 20% (minimum 1)
+        top_count = max(1, math.ceil(scores.size * 0.20))
+        top_slice = np.sort(scores)[::-1][:top_count]
+        return float(top_slice.mean()), risk_counts
 
-    def _get_label(self, score):
-        if score >= 7.0: return "high"
-        if score >= 4.0: return "medium"
-        return "low"
\ No newline at end of file
+    def _get_labels(self, scores: np.ndarray) -> np.ndarray:
+        return np.select([scores >= 7.0, scores >= 4.0], ["high", "medium"], default="low")
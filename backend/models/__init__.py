@@ -1,7 +1,11 @@
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import event, inspect
 from datetime import datetime
 
-from backend.utils.AES256_encrypted_type import EncryptedString
+from backend.utils.AES256_encrypted_type import EncryptedString, EncryptedCompressedJSON
+from backend.utils.blind_index import blind_index
+from backend.utils.vector_type import Vector
+from backend.utils.config import Config
 
 import json
 
@@ -31,6 +35,12 @@ class Report(db.Model):
     user_query = db.Column(db.Text, nullable=False)
     status = db.Column(db.String(20), default='pending')
     generated_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    # result cache key: blind index of the normalized query + the sources the report was generated from
+    query_key = db.Column(db.String(64), nullable=True, index=True)
+    use_general = db.Column(db.Boolean, nullable=True)
+    use_facebook = db.Column(db.Boolean, nullable=True)
+    cached_from = db.Column(db.String(50), nullable=True)  # report this one was copied from (report_cache_mode: clone)
     generation_time_seconds = db.Column(db.Integer, default=45.0)
     overall_risk_score = db.Column(db.Float, default=0.0)
     
@@ -53,6 +63,7 @@ class Report(db.Model):
             'query': self.user_query,
             'generated_at': self.generated_at.isoformat() + 'Z',
             'status': self.status,
+            'cached_from': self.cached_from,
             'overall_risk_score': round(self.overall_risk_score, 2),
             'executive_summary': self.executive_summary,
             'risk_distribution': json.loads(self.risk_distribution) if self.risk_distribution and self.risk_distribution != "null" else {},
@@ -87,6 +98,8 @@ class InformationPiece(db.Model):
     
     source = db.Column(db.Text, nullable=False)
     content = db.Column(EncryptedString, nullable=False)
+    content_hash = db.Column(db.String(64), nullable=True, index=True)  # blind index of content, see utils/blind_index.py
+    embedding = db.Column(Vector(Config.PIECE_EMBEDDING_DIMENSIONS), nullable=True)  # content embedding, pgvector (HNSW index)
     
     relevance_score = db.Column(db.Float, nullable=True) # because is added later
     risk_score = db.Column(db.Float, nullable=True)
@@ -119,6 +132,79 @@ class InformationPiece(db.Model):
             'risk_score': self.risk_score
         }
 
+@event.listens_for(InformationPiece, 'before_insert')
+def _set_content_hash(mapper, connection, target):
+    target.content_hash = blind_index(target.content)
+
+@event.listens_for(InformationPiece, 'before_update')
+def _update_content_hash(mapper, connection, target):
+    # risk scoring updates pieces too, only rehash when the content itself changed
+    if inspect(target).attrs.content.history.has_changes():
+        target.content_hash = blind_index(target.content)
+
+
+class ContentCorroboration(db.Model):
+    """
+    Occurrence summary per (content blind index, query blind index), maintained in the same
+    transaction that inserts InformationPiece rows. Lets risk scoring look up corroboration
+    without scanning the whole InformationPiece history.
+    """
+    __table_args__ = (db.UniqueConstraint('content_hash', 'query_key', name='uq_content_corroboration_key'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False)
+    query_key = db.Column(db.String(64), nullable=False)
+    occurrence_count = db.Column(db.Integer, nullable=False, default=0)
+    first_seen = db.Column(db.DateTime, nullable=False)
+    last_seen = db.Column(db.DateTime, nullable=False, index=True)
+
+
+class ReportJob(db.Model):
+    """
+    Durable report generation job (report_queue_backend: database). Claimed by report workers on any
+    node with SELECT ... FOR UPDATE SKIP LOCKED and held through a lease the worker keeps extending
+    by heartbeat; a job whose lease expired (worker died) is claimed again.
+    """
+    __table_args__ = (db.Index('ix_report_job_claim', 'status', 'priority', 'available_at'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    report_id = db.Column(db.String(50), db.ForeignKey('report.report_id', ondelete='CASCADE'), unique=True, nullable=False)
+    user_email = db.Column(db.String(120), nullable=False, index=True)
+    use_general = db.Column(db.Boolean, nullable=False, default=True)
+    use_facebook = db.Column(db.Boolean, nullable=False, default=False)
+    priority = db.Column(db.Integer, nullable=False, default=1)  # 0 = admin, claimed first
+
+    status = db.Column(db.String(20), nullable=False, default='queued')  # queued | running | completed | failed | cancelled
+    stage = db.Column(db.String(20), nullable=True)  # pipeline stage reported by the worker's heartbeat
+    cancel_requested = db.Column(db.Boolean, nullable=False, default=False)  # set by the API, the running worker stops
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    max_attempts = db.Column(db.Integer, nullable=False, default=3)
+    available_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)  # retry backoff
+
+    lease_owner = db.Column(db.String(100), nullable=True)
+    lease_expires_at = db.Column(db.DateTime, nullable=True)
+    heartbeat_at = db.Column(db.DateTime, nullable=True)
+    last_error = db.Column(db.Text, nullable=True)
+
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+
+class ReportCheckpoint(db.Model):
+    """
+    Output of a completed report pipeline stage (collected raw data, extracted piece ids, risk scores),
+    so a failed report resumes from its last stage instead of scraping again. Removed once the
+    report completes, or by the retention job.
+    """
+    __table_args__ = (db.UniqueConstraint('report_id', 'stage', name='uq_report_checkpoint_stage'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    report_id = db.Column(db.String(50), db.ForeignKey('report.report_id', ondelete='CASCADE'), nullable=False, index=True)
+    stage = db.Column(db.String(20), nullable=False)  # collected | extracted | scored
+    payload = db.Column(EncryptedCompressedJSON, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, index=True)
+
+
 class InformationCategory(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
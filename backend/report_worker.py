@@ -0,0 +1,52 @@
+import sys
+import os
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__))))
+
+import argparse
+
+from flask import Flask
+
+from backend.utils.config import Config
+from backend.utils.schema_upgrades import prepare_database, apply_schema_upgrades
+from backend.utils.thread_budget import apply_thread_budget
+
+# must run before the services below import torch/transformers
+apply_thread_budget()
+
+from models import db
+from services import ReportService, FacebookAuthService
+from backend.utils.report_queue import ReportWorker
+
+# Report worker node for report_queue_backend: database.
+# Claims ReportJob rows inserted by the API (any number of nodes / processes), e.g.
+#     python -m backend.report_worker --concurrency 2
+
+
+def create_worker_app():
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+
+    with app.app_context():
+        prepare_database(db)
+        db.create_all()
+        apply_schema_upgrades(db)
+
+    return app
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Run queued report generation jobs")
+    parser.add_argument('--concurrency', type=int, default=Config.REPORT_WORKERS, help="reports generated at the same time")
+    parser.add_argument('--once', action='store_true', help="run a single job (if any) and exit")
+    args = parser.parse_args()
+
+    app = create_worker_app()
+    worker = ReportWorker(app, db, ReportService(db), FacebookAuthService(db))
+
+    if args.once:
+        with app.app_context():
+            worker.run_once()
+    else:
+        worker.run_forever(concurrency=args.concurrency)
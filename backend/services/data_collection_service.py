@@ -1,7 +1,10 @@
 import os
 import sys
+import time
 import threading
-from queue import Queue
+from concurrent.futures import ThreadPoolExecutor, wait
+from contextlib import contextmanager
+from queue import Queue, Empty
 
 from backend.services.internal.facebook_scraping_service import FacebookScrapingService
 
@@ -11,57 +14,138 @@ sys.path.append(models_path)
 from backend.services.internal.web_scraping_service import web_scraping_service_singletone
 from backend.wrappers.google_search_api_wrapper import search
 from backend.services.internal.facebook_scraping_service import FacebookScrapingService
+from backend.utils.config import Config
+from backend.utils.cancellation import CancellationToken, ReportCancelled
 import os
 import json
 
 class DataCollectionService:
+    # shared by all reports of the process: bounded scraping threads and Selenium browsers
+    _collection_pool = ThreadPoolExecutor(max_workers=Config.COLLECTION_WORKERS, thread_name_prefix='collect')
+    _browser_slots = threading.BoundedSemaphore(Config.COLLECTION_MAX_BROWSERS)
+    
     def __init__(self):
         self._lock = threading.Lock()
          
          
-    def collect_data(self, search_request, fb_cookies=None, use_general=True, use_facebook=True):
+    def collect_data(self, search_request, fb_cookies=None, use_general=True, use_facebook=True, on_preview=None,
+                     cancel_token=None):
+        """
+        Runs all collectors and returns their results.
+        
+        on_preview(preview_data): called on the calling thread as soon as the fast sources are in
+        (Google snippets, Facebook search text, or whatever arrived within report_preview_wait_seconds)
+        while the deep crawl continues. The returned data then holds only what the preview did not
+        already cover: crawled pages and Facebook profiles.
         
+        cancel_token: collectors stop between URLs / scrolls once it is cancelled, open browsers are
+        closed and ReportCancelled is raised here.
+        """
+        cancel_token = cancel_token or CancellationToken()
         results = Queue() 
-        threads = []
-
+        preview = Queue() if on_preview else None
+        tasks = []
 
-        if use_facebook:
-            threads.append(threading.Thread(target=self._facebook_profiles, args=(search_request, results, fb_cookies)))
-            threads.append(threading.Thread(target=self._facebook_search, args=(search_request, results, fb_cookies)))
-        
+        # fast sources first, they feed the preview
         if use_general:
-            threads.append(threading.Thread(target=self._general_scraping, args=(search_request, results)))
-
-
-        for thread in threads:
-            thread.start()
-
-        for thread in threads:
-            thread.join()
+            tasks.append(self._collection_pool.submit(self._general_scraping, search_request, results, preview, cancel_token))
+        
+        if use_facebook:
+            tasks.append(self._collection_pool.submit(self._facebook_search, search_request, results, fb_cookies, preview, cancel_token))
+            tasks.append(self._collection_pool.submit(self._facebook_profiles, search_request, results, fb_cookies, cancel_token))
+
+        if preview is not None:
+            self._deliver_preview(preview, use_general + use_facebook, on_preview, cancel_token)
+
+        # wait in short slices so a cancel is noticed while the collectors wind down
+        pending = set(tasks)
+        while pending:
+            cancel_token.raise_if_cancelled()
+            done, pending = wait(pending, timeout=0.5)
+            for task in done:
+                try:
+                    task.result()
+                except ReportCancelled:
+                    pass
+                except Exception as e:
+                    print(f"[COLLECT] Collector failed: {e}")
+        cancel_token.raise_if_cancelled()
             
         results = list(results.queue)
+        
+        # fast sources that missed the preview deadline are processed with the deep results
+        if preview is not None:
+            results.extend(item for item in preview.queue if item)
 
         return results
     
     # helper functions
     
-    def _general_scraping(self, search_request, results):
+    def _deliver_preview(self, preview, expected, on_preview, cancel_token):
+        """Waits (bounded) for each fast source to report in, then hands what arrived to on_preview."""
+        deadline = time.monotonic() + Config.REPORT_PREVIEW_WAIT_SECONDS
+        preview_data = []
+        received = 0
+        while received < expected:
+            cancel_token.raise_if_cancelled()
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                print("[PREVIEW] Wait for fast sources timed out, previewing what arrived")
+                break
+            try:
+                item = preview.get(timeout=min(0.5, remaining))
+            except Empty:
+                continue
+            received += 1
+            if item:
+                preview_data.append(item)
+        
+        cancel_token.raise_if_cancelled()
+        if preview_data:
+            on_preview(preview_data)
+    
+    @contextmanager
+    def _browser_slot(self, cancel_token):
+        """One of the collection_max_browsers slots; gives up waiting for it once the report is cancelled."""
+        while not self._browser_slots.acquire(timeout=0.5):
+            cancel_token.raise_if_cancelled()
+        try:
+            yield
+        finally:
+            self._browser_slots.release()
+    
+    def _general_scraping(self, search_request, results, preview, cancel_token):
         
         print("Running general-purpose scraping...")
         
         links_to_be_scraped = []
         answer_links = []
-            
-        temp_links = search(search_request, num_results=100)
+        
+        try:
+            temp_links = search(search_request, num_results=100)
+        except Exception:
+            if preview is not None:
+                preview.put(None)  # don't keep the preview waiting for this source
+            raise
         
         for link in temp_links:
             link["bm25_filter"] = search_request
+        
+        if preview is not None:
+            # search snippets are the preview, the crawl below deepens them
+            preview.put([
+                {'link': link['link'], 'title': link.get('title'), 'valuable_text': link['snippet']}
+                for link in temp_links
+            ])
             
         links_to_be_scraped += temp_links        
                     
         for link in links_to_be_scraped:
-            valuable_text = web_scraping_service_singletone.smart_parse_website(link["link"], search_request)
+            cancel_token.raise_if_cancelled()
+            valuable_text = web_scraping_service_singletone.smart_parse_website(link["link"], search_request, cancel_token)
             if valuable_text is None:
+                if preview is not None:
+                    continue  # nothing beyond the snippet the preview already used
                 link["valuable_text"] = link["snippet"]
             else:
                 link["valuable_text"] = valuable_text
@@ -73,28 +157,41 @@ class DataCollectionService:
         results.put(answer_links)
     
     
-    def _facebook_profiles(self, search_request, results, cookies):
+    def _facebook_profiles(self, search_request, results, cookies, cancel_token):
         print("Scraping Facebook search results...")
-        fb_engine = FacebookScrapingService(headless=False)
-        try:
-            fb_engine.search_and_scrape_profiles_background(search_request=search_request, results=results, cookies=cookies)
-        finally:
+        with self._browser_slot(cancel_token):
+            fb_engine = FacebookScrapingService(headless=False, cancel_token=cancel_token)
             try:
-                fb_engine.close()
-            except Exception:
-                pass
+                # a cancel quits the browser right away, interrupting a page load in progress
+                with cancel_token.callback(fb_engine.close):
+                    fb_engine.search_and_scrape_profiles_background(search_request=search_request, results=results, cookies=cookies)
+            finally:
+                try:
+                    fb_engine.close()
+                except Exception:
+                    pass
 
     
-    def _facebook_search(self, search_request, results, cookies):
+    def _facebook_search(self, search_request, results, cookies, preview, cancel_token):
         print("Scraping Facebook search results...")
-        fb_engine = FacebookScrapingService(headless=False)
+        # search text is fast, with a preview it goes there instead of into the deep results
+        target = Queue() if preview is not None else results
+        fb_engine = None
         try:
-            fb_engine.search_request_background(search_request=search_request, results=results, cookies=cookies)
+            with self._browser_slot(cancel_token):
+                try:
+                    fb_engine = FacebookScrapingService(headless=False, cancel_token=cancel_token)
+                    with cancel_token.callback(fb_engine.close):
+                        fb_engine.search_request_background(search_request=search_request, results=target, cookies=cookies)
+                finally:
+                    try:
+                        if fb_engine:
+                            fb_engine.close()
+                    except Exception:
+                        pass
         finally:
-            try:
-                fb_engine.close()
-            except Exception:
-                pass
+            if preview is not None:
+                preview.put(list(target.queue)[0] if not target.empty() else None)
     
 
 # usage example
@@ -12,22 +12,26 @@ import json
 import os
 import sys
 
+from backend.utils.cancellation import CancellationToken, ReportCancelled
+
 # Standardize path imports
 sys.path.append(os.path.abspath(os.path.dirname(__file__)))
 
 class FacebookScrapingService:
     
-    def __init__(self, remote_url=None, headless=True):
+    def __init__(self, remote_url=None, headless=True, cancel_token=None):
         """
         :param remote_url: URL of the Selenium Grid (e.g., 'http://selenium-chrome:4444/wd/hub')
                            If None, it tries to read env var 'SELENIUM_REMOTE_URL'.
                            If still None, it falls back to Local ChromeDriver.
         :param headless: Run without UI (ignored if running Remote, as Remote is always headless)
+        :param cancel_token: CancellationToken of the report, checked between scrolls / profiles
         """
        
         remote_url = "http://localhost:4444/wd/hub"
         self.remote_url = remote_url or os.getenv('SELENIUM_REMOTE_URL')  # Execution Mode (Docker main and Local is fallback)
         self.headless = headless
+        self.cancel_token = cancel_token or CancellationToken()
         
         self.cookies = []
         self.scraper = self._prepare_scraper()
@@ -46,7 +50,11 @@ class FacebookScrapingService:
             facebook_data = self.search_request(query=search_request, amount_of_posts=20)
             results.put(facebook_data)
         except Exception as e:
-            print(f"Error in search thread: {e}")
+            # a cancel also closes the browser under us, whatever Selenium raised then is expected
+            if self.cancel_token.cancelled:
+                print("[CANCEL] Facebook search stopped")
+            else:
+                print(f"Error in search thread: {e}")
 
     def search_and_scrape_profiles_background(self, search_request, results: Queue, cookies, profiles_max=10):
         print(f"[{'REMOTE' if self.remote_url else 'LOCAL'}] Obtaining Facebook profiles...")
@@ -60,11 +68,15 @@ class FacebookScrapingService:
             user_profiles = self.obtain_profiles(search_request)
             user_profiles = user_profiles[:profiles_max]
             for profile in user_profiles:
+                self.cancel_token.raise_if_cancelled()
                 print("Scraping Facebook profile:", profile)
                 profile_data = self.search_profile(profile, amount_of_posts=20)
                 results.put(profile_data)
         except Exception as e:
-            print(f"Error in profile thread: {e}")
+            if self.cancel_token.cancelled:
+                print("[CANCEL] Facebook profile scraping stopped")
+            else:
+                print(f"Error in profile thread: {e}")
     
     # simple sequential wrappers        
     def search_profile(self, profile_url, amount_of_posts=50, human=True):
@@ -80,7 +92,7 @@ class FacebookScrapingService:
         
         # Scroll once to ensure lazy loading triggers
         self.scraper.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        time.sleep(2)
+        self.cancel_token.wait(2)
 
         soup = BeautifulSoup(self.scraper.page_source, 'html.parser')
         links = []
@@ -200,7 +212,7 @@ class FacebookScrapingService:
 
         # 3. NOW navigate to the actual target
         self.scraper.get(target_url)
-        time.sleep(3)
+        self.cancel_token.wait(3)
         
         # 4. Check if we are stuck on a login page
         if "login" in self.scraper.current_url or "privacy/consent" in self.scraper.current_url:
@@ -210,7 +222,9 @@ class FacebookScrapingService:
                 btns = self.scraper.find_elements(By.XPATH, "//span[contains(text(), 'Allow')] | //span[contains(text(), 'Decline')]")
                 if btns:
                     btns[0].click()
-                    time.sleep(2)
+                    self.cancel_token.wait(2)
+            except ReportCancelled:
+                raise
             except:
                 pass
 
@@ -236,6 +250,8 @@ class FacebookScrapingService:
         consecutive_scroll_fails = 0
         
         while len(collected_posts) < amount_of_posts:
+            self.cancel_token.raise_if_cancelled()
+            
             # 1. SCRAPE CURRENT VIEWPORT
             soup = BeautifulSoup(self.scraper.page_source, 'html.parser')
             
@@ -260,7 +276,7 @@ class FacebookScrapingService:
             # 2. SCROLL DOWN
             pause = random.uniform(2.0, 3.5) if human else 1.5
             self.scraper.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-            time.sleep(pause)
+            self.cancel_token.wait(pause)  # returns early (raises) once the report is cancelled
 
             # 3. CHECK IF NEW CONTENT LOADED
             new_height = self.scraper.execute_script("return document.body.scrollHeight")
@@ -271,9 +287,9 @@ class FacebookScrapingService:
                 
                 # Try jiggling the scroll to trigger lazy loading
                 self.scraper.execute_script("window.scrollBy(0, -300);")
-                time.sleep(1)
+                self.cancel_token.wait(1)
                 self.scraper.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-                time.sleep(2)
+                self.cancel_token.wait(2)
                 
                 new_height = self.scraper.execute_script("return document.body.scrollHeight")
                 
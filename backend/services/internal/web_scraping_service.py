@@ -6,6 +6,7 @@ from crawl4ai.markdown_generation_strategy import DefaultMarkdownGenerator
 import re
 
 from backend.utils.config import Config
+from backend.utils.cancellation import CancellationToken, ReportCancelled
 
 class WebScrapingService:
     
@@ -26,7 +27,7 @@ class WebScrapingService:
     
     # ====================== Public API ======================
         
-    def smart_parse_website(self, url, user_query):
+    def smart_parse_website(self, url, user_query, cancel_token=None):
         
         """
         This function takes a URL and a user query, parses the website with AI (using the crawler service),
@@ -37,9 +38,11 @@ class WebScrapingService:
         - fit: a list of strings, each representing a "fit" of the user query to the website text.
 
         If the user query is not found in the website text, the function returns None.
+        
+        A cancelled `cancel_token` aborts the crawl in progress (ReportCancelled is raised).
         """
         
-        raw, fit = self._get_markdown(url, user_query)
+        raw, fit = self._get_markdown(url, user_query, cancel_token=cancel_token)
         if not fit:
             fit = raw
         elif len(fit) < 5*self.min_word_threshold:
@@ -88,7 +91,7 @@ class WebScrapingService:
 
         return result
         
-    def _get_markdown(self, url, user_query, enable_cache=False):
+    def _get_markdown(self, url, user_query, enable_cache=False, cancel_token=None):
         """
         Run either fetch_markdown or fetch_multiple_markdown, depending on whether
         the argument `url` is a list or not. This is a convenience function to allow
@@ -96,6 +99,8 @@ class WebScrapingService:
 
         Args:
             user_query (str): The query to BM25 filter the results with.
+            cancel_token (CancellationToken): cancelling it cancels the crawl task, which
+                closes the crawler's browser on the way out.
 
         Returns:
             tuple: A tuple of two elements. The first element is a list of raw markdown
@@ -109,22 +114,31 @@ class WebScrapingService:
         else:
             used_func_alias = self._fetch_markdown
         
-        loop = asyncio.new_event_loop()
+        cancel_token = cancel_token or CancellationToken()
+        cancel_token.raise_if_cancelled()
         
-        return loop.run_until_complete(
-            used_func_alias(url, user_query, enable_cache)
-            )
+        loop = asyncio.new_event_loop()
+        task = loop.create_task(used_func_alias(url, user_query, enable_cache, cancel_token=cancel_token))
+        try:
+            with cancel_token.callback(lambda: loop.call_soon_threadsafe(task.cancel)):
+                return loop.run_until_complete(task)
+        except asyncio.CancelledError:
+            raise ReportCancelled(f"Crawl of {url} cancelled")
+        finally:
+            loop.close()
         
     
     # ====================== Private API ======================    
 
-    async def _fetch_markdown(self, url: str, user_query, enable_cache=False):
+    async def _fetch_markdown(self, url: str, user_query, enable_cache=False, cancel_token=None):
         # Try primary BM25 threshold first, then fallback thresholds (adaptive)
         thresholds = [self.primary_bm25_threshold, self.fallback_bm25_threshold]
 
         async with AsyncWebCrawler(config=self.browser_config) as crawler:
             last_err = None
             for i, th in enumerate(thresholds):
+                if cancel_token:
+                    cancel_token.raise_if_cancelled()
                 run_config = CrawlerRunConfig(
                     cache_mode=CacheMode.ENABLED if enable_cache else CacheMode.DISABLED,
                     markdown_generator=DefaultMarkdownGenerator(
@@ -186,7 +200,7 @@ class WebScrapingService:
             print(f"[ERROR] Exception while crawling {url}: {last_err}")
             return None, None
 
-    async def _fetch_multiple_markdown(self, urls: list, user_query, enable_cache=False):
+    async def _fetch_multiple_markdown(self, urls: list, user_query, enable_cache=False, cancel_token=None):
         
         
         run_config = CrawlerRunConfig(
@@ -218,6 +232,8 @@ class WebScrapingService:
 
             # For any entry that is missing or too short, run the single-url fallback fetch
             for idx, res in enumerate(normalized):
+                if cancel_token:
+                    cancel_token.raise_if_cancelled()
                 url = urls[idx]
                 if res is None:
                     # fallback to single fetch which has adaptive fallback
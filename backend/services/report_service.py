@@ -1,17 +1,24 @@
 from backend.models import User, Report, SearchHistory, InformationPiece,  DiscoverSource, InformationCategory
 from backend.services.data_collection_service import DataCollectionService
 
-from sqlalchemy import func
+from sqlalchemy import func, inspect, insert, literal, select
 
 from backend.engines.risk_assessment_engine import RiskAssessmentEngine
 from backend.engines.data_processing_engine import data_processing_engine
+from backend.utils.config import Config
+from backend.utils.report_jobs import report_progress, report_events, REPORT_STAGES, FINISHED_STAGES
+from backend.utils.cancellation import CancellationToken, ReportCancelled
+from backend.utils.corroboration import query_key, remove_occurrences
+from backend.utils.report_queue import ReportJobQueue
+from backend.utils.report_checkpoints import load_checkpoints, save_checkpoint, clear_checkpoints
+from backend.utils.report_summary import generate_executive_summary, generate_recommendations
 import math
 
 
 
 from typing import List
 
-from datetime import datetime
+from datetime import datetime, timedelta
 import json, random
 
 class ReportService:
@@ -19,32 +26,242 @@ class ReportService:
         self.db = db
         self.data_collection = DataCollectionService()
         self.risk_engine = RiskAssessmentEngine(db)
+        self.job_queue = ReportJobQueue(db)
 
     def create_report(self, user_email, query, fb_cookies=None, use_facebook=False, use_general=True):
+        """Generates a report synchronously in the calling thread (start_report + run_report)."""
+        report_id = self.start_report(user_email, query, use_general=use_general, use_facebook=use_facebook)
+        return self.run_report(report_id, query, fb_cookies=fb_cookies, use_facebook=use_facebook, use_general=use_general)
+
+    def start_report(self, user_email, query, use_general=True, use_facebook=False):
+        """
+        Creates the Report row (status "processing") and returns its id; the pipeline itself runs in run_report.
+        
+        Raises:
+            ValueError: If user not found
+        """
         user = self.db.session.query(User).filter_by(email=user_email).first()
-        report_id = self._init_report(user.id, query)
+        if not user:
+            raise ValueError('User not found.')
+        return self._init_report(user.id, query, use_general, use_facebook)
 
-        # 1. Data Collection
-        raw_data = self.data_collection.collect_data(query, fb_cookies=fb_cookies, use_facebook=use_facebook, use_general=use_general)
-       # raw_data = [['Hello, I am Andrew, 20 y.o., IT and sportsman, no bad habits. This summer I am having Mitacs internship in Carleton university. I am searching for furnished (!) accommodation from June 30th to September 25th. June 30th to August 31st also works. Looking for 700-800 CAD per month.Feel free to reach me in instagram @frean_090 or on email amatsevytyi@icloud.com', 'Hello, I am Andrew, 20 y.o., IT and sportsman, no bad habits. This summer I am having Mitacs internship in Carleton university. I am searching for furnished (!) accommodation from June 30th to September 25th. June 30th to August 31st also works. Looking for 700-800 CAD per month.Feel free to reach me in instagram @frean_090 or on email amatsevytyi@icloud.com', 'Hello, I am Andrew, 20 y.o., IT and sportsman, no bad habits. This summer I am having Mitacs internship in Carleton university. I am searching for furnished (!) accommodation from June 30th to September 25th. June 30th to August 31st also works. Looking for 700-800 CAD per month.Feel free to reach me in instagram @frean_090 or on email amatsevytyi@icloud.com'], ['З днем народження!', 'З Днем народження!', 'Have a great birthday!'], ['З днем народження!', 'З Днем народження!', 'Have a great birthday!'], [], [{'title': 'CSC Hackathon 2023. Як це було. « Hackathon Expert Group', 'link': 'https://www.hackathon.expert/csc-hackathon-2023-report/', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'Щодо задачі з визначення міри подібності зображень, яку надала компанія ЛУН – перемогла командаCringe Minimizers(Антон Бражний, Андрій Мацевитий , Артем Орловський та Віталій Бутко, студенти Київського політехнічного інституту імені Ігоря Сікорського, Українського католицького університету у Львові та Вільнюского університету).Саме вони утримували першу позицію у приватному лідерборді практично від початку змагання. Разом з тим, ще дві команди,Team GARCH(Андрій Єрко, Андрій Шевцов, Нікіта Фордуі, Софія Шапошнікова, що також не вперше беруть участь у наших хакатонах) та вже згаданаSarcastic AI теж запропонували досить цікаві рішення, розділивши першу позицію з переможцями на публічному лідерборді.'}, {'title': 'Інститут проблем машинобудування імені А. М. Підгорного НАН ...', 'link': 'https://uk.wikipedia.org/wiki/%D0%86%D0%BD%D1%81%D1%82%D0%B8%D1%82%D1%83%D1%82_%D0%BF%D1%80%D0%BE%D0%B1%D0%BB%D0%B5%D0%BC_%D0%BC%D0%B0%D1%88%D0%B8%D0%BD%D0%BE%D0%B1%D1%83%D0%B4%D1%83%D0%B2%D0%B0%D0%BD%D0%BD%D1%8F_%D1%96%D0%BC%D0%B5%D0%BD%D1%96_%D0%90._%D0%9C._%D0%9F%D1%96%D0%B4%D0%B3%D0%BE%D1%80%D0%BD%D0%BE%D0%B3%D0%BE_%D0%9D%D0%90%D0%9D_%D0%A3%D0%BA%D1%80%D0%B0%D1%97%D0%BD%D0%B8', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': ' Юрій Мацевитий, Андрій Русанов, Віктор Соловей, Микола Шульженко, Володимир Голощапов, Павло Гонтаровський, Андрій Костіков, Вадим Цибулько за роботу «Підвищення енергоефективності роботи турбоустановок ТЕС і ТЕЦ шляхом модернізації, реконструкції та удосконалення режимів їхньої експлуатації» отрималиДержавну премію України в галузі науки і техніки 2008 року "Лауреати Державної премії України в галузі науки і техніки \\(2008\\)").'}, {'title': 'Члени Академії – Інститут енергетичних машин і систем ім. А.М ...', 'link': 'https://ipmach.kharkov.ua/%D1%87%D0%BB%D0%B5%D0%BD%D0%B8-%D0%B0%D0%BA%D0%B0%D0%B4%D0%B5%D0%BC%D1%96%D1%97/', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'КОСТІКОВ Андрій Олегович · КРАВЧЕНКО Олег Вікторович · МАЦЕВИТИЙ Юрій Михайлович · ПІДГОРНИЙ Анатолій Миколайович · ПРОСКУРА Георгій Федорович · РВАЧОВ\xa0...'}, {'title': 'Наша гордість - Спеціалізована школа І -ІІІ ступенів №251 імені ...', 'link': 'http://school251.edukit.kiev.ua/nasha_gordistj/', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'І. 42. ІІ, Мацевитий Андрій, Українська мова, 4-В, Герасимчук Л.І. 43. ІІІ, Мацевитий Андрій, Англійська мова, 4-В, Ільєнко Т.В. Переможці міського етапу\xa0...'}, {'title': 'Інститут енергетичних машин і систем ім. А. М. Підгорного', 'link': 'https://www.nas.gov.ua/institutions/institut-energeticnix-masin-i-sistem-im-a-m-pidgornogo-131', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'Русанов Андрій Вікторович. академік НАН України. Радник при дирекції. Мацевитий Юрій Михайлович. академік НАН України. Заступник директора з наукової роботи.'}, {'title': 'освітній ступінь бакалавр факультет інформатики спеціальність ...', 'link': 'https://www.ukma.edu.ua/index.php/about-us/sogodennya/dokumenty-naukma/doc_download/3927-fakultet-informatyky', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'Мацевитий Андрій Володимирович. 79.98. 26. Пілат Михайло Іванович. 79.87. 27. Молчанов Олексій Костянтинович. 78.38. 28. Нестерук Олена Олександрівна. 77.91. 29\xa0...'}, {'title': '03534570 — ІЕМС НАН України', 'link': 'https://opendatabot.ua/c/03534570', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'Переглянути повну інформацію про юридичну особу ІНСТИТУТ ЕНЕРГЕТИЧНИХ МАШИН І СИСТЕМ ІМ. А. М. ПІДГОРНОГО НАЦІОНАЛЬНОЇ АКАДЕМІЇ НАУК УКРАЇНИ. Компанія ІЕМС НАН України зареєстрована — 10.05.1993. Керівник компанії — Русанов Андрій Вікторович. Юрідична адреса компанії ІЕМС НАН України: Україна, 61046, Харківська обл., місто Харків, вул.Комунальників, будинок 2/10. Основний КВЕД юридичної особи — 71.20 Технічні випробування та дослідження. Номер свідоцтва про реєстрацію платника податку на додану вартість - 035345720371. За 2020 ІЕМС НАН України отримала виторг на суму 37 105 783 ₴ гривень'}, {'title': 'Відділення енергетики та енергетичних технологій НАН України', 'link': 'https://www.nas.gov.ua/structure/section-physical-technical-mathematical-sciences/department-energy-and-energy-technologies', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'Жаркін Андрій Федорович. академік НАН України. Кириленко Олександр Васильович. академік НАН України. Кулик Михайло Миколайович. академік НАН України. Мацевитий\xa0...'}, {'title': 'Інститут енергетичних машин і систем ім. А. М. Підгорного НАН ...', 'link': 'https://old.nas.gov.ua/UA//Org/Pages/default.aspx?OrgID=0000299', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'Мацевитий Юрій Михайлович. Почесний директор. Matsevity@nas.gov.ua. +38 0572 94 55 14. Русанов Андрій Вікторович. Директор. Rusanov.A.V@nas.gov.ua. +\xa0...'}, {'title': 'Лікар Васильцов Ігор Анатолійович, записатися на онлайн ...', 'link': 'https://e-likari.com.ua/doctor/vasilcov-igor-anatoliiovic/', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'Дякую! Волик Андрій. (5). 05.01.2025. Вдячний лікарю за консультацію ... Мацевитий Ернест Валерійович. (5). 10.04.2025. Анонімний відгук. (4). 09.04.2025.'}]]
+    def find_cached_report(self, user_email, query, use_general=True, use_facebook=False):
+        """
+        The user's most recent completed report for the same normalized query and sources, generated
+        within report_cache_ttl_seconds. Copies made by the cache are not candidates, so a cached result
+        never outlives the TTL of the report it came from. None on a miss.
+        """
+        if Config.REPORT_CACHE_TTL_SECONDS <= 0:
+            return None
+        cutoff = datetime.utcnow() - timedelta(seconds=Config.REPORT_CACHE_TTL_SECONDS)
+        return self.db.session.query(Report).join(User, User.id == Report.user_id).filter(
+            User.email == user_email,
+            Report.query_key == query_key(query),
+            Report.use_general == bool(use_general),
+            Report.use_facebook == bool(use_facebook),
+            Report.status == 'completed',
+            Report.cached_from.is_(None),
+            Report.generated_at >= cutoff
+        ).order_by(Report.generated_at.desc()).first()
+
+    def use_cached_report(self, user_email, query, use_general=True, use_facebook=False):
+        """
+        Answers a search from the result cache: returns the cached report's id (report_cache_mode: reuse)
+        or the id of a copy of it (clone), after recording the search in the history. None on a miss.
+        """
+        cached = self.find_cached_report(user_email, query, use_general, use_facebook)
+        if cached is None:
+            return None
         
+        if Config.REPORT_CACHE_MODE == 'clone':
+            report_id = self._clone_report(cached)
+        else:
+            report_id = cached.report_id
+        
+        # same person searched again: reuse the score of the original search instead of running NER again
+        cached_misuse_score = self.db.session.query(SearchHistory.local_misuse_score)\
+            .filter_by(report_id=cached.report_id)\
+            .order_by(SearchHistory.id)\
+            .limit(1)\
+            .scalar()
+        self._record_search(cached.user_id, query, report_id, local_misuse_score=cached_misuse_score)
+        self.db.session.commit()
+        
+        print(f"[CACHE] Search answered from report {cached.report_id}" + (f" (copy {report_id})" if report_id != cached.report_id else ""))
+        return report_id
+
+    def run_report(self, report_id, query, fb_cookies=None, use_facebook=False, use_general=True, cancel_token=None):
+        """
+        Collection -> processing -> risk -> final JSON for a report created by start_report.
+        Stages are published to report_progress; on errors the report is marked "failed" and the error re-raised.
+        Once cancel_token is cancelled the pipeline stops at its next check, the report is marked "cancelled"
+        (checkpoints are kept, so a retry resumes) and ReportCancelled is raised.
+        """
+        try:
+            return self._run_pipeline(report_id, query, fb_cookies, use_facebook, use_general,
+                                      cancel_token or CancellationToken())
+        except ReportCancelled:
+            self.db.session.rollback()
+            self.mark_cancelled(report_id)
+            raise
+        except Exception:
+            self.db.session.rollback()
+            self.mark_failed(report_id)
+            raise
+
+    def mark_failed(self, report_id):
+        report = self._get_report(report_id)
+        if report:
+            report.status = "failed"
+            self.db.session.commit()
+
+    def mark_cancelled(self, report_id):
+        self.db.session.query(Report).filter_by(report_id=report_id).update({'status': 'cancelled'}, synchronize_session=False)
+        self.db.session.commit()
+
+    def reset_status(self, report_id):
+        """Back to "processing" for a retry (pieces and checkpoints are kept)."""
+        self.db.session.query(Report).filter_by(report_id=report_id).update({'status': 'processing'}, synchronize_session=False)
+        self.db.session.commit()
+
+    def get_report_query(self, report_id):
+        return self.db.session.query(Report.user_query).filter_by(report_id=report_id).scalar()
+
+    def get_report_sources(self, report_id):
+        """(use_general, use_facebook) the report was requested with, (None, None) for reports older than these columns."""
+        return self.db.session.query(Report.use_general, Report.use_facebook).filter_by(report_id=report_id).one()
+
+    def _run_pipeline(self, report_id, query, fb_cookies, use_facebook, use_general, cancel_token):
+        report = self._get_report(report_id)
+        user = report.user
+        
+        # a failed earlier attempt resumes after its last completed stage instead of scraping again
+        checkpoints = load_checkpoints(self.db, report_id)
+        if checkpoints:
+            print(f"[CHECKPOINT] Report {report_id}: resuming after {', '.join(checkpoints)}")
+        
+        if 'extracted' in checkpoints:
+            pieces = self._load_pieces(report_id, checkpoints['extracted'])
+            self._publish_findings(report_id, pieces)
+        else:
+            # pieces of a failed attempt that never got its extraction checkpoint
+            self.reset_report(report_id)
+            
+            # merge cache shared by the preview and the deep phase, so the deep crawl merges into preview rows
+            local_cache = {}
+            
+            if 'collected' in checkpoints:
+                raw_data = checkpoints['collected']
+            else:
+                previewed = []
+                
+                def on_preview(preview_data):
+                    # 1b. Preliminary report from search snippets / Facebook search text while the crawl continues
+                    previewed.extend(preview_data)
+                    self._extract_phase(report_id, query, preview_data, local_cache, cancel_token, publish_stages=False)
+                    preview_pieces, scores = self._score_phase(report_id, query, publish_stages=False)
+                    preview = self._generate_final_json(report_id, preview_pieces, user, query, preview=True)
+                    report_events.publish(report_id, 'preview', {
+                        **{k: v for k, v in preview.items() if k != 'detailed_findings'}, 'scores': scores
+                    })
+                    report_progress.update(report_id, 'preview')
+                    print(f"[PREVIEW] Report {report_id}: {len(preview_pieces)} pieces from snippets")
+                
+                # 1. Data Collection
+                report_progress.update(report_id, 'collecting')
+                raw_data = self.data_collection.collect_data(
+                    query, fb_cookies=fb_cookies, use_facebook=use_facebook, use_general=use_general,
+                    on_preview=on_preview if Config.REPORT_PREVIEW_ENABLED else None,
+                    cancel_token=cancel_token
+                )
+       # raw_data = [['Hello, I am Andrew, 20 y.o., IT and sportsman, no bad habits. This summer I am having Mitacs internship in Carleton university. I am searching for furnished (!) accommodation from June 30th to September 25th. June 30th to August 31st also works. Looking for 700-800 CAD per month.Feel free to reach me in instagram @frean_090 or on email amatsevytyi@icloud.com', 'Hello, I am Andrew, 20 y.o., IT and sportsman, no bad habits. This summer I am having Mitacs internship in Carleton university. I am searching for furnished (!) accommodation from June 30th to September 25th. June 30th to August 31st also works. Looking for 700-800 CAD per month.Feel free to reach me in instagram @frean_090 or on email amatsevytyi@icloud.com', 'Hello, I am Andrew, 20 y.o., IT and sportsman, no bad habits. This summer I am having Mitacs internship in Carleton university. I am searching for furnished (!) accommodation from June 30th to September 25th. June 30th to August 31st also works. Looking for 700-800 CAD per month.Feel free to reach me in instagram @frean_090 or on email amatsevytyi@icloud.com'], ['З днем народження!', 'З Днем народження!', 'Have a great birthday!'], ['З днем народження!', 'З Днем народження!', 'Have a great birthday!'], [], [{'title': 'CSC Hackathon 2023. Як це було. « Hackathon Expert Group', 'link': 'https://www.hackathon.expert/csc-hackathon-2023-report/', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'Щодо задачі з визначення міри подібності зображень, яку надала компанія ЛУН – перемогла командаCringe Minimizers(Антон Бражний, Андрій Мацевитий , Артем Орловський та Віталій Бутко, студенти Київського політехнічного інституту імені Ігоря Сікорського, Українського католицького університету у Львові та Вільнюского університету).Саме вони утримували першу позицію у приватному лідерборді практично від початку змагання. Разом з тим, ще дві команди,Team GARCH(Андрій Єрко, Андрій Шевцов, Нікіта Фордуі, Софія Шапошнікова, що також не вперше беруть участь у наших хакатонах) та вже згаданаSarcastic AI теж запропонували досить цікаві рішення, розділивши першу позицію з переможцями на публічному лідерборді.'}, {'title': 'Інститут проблем машинобудування імені А. М. Підгорного НАН ...', 'link': 'https://uk.wikipedia.org/wiki/%D0%86%D0%BD%D1%81%D1%82%D0%B8%D1%82%D1%83%D1%82_%D0%BF%D1%80%D0%BE%D0%B1%D0%BB%D0%B5%D0%BC_%D0%BC%D0%B0%D1%88%D0%B8%D0%BD%D0%BE%D0%B1%D1%83%D0%B4%D1%83%D0%B2%D0%B0%D0%BD%D0%BD%D1%8F_%D1%96%D0%BC%D0%B5%D0%BD%D1%96_%D0%90._%D0%9C._%D0%9F%D1%96%D0%B4%D0%B3%D0%BE%D1%80%D0%BD%D0%BE%D0%B3%D0%BE_%D0%9D%D0%90%D0%9D_%D0%A3%D0%BA%D1%80%D0%B0%D1%97%D0%BD%D0%B8', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': ' Юрій Мацевитий, Андрій Русанов, Віктор Соловей, Микола Шульженко, Володимир Голощапов, Павло Гонтаровський, Андрій Костіков, Вадим Цибулько за роботу «Підвищення енергоефективності роботи турбоустановок ТЕС і ТЕЦ шляхом модернізації, реконструкції та удосконалення режимів їхньої експлуатації» отрималиДержавну премію України в галузі науки і техніки 2008 року "Лауреати Державної премії України в галузі науки і техніки \\(2008\\)").'}, {'title': 'Члени Академії – Інститут енергетичних машин і систем ім. А.М ...', 'link': 'https://ipmach.kharkov.ua/%D1%87%D0%BB%D0%B5%D0%BD%D0%B8-%D0%B0%D0%BA%D0%B0%D0%B4%D0%B5%D0%BC%D1%96%D1%97/', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'КОСТІКОВ Андрій Олегович · КРАВЧЕНКО Олег Вікторович · МАЦЕВИТИЙ Юрій Михайлович · ПІДГОРНИЙ Анатолій Миколайович · ПРОСКУРА Георгій Федорович · РВАЧОВ\xa0...'}, {'title': 'Наша гордість - Спеціалізована школа І -ІІІ ступенів №251 імені ...', 'link': 'http://school251.edukit.kiev.ua/nasha_gordistj/', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'І. 42. ІІ, Мацевитий Андрій, Українська мова, 4-В, Герасимчук Л.І. 43. ІІІ, Мацевитий Андрій, Англійська мова, 4-В, Ільєнко Т.В. Переможці міського етапу\xa0...'}, {'title': 'Інститут енергетичних машин і систем ім. А. М. Підгорного', 'link': 'https://www.nas.gov.ua/institutions/institut-energeticnix-masin-i-sistem-im-a-m-pidgornogo-131', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'Русанов Андрій Вікторович. академік НАН України. Радник при дирекції. Мацевитий Юрій Михайлович. академік НАН України. Заступник директора з наукової роботи.'}, {'title': 'освітній ступінь бакалавр факультет інформатики спеціальність ...', 'link': 'https://www.ukma.edu.ua/index.php/about-us/sogodennya/dokumenty-naukma/doc_download/3927-fakultet-informatyky', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'Мацевитий Андрій Володимирович. 79.98. 26. Пілат Михайло Іванович. 79.87. 27. Молчанов Олексій Костянтинович. 78.38. 28. Нестерук Олена Олександрівна. 77.91. 29\xa0...'}, {'title': '03534570 — ІЕМС НАН України', 'link': 'https://opendatabot.ua/c/03534570', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'Переглянути повну інформацію про юридичну особу ІНСТИТУТ ЕНЕРГЕТИЧНИХ МАШИН І СИСТЕМ ІМ. А. М. ПІДГОРНОГО НАЦІОНАЛЬНОЇ АКАДЕМІЇ НАУК УКРАЇНИ. Компанія ІЕМС НАН України зареєстрована — 10.05.1993. Керівник компанії — Русанов Андрій Вікторович. Юрідична адреса компанії ІЕМС НАН України: Україна, 61046, Харківська обл., місто Харків, вул.Комунальників, будинок 2/10. Основний КВЕД юридичної особи — 71.20 Технічні випробування та дослідження. Номер свідоцтва про реєстрацію платника податку на додану вартість - 035345720371. За 2020 ІЕМС НАН України отримала виторг на суму 37 105 783 ₴ гривень'}, {'title': 'Відділення енергетики та енергетичних технологій НАН України', 'link': 'https://www.nas.gov.ua/structure/section-physical-technical-mathematical-sciences/department-energy-and-energy-technologies', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'Жаркін Андрій Федорович. академік НАН України. Кириленко Олександр Васильович. академік НАН України. Кулик Михайло Миколайович. академік НАН України. Мацевитий\xa0...'}, {'title': 'Інститут енергетичних машин і систем ім. А. М. Підгорного НАН ...', 'link': 'https://old.nas.gov.ua/UA//Org/Pages/default.aspx?OrgID=0000299', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'Мацевитий Юрій Михайлович. Почесний директор. Matsevity@nas.gov.ua. +38 0572 94 55 14. Русанов Андрій Вікторович. Директор. Rusanov.A.V@nas.gov.ua. +\xa0...'}, {'title': 'Лікар Васильцов Ігор Анатолійович, записатися на онлайн ...', 'link': 'https://e-likari.com.ua/doctor/vasilcov-igor-anatoliiovic/', 'bm25_filter': 'Андрій Мацевитий', 'valuable_text': 'Дякую! Волик Андрій. (5). 05.01.2025. Вдячний лікарю за консультацію ... Мацевитий Ернест Валерійович. (5). 10.04.2025. Анонімний відгук. (4). 09.04.2025.'}]]
+                
+                save_checkpoint(self.db, report_id, 'collected', previewed + raw_data)
+            
+            # 2. Data Processing (deep results merged into the preview)
+            self._extract_phase(report_id, query, raw_data, local_cache, cancel_token)
+            pieces = self._reload_pieces(report_id)
+            save_checkpoint(self.db, report_id, 'extracted', [piece.id for piece in pieces])
+
+        # 3. Risk Assessment
+        cancel_token.raise_if_cancelled()
+        if 'scored' in checkpoints:
+            scores = checkpoints['scored']
+            self._apply_scores(pieces, scores)
+        else:
+            pieces, scores = self._score_phase(report_id, query, pieces)
+            save_checkpoint(self.db, report_id, 'scored', scores)
 
-        # 2. Data Processing
-        info_pieces = data_processing_engine.process_raw_data(
+        # 4. Generate Report
+        cancel_token.raise_if_cancelled()
+        report_progress.update(report_id, 'finalizing')
+        jsona = self._generate_final_json(report_id, pieces, user, query)
+        clear_checkpoints(self.db, report_id)
+        
+        # findings were already streamed one by one as they were persisted, their scores come with the summary
+        report_events.publish(report_id, 'summary', {
+            **{k: v for k, v in jsona.items() if k != 'detailed_findings'}, 'scores': scores
+        })
+        return jsona
+
+    def _extract_phase(self, report_id, query, raw_data, local_cache, cancel_token, publish_stages=True):
+        """
+        Extraction for one batch of collected data; new pieces are committed, earlier ones merged into.
+        New pieces are streamed as soon as they are committed (not scored yet).
+        """
+        if publish_stages:
+            report_progress.update(report_id, 'extracting')
+        new_pieces = data_processing_engine.process_raw_data(
             data_list=raw_data,
             report_id=report_id,
             report_query=query,
-            db=self.db
+            db=self.db,
+            local_cache=local_cache,
+            cancel_token=cancel_token
         )
-        
-        # 3. Risk Assessment (New Engine)
-        processed, risk_values = self.risk_engine.process_risk_assessment(info_pieces, query)
-        
+        self._publish_findings(report_id, new_pieces)
+        return new_pieces
+
+    def _publish_findings(self, report_id, pieces):
+        # the commit expired the pieces: reload them with one SELECT (identity is known without loading)
+        piece_ids = [inspect(piece).identity[0] for piece in pieces]
+        if not piece_ids:
+            return
+        for piece in self.db.session.query(InformationPiece).filter(InformationPiece.id.in_(piece_ids)).order_by(InformationPiece.id):
+            report_events.publish(report_id, 'finding', piece.to_dict())
+
+    def _score_phase(self, report_id, query, pieces=None, publish_stages=True):
+        """
+        Risk scoring of all pieces of the report (new occurrences change the corroboration of earlier
+        ones). Returns the scored pieces and their [id, risk_score, risk_level] rows, which are sent
+        with the preview/summary event and stored in the 'scored' checkpoint.
+        """
+        if publish_stages:
+            report_progress.update(report_id, 'scoring')
+        if pieces is None:
+            pieces = self._reload_pieces(report_id)
+        self.risk_engine.process_risk_assessment(pieces, query)
+        
+        # read before the commit expires the pieces
+        scores = [[piece.id, piece.risk_score, piece.risk_level] for piece in pieces]
         self.db.session.commit()
+        return pieces, scores
 
-        # 4. Generate Report
-        jsona = self._generate_final_json(report_id, info_pieces, user, query)
-        return jsona
+    def _reload_pieces(self, report_id):
+        # commits expire every piece: reload them with one SELECT instead of one refresh per piece
+        return self.db.session.query(InformationPiece).filter_by(report_id=report_id).order_by(InformationPiece.id).all()
+
+    def _load_pieces(self, report_id, piece_ids):
+        """Pieces recorded in an 'extracted' checkpoint."""
+        wanted = set(piece_ids)
+        return [piece for piece in self._reload_pieces(report_id) if piece.id in wanted]
+
+    @staticmethod
+    def _apply_scores(pieces, scores):
+        by_id = {piece_id: (risk_score, risk_level) for piece_id, risk_score, risk_level in scores}
+        for piece in pieces:
+            if piece.id in by_id:
+                piece.risk_score, piece.risk_level = by_id[piece.id]
     
     def get_report(self, user_email, report_id):
         """
@@ -70,6 +287,54 @@ class ReportService:
         
         return report.to_dict()
     
+    def get_report_status(self, user_email, report_id):
+        """
+        Status of a report being generated: {report_id, status, stage, progress, queue}
+        
+        Raises:
+            ValueError: If user or report not found
+        """
+        user = self.db.session.query(User).filter_by(email=user_email).first()
+        if not user:
+            raise ValueError('User not found.')
+        
+        report = self.db.session.query(Report.status).filter_by(report_id=report_id, user_id=user.id).first()
+        if not report:
+            raise ValueError('Report not found.')
+        
+        progress = report_progress.get(report_id)
+        if report.status in FINISHED_STAGES:
+            progress = {'stage': report.status, 'progress': REPORT_STAGES.get(report.status, 0)}
+        elif not progress:
+            # running on a report worker node: stage as of its last heartbeat
+            progress = self._stored_progress(report_id, report.status)
+        
+        return {
+            'report_id': report_id,
+            'status': report.status,
+            'stage': progress['stage'],
+            'progress': progress['progress'],
+            'queue': progress.get('queue')  # {'position', 'eta_seconds'} while waiting for a worker
+        }
+    
+    def _stored_progress(self, report_id, report_status):
+        job = self.job_queue.get_job(report_id)
+        stage = (job.stage or job.status) if job else report_status
+        return {
+            'stage': stage,
+            'progress': REPORT_STAGES.get(stage, 0),
+            'queue': self.job_queue.queue_position(report_id) if job and job.status == 'queued' else None
+        }
+
+    def reset_report(self, report_id):
+        """Drops the pieces of a failed attempt, and their corroboration occurrences, before its data is processed again."""
+        pieces = self.db.session.query(InformationPiece).filter_by(report_id=report_id)
+        content_hashes = [content_hash for (content_hash,) in pieces.with_entities(InformationPiece.content_hash)]
+        if content_hashes:
+            remove_occurrences(self.db, self.get_report_query(report_id), content_hashes)
+            pieces.delete(synchronize_session=False)
+        self.reset_status(report_id)
+
     def get_search_history(self, user_email):
         """
         Get search history for a user
@@ -96,12 +361,41 @@ class ReportService:
     
     # HELPER FUNCTIONS
     
-    def _init_report(self, user_id: str, query: str) -> str:
+    def _init_report(self, user_id: str, query: str, use_general=True, use_facebook=False) -> str:
         """Initialize a new report and save it to database"""
-        report_id = f"RPT-{datetime.now().strftime('%Y%m%d')}-{random.randint(1000, 9999)}"
+        report_id = self._new_report_id()
+        self._record_search(user_id, query, report_id)
+        
+        # Create new Report record
+        report = Report(
+            report_id=report_id,
+            user_id=user_id,
+            user_query=query,
+            status="processing",
+            generated_at=datetime.utcnow(),
+            query_key=query_key(query),
+            use_general=bool(use_general),
+            use_facebook=bool(use_facebook)
+        )
         
+        print("adding report to self.db with id ", report_id)
+        self.db.session.add(report)
+        self.db.session.commit()
+        
+        return report_id
+
+    @staticmethod
+    def _new_report_id():
+        return f"RPT-{datetime.now().strftime('%Y%m%d')}-{random.randint(1000, 9999)}"
+
+    def _record_search(self, user_id, query, report_id, local_misuse_score=None):
+        """
+        Misuse score update and SearchHistory entry for a search (added, not committed).
+        local_misuse_score: score of an identical earlier search (result cache hit), computed when None.
+        """
         # check for misuse score
-        local_misuse_score = data_processing_engine.get_local_misuse_score(user_id=user_id, current_query=query)
+        if local_misuse_score is None:
+            local_misuse_score = data_processing_engine.get_local_misuse_score(user_id=user_id, current_query=query)
         
         # update user
         # add local misusse calculation
@@ -120,52 +414,73 @@ class ReportService:
             user.average_misuse_score = new_global_avg
             print(f"[MISUSE] User {user.id}: Local={local_misuse_score:.2f}, Global={new_global_avg:.2f}")
         
-        # Create new Report record
-        report = Report(
-            report_id=report_id,
-            user_id=user_id,
-            user_query=query,
-            status="processing",
-            generated_at=datetime.utcnow()
-        )
-        
         new_history_entry = SearchHistory(
             user_id=user_id,
             user_query=query,
             report_id=report_id,
             local_misuse_score=local_misuse_score
         )
-        
-        print("adding report to self.db with id ", report_id)
-        self.db.session.add(report)
         self.db.session.add(new_history_entry)
-        self.db.session.commit()
-        
+
+    def _clone_report(self, source):
+        """
+        Copies a completed report under a new id, marked cached_from. Its pieces are copied with one
+        INSERT ... SELECT (encrypted columns as stored). The copies are not recorded as occurrences and
+        risk scoring skips reports with cached_from, so corroboration is not counted twice.
+        """
+        report_id = self._new_report_id()
+        self.db.session.add(Report(
+            report_id=report_id,
+            user_id=source.user_id,
+            user_query=source.user_query,
+            status="completed",
+            generated_at=source.generated_at,  # age of the data, not of the copy
+            generation_time_seconds=0,
+            overall_risk_score=source.overall_risk_score,
+            executive_summary=source.executive_summary,
+            risk_distribution=source.risk_distribution,
+            detailed_findings=source.detailed_findings,
+            recommendations=source.recommendations,
+            source_distribution=source.source_distribution,
+            query_key=source.query_key,
+            use_general=source.use_general,
+            use_facebook=source.use_facebook,
+            cached_from=source.report_id
+        ))
+        self.db.session.flush()
+        
+        pieces = InformationPiece.__table__
+        columns = [c for c in pieces.columns if c.name not in ('id', 'report_id')]
+        self.db.session.execute(
+            insert(pieces).from_select(
+                ['report_id'] + [c.name for c in columns],
+                select(literal(report_id), *columns).where(pieces.c.report_id == source.report_id)
+            )
+        )
         return report_id
 
-    def _generate_final_json(self, report_id, pieces, user, query):
+    def _generate_final_json(self, report_id, pieces, user, query, preview=False):
         # Report-wide  Statistics
-        risk_counts = {"high": 0, "medium": 0, "low": 0}
         source_distribution = {}
-        risk_vals = []
+        
+        # Risk Stats: overall score (top 20% average) and level counts, shared with the rescoring job
+        avg_risk, risk_counts = self.risk_engine.summarize_report_risk([p.risk_score for p in pieces])
         
         for p in pieces:
-            # Risk Stats
-            if p.risk_score is not None:
-                risk_level = "low" if p.risk_score < 4 else "medium" if p.risk_score < 7 else "high"
-                risk_counts[risk_level] = risk_counts.get(risk_level, 0) + 1
-                risk_vals.append(p.risk_score)
-            
             # Source Stats (to id)
             if p.source_id:   
                 sid = str(p.source_id)
                 source_distribution[sid] = source_distribution.get(sid, 0) + 1
                 
         # Source IDs -> names (swap ID to name as a key, keep value same)
+        source_names = dict(
+            self.db.session.query(DiscoverSource.id, DiscoverSource.name)
+            .filter(DiscoverSource.id.in_([int(k) for k in source_distribution]))
+            .all()
+        ) if source_distribution else {}
         new_source_distribution = {}    
         for k, v in source_distribution.items():
-            new_k = self.db.session.query(DiscoverSource).filter_by(id=k).first()
-            new_source_distribution[new_k.name] = v
+            new_source_distribution[source_names[int(k)]] = v
         
         source_distribution = new_source_distribution or source_distribution
             
@@ -173,31 +488,31 @@ class ReportService:
         print("risk_counts: ", risk_counts)
         print("source_distribution: ", source_distribution)
 
-        if risk_vals:
-            sorted_vals = sorted(risk_vals, reverse=True)
-            
-            # how many items make up the top 20% (minimum 1)
-            top_count = max(1, math.ceil(len(sorted_vals) * 0.20))
-            
-            top_slice = sorted_vals[:top_count]
-            avg_risk = sum(top_slice) / len(top_slice)
-            
-        else:
-            avg_risk = 0.0
-        
         # 2. Summary & Recommendations
-        executive_summary = self._generate_executive_summary(
+        executive_summary = generate_executive_summary(
             query, 
             len(pieces), 
             risk_counts, 
             avg_risk
         )
         
-        recommendations = self._generate_recommendations(risk_counts, source_distribution) 
+        recommendations = generate_recommendations(risk_counts, source_distribution) 
 
         # 3. Update Report Model
         report = self.db.session.query(Report).filter_by(report_id=report_id).first()
         
+        if preview:
+            # preliminary numbers only travel with the 'preview' event, the stored report stays "processing"
+            result = report.to_dict()
+            result.update(
+                overall_risk_score=round(avg_risk, 2),
+                executive_summary=executive_summary,
+                risk_distribution=risk_counts,
+                recommendations=recommendations,
+                source_distribution=source_distribution
+            )
+            return result
+        
         report.status = "completed"
         report.overall_risk_score = avg_risk
         report.executive_summary = executive_summary
@@ -242,49 +557,3 @@ class ReportService:
         """Get source name from ID"""
         source = self.db.session.query(DiscoverSource).filter_by(id=source_id).first()
         return source.name if source else "Unknown Source"
-
-    def _generate_executive_summary(self, query: str, total_findings: int, risk_counts: dict, overall_risk_score: float) -> str:
-        """Generate executive summary based on findings"""
-        risk_level_desc = "Low"
-        if overall_risk_score >= 4:
-            risk_level_desc = "High"
-        elif overall_risk_score >= 1.7:
-            risk_level_desc = "Medium"
-        
-        summary = f"Digital footprint analysis for '{query}' reveals {total_findings} information pieces across multiple platforms. "
-        summary += f"Overall risk level: {risk_level_desc} (score: {overall_risk_score:.2f}/10). "
-        
-        if risk_counts["high"] > 0:
-            summary += f"Found {risk_counts['high']} high-risk items requiring immediate attention. "
-        
-        if risk_counts["medium"] > 0:
-            summary += f"Identified {risk_counts['medium']} medium-risk items for review. "
-        
-        return summary
-
-    def _generate_recommendations(self, risk_counts: dict, source_counts: dict) -> List[str]:
-        """Generate recommendations based on findings"""
-        recommendations = []
-        
-        if risk_counts["high"] > 0:
-            recommendations.extend([
-                "Immediately review and secure accounts with compromised information",
-                "Change passwords for all affected accounts",
-                "Enable two-factor authentication where possible",
-                "Monitor credit reports for suspicious activity"
-            ])
-        
-        if risk_counts["medium"] > 0:
-            recommendations.extend([
-                "Review privacy settings on social media accounts",
-                "Limit publicly visible personal information",
-                "Consider removing or updating outdated profiles"
-            ])
-        
-        if "Social Media" in source_counts and source_counts["Social Media"] > 5:
-            recommendations.append("Consider reducing social media presence or improving privacy controls")
-        
-        if len(recommendations) == 0:
-            recommendations.append("Continue monitoring digital footprint regularly")
-        
-        return recommendations[:6]  # Limit to 6 recommendations
\ No newline at end of file
@@ -383,18 +383,125 @@ async function loginUser(formData) {
     return data;
 }
 
-async function searchReport(query, generalSearch, facebookSearch) {
+// forceRefresh: generate anew even if an identical search finished recently (otherwise that report is returned, cached: true)
+async function searchReport(query, generalSearch, facebookSearch, forceRefresh = false) {
     const response = await fetch('/api/search', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
             'Authorization': 'Bearer ' + AppState.jwt
         },
-        body: JSON.stringify({ query, general_search: generalSearch, facebook_search: facebookSearch })
+        body: JSON.stringify({ query, general_search: generalSearch, facebook_search: facebookSearch, force_refresh: forceRefresh })
     });
     return response.json();
 }
 
+const STAGE_LABELS = {
+    queued: 'Waiting for a free worker...',
+    collecting: 'Collecting sources...',
+    preview: 'Preliminary results ready, crawling pages...',
+    extracting: 'Extracting information...',
+    scoring: 'Assessing risk...',
+    finalizing: 'Preparing the report...'
+};
+
+// scores: [[piece id, risk_score, risk_level], ...] sent with the preview/summary events
+function applyScores(findings, scores) {
+    for (const [id, riskScore, riskLevel] of scores || []) {
+        const finding = findings.get(id);
+        if (finding) findings.set(id, { ...finding, risk_score: riskScore, risk: riskLevel });
+    }
+}
+
+function setLoadingProgress(status, findingsCount = 0) {
+    const progressText = document.getElementById('loading-progress');
+    if (!progressText) return;
+    const label = STAGE_LABELS[status.stage] || 'This may take a few moments';
+    const found = findingsCount ? `, ${findingsCount} findings` : '';
+    progressText.textContent = status.stage ? `${label} (${status.progress || 0}%${found})` : label;
+}
+
+// Parses one Server-Sent Events block ("event: ...\ndata: ...") into {event, data}
+function parseSSEBlock(block) {
+    let event = 'message';
+    const dataLines = [];
+    for (const line of block.split('\n')) {
+        if (line.startsWith('event:')) event = line.slice(6).trim();
+        else if (line.startsWith('data:')) dataLines.push(line.slice(5).trim());
+    }
+    if (!dataLines.length) return null;  // keep-alive comment
+    return { event, data: JSON.parse(dataLines.join('\n')) };
+}
+
+// Follows the report's event stream until generation finishes, returns the finished report.
+// fetch (not EventSource) so the Authorization header can be sent.
+// onPreview(report) is called with the preliminary snippet-based report while the deep crawl runs.
+async function waitForReport(reportId, onPreview = null) {
+    const response = await fetch(`/api/report/${reportId}/events`, {
+        method: 'GET',
+        headers: {
+            'Authorization': 'Bearer ' + AppState.jwt,
+            'Accept': 'text/event-stream'
+        }
+    });
+    if (!response.ok || !response.body) {
+        const error = await response.json().catch(() => ({}));
+        throw new Error(error.message || 'Failed to follow report progress');
+    }
+
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    const findings = new Map();  // id -> finding, streamed unscored, risk arrives with preview/summary
+    let buffer = '';
+    let summary = null;
+    let lastStage = null;
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+            const message = parseSSEBlock(buffer.slice(0, boundary));
+            buffer = buffer.slice(boundary + 2);
+            if (!message) continue;
+
+            if (message.event === 'stage') {
+                lastStage = message.data;
+                setLoadingProgress(lastStage, findings.size);
+            } else if (message.event === 'finding') {
+                findings.set(message.data.id, message.data);
+                setLoadingProgress(lastStage || {}, findings.size);
+            } else if (message.event === 'preview') {
+                const { scores, ...preview } = message.data;
+                applyScores(findings, scores);
+                if (onPreview) onPreview({ ...preview, detailed_findings: [...findings.values()] });
+            } else if (message.event === 'summary') {
+                const { scores, ...rest } = message.data;
+                applyScores(findings, scores);
+                summary = rest;
+            }
+        }
+    }
+
+    if (lastStage && lastStage.stage === 'failed') {
+        throw new Error(lastStage.message || 'Report generation failed');
+    }
+    if (lastStage && lastStage.stage === 'cancelled') {
+        throw new Error('Report generation was cancelled');
+    }
+    if (summary) {
+        return { ...summary, detailed_findings: [...findings.values()] };
+    }
+    // stream ended without a summary (report finished earlier or elsewhere): load the stored report
+    const result = await getReport(reportId);
+    if (!result.success) {
+        throw new Error(result.message || 'Failed to load report');
+    }
+    return result.report;
+}
+
 async function getHistory() {
     const response = await fetch('/api/history', {
         method: 'GET',
@@ -1052,6 +1159,8 @@ document.addEventListener('DOMContentLoaded', function() {
             
             const generalSearch = document.getElementById('general-search').checked;
             const facebookSearch = document.getElementById('facebook-search').checked;
+            const forceRefreshField = document.getElementById('force-refresh');
+            const forceRefresh = forceRefreshField ? forceRefreshField.checked : false;
             
             if (!generalSearch && !facebookSearch) {
                 showNotification('Please select at least one search option', 'error');
@@ -1064,13 +1173,22 @@ document.addEventListener('DOMContentLoaded', function() {
 
             try {
 
-                const response = await searchReport(query, generalSearch, facebookSearch);
+                const response = await searchReport(query, generalSearch, facebookSearch, forceRefresh);
 
                 if (response.success) {
-                    AppState.searchHistory.unshift(response.report);
-                    displayReport(response.report);
+                    const report = await waitForReport(response.report_id, preview => {
+                        hideLoading();
+                        displayReport(preview);
+                        showNotification('Preliminary results ready, the report will update when the crawl finishes', 'info');
+                    });
+                    AppState.searchHistory.unshift(report);
+                    displayReport(report);
                     loadSearchHistory();
-                    showNotification('Report generated successfully', 'success');
+                    if (response.cached) {
+                        showNotification('Showing your recent report for this search. Tick "Skip recent results" to generate a new one', 'info');
+                    } else {
+                        showNotification('Report generated successfully', 'success');
+                    }
                     // Clear the search query field
                     queryField.value = '';
 
@@ -1082,6 +1200,7 @@ document.addEventListener('DOMContentLoaded', function() {
                 showNotification(error.message, 'error');
             } finally {
                 hideLoading();
+                setLoadingProgress({});
                 setButtonLoading(submitBtn, false);
 
             }
@@ -2,6 +2,8 @@ from sqlalchemy.types import TypeDecorator, TEXT
 from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 import os
 import base64
+import json
+import zlib
 
 from dotenv import load_dotenv
 load_dotenv()
@@ -59,6 +61,31 @@ class EncryptedString(TypeDecorator):
         except Exception as e:
             return "[Decryption Error]"
         
+class EncryptedCompressedJSON(TypeDecorator):
+    """
+    JSON value, zlib-compressed, then AES-256-GCM encrypted (for large blobs such as pipeline checkpoints).
+    Storage Format (Base64): [Nonce (12 bytes) + Ciphertext(zlib(json)) + AuthTag]
+    """
+    impl = TEXT
+    cache_ok = True
+
+    def process_bind_param(self, value, dialect):
+        if value is None:
+            return
+        
+        data = zlib.compress(json.dumps(value, ensure_ascii=False, default=str).encode('utf-8'), 6)
+        nonce = os.urandom(12)
+        return base64.b64encode(nonce + aesgcm.encrypt(nonce, data, None)).decode('utf-8')
+
+    def process_result_value(self, value, dialect):
+        if not value:
+            return
+        
+        # no "[Decryption Error]" placeholder here: a damaged checkpoint must not be resumed from
+        encrypted_data = base64.b64decode(value)
+        data = aesgcm.decrypt(encrypted_data[:12], encrypted_data[12:], None)
+        return json.loads(zlib.decompress(data).decode('utf-8'))
+        
 # Instructions when updating
 # Load 32-byte (256-bit) key from environment
 # Run `import os; os.urandom(32).hex()` to generate one for .env
@@ -0,0 +1,51 @@
+import hmac
+import hashlib
+import os
+import unicodedata
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDF
+
+from dotenv import load_dotenv
+load_dotenv()
+
+# Blind index for EncryptedString columns.
+# AES-GCM uses a random nonce, so equal plaintexts never produce equal ciphertexts and
+# `content == value` filters can not match or use an index. A keyed HMAC of the normalized
+# plaintext is deterministic, indexable and does not reveal the content without the key.
+#
+# The HMAC key must be independent from the encryption key:
+# Run `import os; os.urandom(32).hex()` and put it in .env as DB_BLIND_INDEX_KEY_HEX=...
+# Changing the key invalidates stored hashes (clear content_hash and let the backfill job rerun).
+
+BLIND_INDEX_KEY_HEX = os.environ.get("DB_BLIND_INDEX_KEY_HEX")
+
+if BLIND_INDEX_KEY_HEX:
+    _key = bytes.fromhex(BLIND_INDEX_KEY_HEX)
+else:
+    encryption_key_hex = os.environ.get("DB_ENCRYPTION_KEY_HEX")
+    if not encryption_key_hex:
+        raise RuntimeError("DB blind index key not found")
+    print("[SECURITY] WARNING: DB_BLIND_INDEX_KEY_HEX is not set, deriving the blind index key "
+          "from DB_ENCRYPTION_KEY_HEX. Set a separate key in production.")
+    _key = HKDF(
+        algorithm=hashes.SHA256(),
+        length=32,
+        salt=None,
+        info=b"information-piece-content-blind-index",
+    ).derive(bytes.fromhex(encryption_key_hex))
+
+
+def normalize_content(value: str) -> str:
+    """Unicode NFKC, lowercase, collapsed whitespace - equal after normalization means same index."""
+    return " ".join(unicodedata.normalize("NFKC", value).lower().split())
+
+
+def blind_index(value):
+    """HMAC-SHA256 hex digest (64 chars) of the normalized value, None for empty values."""
+    if not value:
+        return None
+    normalized = normalize_content(value)
+    if not normalized:
+        return None
+    return hmac.new(_key, normalized.encode("utf-8"), hashlib.sha256).hexdigest()
@@ -0,0 +1,101 @@
+import threading
+from contextlib import contextmanager
+
+# Cooperative cancellation of report generation.
+# A CancellationToken is handed down the pipeline (collection, scrapers, processing); long loops
+# check it between units of work (URLs, scrolls, batches) and sleeps wait on it, so a cancelled
+# report stops within about a second. Blocking calls that cannot poll (a Selenium page load, a
+# crawl4ai fetch) register a callback that interrupts them (closes the browser, cancels the task).
+
+
+class ReportCancelled(Exception):
+    """Raised inside the pipeline once its report was cancelled."""
+
+
+class CancellationToken:
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks = []
+        self.reason = None
+
+    @property
+    def cancelled(self):
+        return self._event.is_set()
+
+    def cancel(self, reason=None):
+        """Cancels the token and runs the registered callbacks (once). Safe to call from any thread."""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self.reason = reason
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+
+        for callback in callbacks:
+            try:
+                callback()
+            except Exception as e:
+                print(f"[CANCEL] Cleanup callback failed: {e}")
+
+    def raise_if_cancelled(self):
+        if self._event.is_set():
+            raise ReportCancelled(self.reason or "Report generation was cancelled.")
+
+    def wait(self, seconds):
+        """Sleeps up to `seconds`, raises ReportCancelled as soon as the token is cancelled."""
+        if self._event.wait(seconds):
+            self.raise_if_cancelled()
+
+    @contextmanager
+    def callback(self, fn):
+        """Runs fn() if the token is cancelled while the block executes (immediately if it already is)."""
+        with self._lock:
+            cancelled = self._event.is_set()
+            if not cancelled:
+                self._callbacks.append(fn)
+        if cancelled:
+            fn()
+        try:
+            yield
+        finally:
+            with self._lock:
+                if fn in self._callbacks:
+                    self._callbacks.remove(fn)
+
+
+class ReportCancellations:
+    """Tokens of the reports running (or queued) in this process, by report id."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tokens = {}
+
+    def register(self, report_id):
+        """Fresh token for a new attempt of the report."""
+        token = CancellationToken()
+        with self._lock:
+            self._tokens[report_id] = token
+        return token
+
+    def get(self, report_id):
+        with self._lock:
+            return self._tokens.get(report_id)
+
+    def cancel(self, report_id, reason=None):
+        """Cancels the report's token. Returns False when the report is not running in this process."""
+        token = self.get(report_id)
+        if token is None:
+            return False
+        token.cancel(reason)
+        return True
+
+    def discard(self, report_id, token=None):
+        """Drops the report's token (only `token`, if given, so a newer attempt's token survives)."""
+        with self._lock:
+            if token is None or self._tokens.get(report_id) is token:
+                self._tokens.pop(report_id, None)
+
+
+report_cancellations = ReportCancellations()
@@ -13,6 +13,11 @@ class Config:
     # --- Loaded from cfg.yaml ---
     SEMANTIC_MODEL = cfg['semantic_model']
     NER_MODEL = cfg['NER_model']
+    NER_MODELS_BY_LANGUAGE = cfg.get('NER_models_by_language') or {}
+    NER_BATCH_SIZE = cfg.get('NER_batch_size', 8)
+    GAZETTEER_PATH = os.path.join(os.path.dirname(__file__), cfg.get('gazetteer_path') or 'gazetteer.yaml')
+    DATA_DIR = os.environ.get('DATA_DIR') or cfg.get('data_dir') \
+        or os.path.join(os.path.dirname(__file__), '..', '..', 'instance')
     AVAILABLE_ASSISTANT_MODELS = cfg['available_assistant_models']
     
     SELECTED_LLM_PROVIDER = cfg.get('selected_assistant_provider', 'groq')
@@ -28,6 +33,79 @@ class Config:
     BM_25_PRIMARY_THRESHOLD = cfg['BM_25_primary_threshold']
     BM_25_SECONDARY_THRESHOLD = cfg['BM_25_secondary_threshold']
     USE_PRUNING_FILTER_BACKUP = cfg['use_pruning_filter_backup']
+    
+    REGEX_MAX_TEXT_CHARS = cfg.get('regex_max_text_chars', 200000)
+    REGEX_TIME_BUDGET_SECONDS = cfg.get('regex_time_budget_seconds', 2.0)
+    
+    SENTENCE_FILTER_ENABLED = cfg.get('sentence_filter_enabled', True)
+    SENTENCE_FILTER_WINDOW = cfg.get('sentence_filter_window', 1)
+    
+    PROCESSING_MODE = cfg.get('processing_mode', 'sequential')
+    PIPELINE_CHUNK_SIZE = cfg.get('pipeline_chunk_size', 8)
+    PIPELINE_QUEUE_SIZE = cfg.get('pipeline_queue_size', 4)
+    
+    INFERENCE_WORKERS = cfg.get('inference_workers', 2)
+    TORCH_THREADS = cfg.get('torch_threads', 'auto')
+    TORCH_INTEROP_THREADS = cfg.get('torch_interop_threads', 1)
+    TOKENIZERS_PARALLELISM = cfg.get('tokenizers_parallelism', False)
+
+    # risk model (changing these does not touch stored scores, run the rescoring job)
+    RISK_ALPHA = cfg.get('risk_alpha', 0.7)
+    RISK_LAMBDA_DECAY = cfg.get('risk_lambda_decay', 0.15)
+    RISK_IMPACT_SCORES = cfg.get('risk_impact_scores') or {
+        "Financial Information": 1.0,
+        "Personal Identifiers": 1.0,
+        "Contact Information": 0.9,
+        "Location Data": 0.9,
+        "Social Connections": 0.5,
+        "Professional Details": 0.5,
+        "Public Statements": 0.5,
+        "Uncategorized": 0.5
+    }
+    
+    RISK_CORROBORATION_SOURCE = cfg.get('risk_corroboration_source', 'summary')
+    RISK_VALIDATION_MODE = cfg.get('risk_validation_mode', 'exact')
+    
+    # unset: only stored when validation uses them (embedding mode)
+    PIECE_EMBEDDINGS_ENABLED = cfg.get('piece_embeddings_enabled')
+    if PIECE_EMBEDDINGS_ENABLED is None:
+        PIECE_EMBEDDINGS_ENABLED = RISK_VALIDATION_MODE == 'embedding'
+    PIECE_EMBEDDING_MODEL = cfg.get('piece_embedding_model') or cfg['semantic_model']
+    PIECE_EMBEDDING_DIMENSIONS = cfg.get('piece_embedding_dimensions', 384)
+    EMBEDDING_MATCH_THRESHOLD = cfg.get('embedding_match_threshold', 0.85)
+    EMBEDDING_NEIGHBOURS = cfg.get('embedding_neighbours', 20)
+    CORROBORATION_RETENTION_DAYS = cfg.get('corroboration_retention_days', 90)
+
+    REPORT_WORKERS = cfg.get('report_workers', 2)
+    REPORT_QUEUE_LIMIT = cfg.get('report_queue_limit', 20)
+    REPORT_USER_CONCURRENCY = cfg.get('report_user_concurrency', 1)
+    REPORT_USER_QUEUE_LIMIT = cfg.get('report_user_queue_limit', 5)
+    REPORT_ADMIN_WEIGHT = cfg.get('report_admin_weight', 4.0)
+    REPORT_ESTIMATED_SECONDS = cfg.get('report_estimated_seconds', 120)
+    REPORT_QUEUE_BACKEND = cfg.get('report_queue_backend', 'local')
+    REPORT_JOB_LEASE_SECONDS = cfg.get('report_job_lease_seconds', 120)
+    REPORT_JOB_HEARTBEAT_SECONDS = cfg.get('report_job_heartbeat_seconds', 30)
+    REPORT_JOB_MAX_ATTEMPTS = cfg.get('report_job_max_attempts', 3)
+    REPORT_JOB_BACKOFF_SECONDS = cfg.get('report_job_backoff_seconds', 30)
+    REPORT_JOB_BACKOFF_MAX_SECONDS = cfg.get('report_job_backoff_max_seconds', 600)
+    REPORT_WORKER_POLL_SECONDS = cfg.get('report_worker_poll_seconds', 2)
+    REPORT_EVENTS_POLL_SECONDS = cfg.get('report_events_poll_seconds', 2)
+    CHECKPOINT_RETENTION_DAYS = cfg.get('checkpoint_retention_days', 7)
+    COLLECTION_WORKERS = cfg.get('collection_workers', 6)
+    COLLECTION_MAX_BROWSERS = cfg.get('collection_max_browsers', 2)
+    REPORT_EVENTS_HEARTBEAT_SECONDS = cfg.get('report_events_heartbeat_seconds', 15)
+    REPORT_SINGLE_FLIGHT_WINDOW_SECONDS = cfg.get('report_single_flight_window_seconds', 60)
+    REPORT_PREVIEW_ENABLED = cfg.get('report_preview_enabled', True)
+    REPORT_PREVIEW_WAIT_SECONDS = cfg.get('report_preview_wait_seconds', 20)
+    REPORT_CANCEL_ON_DISCONNECT = cfg.get('report_cancel_on_disconnect', True)
+    REPORT_CANCEL_DISCONNECT_GRACE_SECONDS = cfg.get('report_cancel_disconnect_grace_seconds', 30)
+    REPORT_CANCEL_POLL_SECONDS = cfg.get('report_cancel_poll_seconds', 1)
+    REPORT_CACHE_TTL_SECONDS = cfg.get('report_cache_ttl_seconds', 3600)
+    REPORT_CACHE_MODE = cfg.get('report_cache_mode', 'reuse')
+    
+    SQL_PROFILER_ENABLED = cfg.get('sql_profiler_enabled', True)
+    SQL_QUERY_WARN_THRESHOLD = cfg.get('sql_query_warn_threshold', 50)
+    SQL_REPEAT_WARN_THRESHOLD = cfg.get('sql_repeat_warn_threshold', 10)
 
     APPLIED_REPORT_QUERY_MATCHING_MODE = cfg['applied_report_query_matching_mode']
     LEVENSTAIN_THRESHOLD = cfg['levenstain_threshold']
@@ -0,0 +1,176 @@
+from collections import Counter, defaultdict
+from datetime import datetime
+
+from sqlalchemy import case, func
+
+from backend.models import ContentCorroboration, InformationPiece, Report
+from backend.utils.blind_index import blind_index
+
+# Maintenance of the ContentCorroboration summary table (see models).
+# Keys are blind indexes, so neither the content nor the searched name is stored in plain text.
+
+UPSERT_CHUNK_SIZE = 500
+
+# Marks a completed backfill. Not a hex digest, so it never matches a real blind index; dated
+# in the far future so trim_corroboration keeps it.
+BACKFILL_MARKER = 'backfill-complete'
+BACKFILL_MARKER_SEEN = datetime(9999, 1, 1)
+
+
+def query_key(query):
+    return blind_index(query)
+
+
+def record_occurrences(db, occurrences):
+    """
+    Adds occurrences to the summary table within the caller's transaction (no commit).
+    occurrences: iterable of (content, query, seen_at) tuples, content/query in plain text.
+    Returns the number of recorded occurrences.
+    """
+    aggregated = defaultdict(lambda: [0, None, None])
+    recorded = 0
+    for content, query, seen_at in occurrences:
+        content_hash, key = blind_index(content), query_key(query)
+        if not content_hash or not key:
+            continue
+        seen_at = seen_at or datetime.utcnow()
+        entry = aggregated[(content_hash, key)]
+        entry[0] += 1
+        entry[1] = seen_at if entry[1] is None else min(entry[1], seen_at)
+        entry[2] = seen_at if entry[2] is None else max(entry[2], seen_at)
+        recorded += 1
+
+    _upsert(db, [
+        {'content_hash': content_hash, 'query_key': key, 'occurrence_count': count,
+         'first_seen': first_seen, 'last_seen': last_seen}
+        for (content_hash, key), (count, first_seen, last_seen) in aggregated.items()
+    ])
+    return recorded
+
+
+def remove_occurrences(db, query, content_hashes):
+    """
+    Takes back occurrences recorded for pieces that are deleted again, e.g. the pieces of a failed report
+    attempt that is processed anew (no commit). content_hashes: the pieces' blind indexes, one per piece.
+    first_seen/last_seen are left as they are; rows whose count drops to zero are deleted.
+    """
+    key = query_key(query)
+    counts = Counter(content_hash for content_hash in content_hashes if content_hash)
+    if not key or not counts:
+        return
+
+    by_count = defaultdict(list)
+    for content_hash, count in counts.items():
+        by_count[count].append(content_hash)
+
+    table = ContentCorroboration.__table__
+    for count, hashes in by_count.items():
+        for i in range(0, len(hashes), UPSERT_CHUNK_SIZE):
+            db.session.execute(
+                table.update()
+                .where(table.c.query_key == key, table.c.content_hash.in_(hashes[i:i + UPSERT_CHUNK_SIZE]))
+                .values(occurrence_count=table.c.occurrence_count - count)
+            )
+
+    hashes = list(counts)
+    for i in range(0, len(hashes), UPSERT_CHUNK_SIZE):
+        db.session.execute(
+            table.delete()
+            .where(table.c.query_key == key, table.c.content_hash.in_(hashes[i:i + UPSERT_CHUNK_SIZE]),
+                   table.c.occurrence_count <= 0)
+        )
+
+
+def _upsert(db, rows):
+    if not rows:
+        return
+
+    dialect = db.session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        _upsert_portable(db, rows)
+        return
+
+    table = ContentCorroboration.__table__
+    # one statement per chunk; keys are unique within a statement (aggregated by the caller)
+    for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = insert(table).values(rows[i:i + UPSERT_CHUNK_SIZE])
+        excluded = stmt.excluded
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.content_hash, table.c.query_key],
+            set_={
+                'occurrence_count': table.c.occurrence_count + excluded.occurrence_count,
+                'first_seen': case((excluded.first_seen < table.c.first_seen, excluded.first_seen), else_=table.c.first_seen),
+                'last_seen': case((excluded.last_seen > table.c.last_seen, excluded.last_seen), else_=table.c.last_seen),
+            }
+        )
+        db.session.execute(stmt)
+
+
+def _upsert_portable(db, rows):
+    """
+    Select-then-update/insert for databases without ON CONFLICT. A concurrent insert of the same key
+    makes the caller's commit fail on the unique constraint (rolled back, never double counted).
+    """
+    for i in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        chunk = {(row['content_hash'], row['query_key']): row for row in rows[i:i + UPSERT_CHUNK_SIZE]}
+        existing = db.session.query(ContentCorroboration)\
+            .filter(ContentCorroboration.content_hash.in_({content_hash for content_hash, _ in chunk}))\
+            .with_for_update()\
+            .all()
+
+        for summary in existing:
+            row = chunk.pop((summary.content_hash, summary.query_key), None)
+            if row is None:
+                continue
+            summary.occurrence_count += row['occurrence_count']
+            summary.first_seen = min(summary.first_seen, row['first_seen'])
+            summary.last_seen = max(summary.last_seen, row['last_seen'])
+
+        db.session.add_all(ContentCorroboration(**row) for row in chunk.values())
+    db.session.flush()
+
+
+def trim_corroboration(db, cutoff):
+    """Deletes summary rows not seen since `cutoff`. Returns the number of deleted rows (no commit)."""
+    return db.session.query(ContentCorroboration)\
+        .filter(ContentCorroboration.last_seen < cutoff)\
+        .delete(synchronize_session=False)
+
+
+def backfill_corroboration(db, batch_size=1000):
+    """
+    Builds the summary table from the stored InformationPiece rows, once: completion is recorded by a
+    marker row, so it is safe to schedule on every startup. Pieces created after the earliest summary
+    entry were already recorded when they were inserted and are skipped.
+    """
+    if db.session.query(ContentCorroboration.id).filter_by(content_hash=BACKFILL_MARKER).first():
+        return 0
+
+    # written first: a concurrent backfill blocks on the unique key and then fails instead of double counting
+    db.session.add(ContentCorroboration(
+        content_hash=BACKFILL_MARKER, query_key=BACKFILL_MARKER, occurrence_count=0,
+        first_seen=BACKFILL_MARKER_SEEN, last_seen=BACKFILL_MARKER_SEEN
+    ))
+    db.session.flush()
+
+    recorded_since = db.session.query(func.min(ContentCorroboration.first_seen))\
+        .filter(ContentCorroboration.content_hash != BACKFILL_MARKER)\
+        .scalar()
+
+    rows = db.session.query(InformationPiece.content, Report.user_query, InformationPiece.created_at)\
+        .join(Report, InformationPiece.report_id == Report.report_id)\
+        .filter(Report.cached_from.is_(None))  # copies of a report are not new occurrences
+    if recorded_since is not None:
+        rows = rows.filter(InformationPiece.created_at < recorded_since)
+
+    recorded = record_occurrences(db, (
+        (content, user_query, created_at)
+        for content, user_query, created_at in rows.execution_options(yield_per=batch_size)
+        if content and content != "[Decryption Error]"
+    ))
+    db.session.commit()
+    return recorded
@@ -3,6 +3,7 @@ import json
 import hashlib
 from typing import Dict, List, Any, Optional, Union
 from .prompt_sanitizer import PromptSanitizer
+from .safe_regex import SafePattern, RegexBudget
 
 
 class LLMSecurityManager:
@@ -20,7 +21,11 @@ class LLMSecurityManager:
             with open(config_path, "r") as f:
                 config = yaml.safe_load(f)
                 if config and "sensitive_patterns" in config:
-                    self.sensitive_patterns.extend(config["sensitive_patterns"])
+                    # compiled once, on the linear-time engine when available
+                    self.sensitive_patterns.extend(
+                        {"name": item["name"], "pattern": SafePattern(item["pattern"], name=item["name"])}
+                        for item in config["sensitive_patterns"]
+                    )
                     
         except Exception as e:
             print(f"Could not load security config: {e}")
@@ -115,19 +120,28 @@ class LLMSecurityManager:
     def _detect_sensitive_info(self, text: str) -> Dict[str, Any]:
         """Detect sensitive information in text."""
         detected_items = []
+        budget = RegexBudget()
         
         for item in self.sensitive_patterns:
             
             pattern = item["pattern"]
             pattern_name = item["name"]
 
-            matches = re.finditer(pattern, text)
+            matches = pattern.finditer(text, budget)
             for match in matches:
                 detected_items.append({
                     "pattern_id": pattern_name,
                     "position": match.span()
                 })
         
+        # Fail closed: text the patterns never saw (time budget ran out, or clipped to
+        # max_chars) is reported as sensitive so it gets blocked/redacted, not passed through.
+        text = text or ""
+        if budget.exhausted:
+            detected_items.append({"pattern_id": "unscanned", "position": (0, len(text))})
+        elif len(budget.clip(text)) < len(text):
+            detected_items.append({"pattern_id": "unscanned", "position": (budget.max_chars, len(text))})
+        
         return {
             "contains_sensitive": len(detected_items) > 0,
             "detected_items": detected_items
@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from backend.models import ReportCheckpoint
+
+# Report pipeline checkpoints, in stage order:
+#   collected - raw collection blob (preview data + deep crawl results)
+#   extracted - ids of the InformationPiece rows created from it
+#   scored    - [piece id, risk score, risk level] per piece
+# Payloads are stored zlib-compressed and encrypted (EncryptedCompressedJSON).
+CHECKPOINT_STAGES = ('collected', 'extracted', 'scored')
+
+
+def save_checkpoint(db, report_id, stage, payload):
+    """Stores (or replaces) the checkpoint of a stage and commits."""
+    db.session.query(ReportCheckpoint).filter_by(report_id=report_id, stage=stage).delete(synchronize_session=False)
+    db.session.add(ReportCheckpoint(report_id=report_id, stage=stage, payload=payload))
+    db.session.commit()
+
+
+def load_checkpoints(db, report_id):
+    """{stage: payload} of the completed stages of a report, in stage order."""
+    try:
+        stored = dict(db.session.query(ReportCheckpoint.stage, ReportCheckpoint.payload).filter_by(report_id=report_id).all())
+    except Exception as e:
+        # undecryptable / corrupt payload: start over rather than resume from it
+        db.session.rollback()
+        print(f"[CHECKPOINT] Report {report_id}: unreadable checkpoints dropped ({e})")
+        clear_checkpoints(db, report_id)
+        return {}
+    return {stage: stored[stage] for stage in CHECKPOINT_STAGES if stage in stored}
+
+
+def has_checkpoints(db, report_id):
+    return db.session.query(ReportCheckpoint.id).filter_by(report_id=report_id).first() is not None
+
+
+def clear_checkpoints(db, report_id):
+    db.session.query(ReportCheckpoint).filter_by(report_id=report_id).delete(synchronize_session=False)
+    db.session.commit()
+
+
+def delete_old_checkpoints(db, cutoff: datetime):
+    """Checkpoints of reports that were never retried (no commit). Returns the number of deleted rows."""
+    return db.session.query(ReportCheckpoint).filter(ReportCheckpoint.created_at < cutoff).delete(synchronize_session=False)
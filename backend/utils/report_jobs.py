@@ -0,0 +1,459 @@
+import threading
+import time
+from collections import deque
+
+from backend.utils.config import Config
+from backend.utils.cancellation import ReportCancelled, report_cancellations
+from backend.utils.corroboration import query_key
+from backend.utils.sql_profiler import profile_job
+
+# Background report generation.
+# /api/search only creates the Report row and submits the pipeline here; the client follows
+# progress through the SSE stream /api/report/<id>/events (stage, finding and summary events)
+# or polls /api/report/<id>/status, and reads the result from /api/report/<id>.
+# DELETE /api/report/<id>/job cancels a queued or running report (see backend.utils.cancellation).
+
+# stage -> progress percent shown to the user
+REPORT_STAGES = {
+    'queued': 0,
+    'collecting': 10,
+    'preview': 30,  # preliminary report from search snippets, deep crawl still running
+    'extracting': 40,
+    'scoring': 75,
+    'finalizing': 90,
+    'completed': 100,
+    'failed': 100,
+    'cancelled': 100,
+}
+
+FINISHED_STAGES = ('completed', 'failed', 'cancelled')
+
+
+class ReportEventBus:
+    """
+    Per-report event log with blocking readers, backing the SSE endpoint.
+    Events are kept until the report has been finished for a while, so a reader that connects
+    late (or reconnects with Last-Event-ID) first gets everything it missed.
+    """
+
+    def __init__(self):
+        self._lock = threading.Condition()
+        self._channels = {}  # report_id -> {'events': [(id, event, data)], 'closed': bool, 'updated_at': float}
+        self._readers = {}   # report_id -> connected SSE clients
+
+    def publish(self, report_id, event, data):
+        with self._lock:
+            channel = self._channels.setdefault(report_id, {'events': [], 'closed': False, 'updated_at': 0.0})
+            channel['events'].append((len(channel['events']) + 1, event, data))
+            channel['updated_at'] = time.time()
+            self._lock.notify_all()
+
+    def close(self, report_id):
+        """Marks the stream finished; readers drain the remaining events and stop."""
+        with self._lock:
+            channel = self._channels.get(report_id)
+            if channel:
+                channel['closed'] = True
+                channel['updated_at'] = time.time()
+                self._lock.notify_all()
+
+    def reset(self, report_id):
+        """Starts a fresh stream for a new attempt (retry) of a report."""
+        with self._lock:
+            self._channels.pop(report_id, None)
+
+    def has_channel(self, report_id):
+        with self._lock:
+            return report_id in self._channels
+
+    def attach(self, report_id):
+        """Counts a connected SSE client of the report."""
+        with self._lock:
+            self._readers[report_id] = self._readers.get(report_id, 0) + 1
+
+    def detach(self, report_id):
+        """Client disconnected; returns how many are still following the report."""
+        with self._lock:
+            remaining = self._readers.get(report_id, 1) - 1
+            if remaining > 0:
+                self._readers[report_id] = remaining
+            else:
+                self._readers.pop(report_id, None)
+            return max(0, remaining)
+
+    def readers(self, report_id):
+        with self._lock:
+            return self._readers.get(report_id, 0)
+
+    def stream(self, report_id, after_id=0, heartbeat_seconds=15):
+        """
+        Yields (id, event, data) for events after `after_id` as they are published, and None every
+        `heartbeat_seconds` without events (keep-alive). Ends once the report's stream is closed.
+        """
+        while True:
+            with self._lock:
+                channel = self._channels.get(report_id)
+                if channel is None:
+                    return
+                pending = channel['events'][after_id:]
+                if not pending:
+                    if channel['closed']:
+                        return
+                    self._lock.wait(heartbeat_seconds)
+                    pending = channel['events'][after_id:]
+                closed, total = channel['closed'], len(channel['events'])
+
+            if not pending:
+                yield None
+                continue
+            for item in pending:
+                yield item
+            after_id = pending[-1][0]
+            if closed and after_id >= total:
+                return
+
+    def discard_finished(self, max_age_seconds=3600):
+        """Drops closed streams older than max_age_seconds."""
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            for report_id in [rid for rid, c in self._channels.items() if c['closed'] and c['updated_at'] < cutoff]:
+                del self._channels[report_id]
+
+
+report_events = ReportEventBus()
+
+
+class ReportProgress:
+    """In-process stage/progress registry for running reports (the Report row keeps the final status)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._entries = {}
+
+    def update(self, report_id, stage, message=None, queue=None):
+        """queue: {'position', 'eta_seconds'} while the report waits for a worker."""
+        entry = {
+            'stage': stage,
+            'progress': REPORT_STAGES.get(stage, 0),
+            'message': message,
+            'queue': queue,
+            'updated_at': time.time()
+        }
+        with self._lock:
+            self._entries[report_id] = entry
+
+        report_events.publish(report_id, 'stage', {k: entry[k] for k in ('stage', 'progress', 'message', 'queue')})
+        if stage in FINISHED_STAGES:
+            report_events.close(report_id)
+
+    def get(self, report_id):
+        with self._lock:
+            entry = self._entries.get(report_id)
+            return dict(entry) if entry else None
+
+    def discard(self, report_id):
+        with self._lock:
+            self._entries.pop(report_id, None)
+
+    def discard_finished(self, max_age_seconds=3600):
+        """Drops finished (completed/failed/cancelled) entries older than max_age_seconds."""
+        cutoff = time.time() - max_age_seconds
+        with self._lock:
+            for report_id in [rid for rid, e in self._entries.items()
+                              if e['stage'] in FINISHED_STAGES and e['updated_at'] < cutoff]:
+                del self._entries[report_id]
+
+
+report_progress = ReportProgress()
+
+
+class _Flight:
+    __slots__ = ('report_id', 'ready', 'finished_at')
+
+    def __init__(self):
+        self.report_id = None
+        self.ready = threading.Event()  # set once the leader created the Report row (or gave up)
+        self.finished_at = None
+
+
+class ReportSingleFlight:
+    """
+    In-flight registry of report generations keyed by (user, normalized query, source flags).
+    A request identical to one that is running - or that finished less than `window_seconds`
+    ago - attaches to that report instead of starting a second collection pipeline.
+    Failed reports are dropped right away so a retry starts fresh.
+    """
+
+    def __init__(self, window_seconds=None):
+        self.window_seconds = Config.REPORT_SINGLE_FLIGHT_WINDOW_SECONDS if window_seconds is None else window_seconds
+        self._lock = threading.Lock()
+        self._flights = {}     # key -> _Flight
+        self._by_report = {}   # report_id -> key
+
+    @staticmethod
+    def key(user_email, query, use_general, use_facebook):
+        return (user_email, query_key(query), bool(use_general), bool(use_facebook))
+
+    def join(self, key, start, wait_seconds=30, reuse_finished=True):
+        """
+        Returns (report_id, started). The first caller for a key runs start() -> report_id and
+        gets started=True (it must submit the job); concurrent callers wait for that id.
+        reuse_finished=False (force refresh) only attaches to a report that is still running.
+        """
+        now = time.time()
+        with self._lock:
+            self._purge(now)
+            flight = self._flights.get(key)
+            if flight is not None and flight.finished_at is not None and not reuse_finished:
+                flight = None
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+
+        if not leader:
+            flight.ready.wait(wait_seconds)
+            if flight.report_id:
+                return flight.report_id, False
+            return start(), True  # the leader failed to create its report, run independently
+
+        try:
+            flight.report_id = start()
+        except Exception:
+            with self._lock:
+                self._flights.pop(key, None)
+            raise
+        finally:
+            flight.ready.set()
+
+        with self._lock:
+            self._by_report[flight.report_id] = key
+        return flight.report_id, True
+
+    def forget(self, report_id):
+        """Drops the report's flight: later identical requests no longer attach to it."""
+        self.finished(report_id, failed=True)
+
+    def finished(self, report_id, failed=False):
+        with self._lock:
+            key = self._by_report.pop(report_id, None)
+            flight = self._flights.get(key)
+            if flight is None or flight.report_id != report_id:
+                return
+            if failed or self.window_seconds <= 0:
+                del self._flights[key]
+            else:
+                flight.finished_at = time.time()
+
+    def _purge(self, now):
+        expired = [key for key, flight in self._flights.items()
+                   if flight.finished_at is not None and now - flight.finished_at > self.window_seconds]
+        for key in expired:
+            del self._flights[key]
+
+
+report_single_flight = ReportSingleFlight()
+
+
+class _Job:
+    __slots__ = ('report_id', 'owner', 'fn', 'args', 'kwargs', 'priority', 'finish_tag', 'seq')
+
+    def __init__(self, report_id, owner, fn, args, kwargs, priority, finish_tag, seq):
+        self.report_id = report_id
+        self.owner = owner
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.priority = priority
+        self.finish_tag = finish_tag
+        self.seq = seq
+
+    @property
+    def sort_key(self):
+        return (self.priority, self.finish_tag, self.seq)
+
+
+class ReportJobExecutor:
+    """
+    Fair scheduler running report pipelines inside an app context on `report_workers` threads.
+
+    - at most `report_user_concurrency` reports of one user run at once, the rest wait
+    - waiting jobs are ordered by weighted fair queuing across users (each job advances its
+      user's virtual finish time by 1/weight), so a user with dozens of searches queued
+      cannot starve one with a single search
+    - admin jobs are dispatched before everyone else's (and weigh `report_admin_weight`)
+    - queued jobs get a position / ETA estimate, refreshed on every dispatch
+    """
+
+    def __init__(self, app, max_workers=None, queue_limit=None):
+        self.app = app
+        self.progress = report_progress
+        self.single_flight = report_single_flight
+        self.max_workers = max_workers or Config.REPORT_WORKERS
+        self.queue_limit = Config.REPORT_QUEUE_LIMIT if queue_limit is None else queue_limit
+        self.user_concurrency = max(1, Config.REPORT_USER_CONCURRENCY)
+        self.user_queue_limit = Config.REPORT_USER_QUEUE_LIMIT
+
+        self._cond = threading.Condition()
+        self._queues = {}        # owner -> deque of _Job, in submission order
+        self._running = {}       # owner -> running job count
+        self._last_finish = {}   # owner -> virtual finish tag of the owner's last queued job
+        self._virtual_time = 0.0
+        self._seq = 0
+        self._avg_seconds = None  # moving average of job durations, for ETAs
+
+        for i in range(self.max_workers):
+            threading.Thread(target=self._worker, name=f'report-{i}', daemon=True).start()
+
+    def submit(self, report_id, owner, fn, *args, admin=False, **kwargs):
+        """
+        Queues fn(*args, **kwargs, cancel_token=...) for `owner` (user email); fn is responsible for
+        marking the Report row failed / cancelled. Raises RuntimeError when the global or the owner's
+        queue is full.
+        """
+        weight = Config.REPORT_ADMIN_WEIGHT if admin else 1.0
+        with self._cond:
+            queued = sum(len(q) for q in self._queues.values())
+            if queued >= self.queue_limit:
+                raise RuntimeError("Too many reports are being generated right now. Please try again shortly.")
+            own_queue = self._queues.setdefault(owner, deque())
+            if not admin and len(own_queue) >= self.user_queue_limit:
+                raise RuntimeError("You already have too many reports waiting. Please wait for them to finish.")
+
+            finish_tag = max(self._virtual_time, self._last_finish.get(owner, 0.0)) + 1.0 / weight
+            self._last_finish[owner] = finish_tag
+            self._seq += 1
+            report_events.reset(report_id)
+            kwargs['cancel_token'] = report_cancellations.register(report_id)
+            own_queue.append(_Job(report_id, owner, fn, args, kwargs, 0 if admin else 1, finish_tag, self._seq))
+            self._cond.notify()
+            positions = self._queue_positions()
+
+        self._publish_positions(positions)
+
+    def cancel(self, report_id):
+        """
+        Drops a queued job ('queued', the caller marks the Report row) or cancels the token of a running
+        one ('running', its pipeline stops and marks the row). None if this executor does not have it.
+        """
+        with self._cond:
+            job = None
+            for owner, jobs in self._queues.items():
+                job = next((j for j in jobs if j.report_id == report_id), None)
+                if job is not None:
+                    jobs.remove(job)
+                    if not jobs and not self._running.get(owner):
+                        del self._queues[owner]
+                        self._last_finish.pop(owner, None)
+                    break
+            positions = self._queue_positions() if job is not None else None
+
+        if job is not None:
+            report_cancellations.discard(report_id, job.kwargs['cancel_token'])
+            self.single_flight.finished(report_id, failed=True)
+            self.progress.update(report_id, 'cancelled')
+            self._publish_positions(positions)
+            return 'queued'
+        if report_cancellations.cancel(report_id, "Report generation was cancelled."):
+            return 'running'
+        return None
+
+    def queue_position(self, report_id):
+        """{'position', 'eta_seconds'} for a queued report, None if it is running or unknown."""
+        with self._cond:
+            return self._queue_positions().get(report_id)
+
+    @property
+    def pending(self):
+        with self._cond:
+            return sum(len(q) for q in self._queues.values()) + sum(self._running.values())
+
+    # ---------- scheduling ----------
+
+    def _next_job(self):
+        """Head job with the smallest (priority, finish tag) among owners below the concurrency cap."""
+        best = None
+        for owner, jobs in self._queues.items():
+            if jobs and self._running.get(owner, 0) < self.user_concurrency:
+                if best is None or jobs[0].sort_key < best.sort_key:
+                    best = jobs[0]
+        return best
+
+    def _queue_positions(self):
+        """
+        Estimated dispatch order of all queued jobs (caller holds the lock). Simulates the scheduler
+        assuming every running job finishes at the same pace; ETA = waves ahead x average duration.
+        """
+        running = dict(self._running)
+        queues = {owner: list(jobs) for owner, jobs in self._queues.items() if jobs}
+        free = max(0, self.max_workers - sum(running.values()))
+        avg = self._avg_seconds or Config.REPORT_ESTIMATED_SECONDS
+
+        positions = {}
+        position = 0
+        while queues:
+            candidates = [jobs[0] for owner, jobs in queues.items() if running.get(owner, 0) < self.user_concurrency]
+            if not candidates:
+                # every remaining owner is at its cap: next wave starts when their jobs finish
+                running = {}
+                continue
+            job = min(candidates, key=lambda j: j.sort_key)
+            position += 1
+            waves = 0 if position <= free else (position - free - 1) // self.max_workers + 1
+            positions[job.report_id] = {'position': position, 'eta_seconds': int(waves * avg)}
+            running[job.owner] = running.get(job.owner, 0) + 1
+            queues[job.owner].pop(0)
+            if not queues[job.owner]:
+                del queues[job.owner]
+        return positions
+
+    def _publish_positions(self, positions):
+        for report_id, queue in positions.items():
+            self.progress.update(report_id, 'queued', queue=queue)
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                job = self._next_job()
+                while job is None:
+                    self._cond.wait()
+                    job = self._next_job()
+                self._queues[job.owner].popleft()
+                self._running[job.owner] = self._running.get(job.owner, 0) + 1
+                self._virtual_time = max(self._virtual_time, job.finish_tag)
+                positions = self._queue_positions()
+
+            self._publish_positions(positions)
+            started = time.monotonic()
+            try:
+                self._run(job)
+            finally:
+                elapsed = time.monotonic() - started
+                with self._cond:
+                    self._running[job.owner] -= 1
+                    if not self._running[job.owner]:
+                        del self._running[job.owner]
+                        if not self._queues.get(job.owner):
+                            self._queues.pop(job.owner, None)
+                            self._last_finish.pop(job.owner, None)
+                    self._avg_seconds = elapsed if self._avg_seconds is None else 0.8 * self._avg_seconds + 0.2 * elapsed
+                    self._cond.notify_all()
+
+    def _run(self, job):
+        report_id = job.report_id
+        failed = True
+        try:
+            with self.app.app_context(), profile_job(f"report {report_id}"):
+                job.fn(*job.args, **job.kwargs)
+                failed = False
+                self.progress.update(report_id, 'completed')
+        except ReportCancelled:
+            print(f"[REPORT] {report_id} cancelled")
+            self.progress.update(report_id, 'cancelled')
+        except Exception as e:
+            print(f"[REPORT] {report_id} failed: {e}")
+            self.progress.update(report_id, 'failed', message='Report generation failed.')
+        finally:
+            report_cancellations.discard(report_id, job.kwargs['cancel_token'])
+            self.single_flight.finished(report_id, failed=failed)
+            self.progress.discard_finished()
+            report_events.discard_finished()
@@ -0,0 +1,396 @@
+import os
+import random
+import socket
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy import and_, case, func, or_, select, update
+
+from backend.models import Report, ReportJob
+from backend.utils.config import Config
+from backend.utils.cancellation import CancellationToken, ReportCancelled
+from backend.utils.corroboration import query_key
+from backend.utils.report_jobs import report_progress, report_events
+from backend.utils.sql_profiler import profile_job
+
+# Durable report queue (report_queue_backend: database).
+# The API only inserts ReportJob rows; report workers on any number of nodes claim them with
+# SELECT ... FOR UPDATE SKIP LOCKED, run the ReportService pipeline and keep a lease alive by
+# heartbeat. Failed attempts are retried with exponential backoff, jobs of dead workers are
+# reclaimed once their lease expires. A cancel request (cancel_requested) is picked up by the
+# worker's heartbeat thread within report_cancel_poll_seconds and stops the pipeline. Works on PostgreSQL; on SQLite (single node / tests)
+# FOR UPDATE is not rendered and the conditional claim UPDATE alone keeps claims exclusive.
+#
+# Run a worker:
+#     python -m backend.report_worker --concurrency 2
+
+
+class ReportJobQueue:
+
+    def __init__(self, db):
+        self.db = db
+
+    # ---------- API side ----------
+
+    def enqueue(self, report_id, user_email, use_general=True, use_facebook=False, admin=False):
+        """Adds a job for an existing Report row. Raises RuntimeError when the queue or the user's queue is full."""
+        queued, own = self.db.session.query(
+            func.count(ReportJob.id),
+            func.sum(case((ReportJob.user_email == user_email, 1), else_=0))
+        ).filter(ReportJob.status == 'queued').one()
+        if queued >= Config.REPORT_QUEUE_LIMIT:
+            raise RuntimeError("Too many reports are being generated right now. Please try again shortly.")
+        if not admin and (own or 0) >= Config.REPORT_USER_QUEUE_LIMIT:
+            raise RuntimeError("You already have too many reports waiting. Please wait for them to finish.")
+
+        self.db.session.add(ReportJob(
+            report_id=report_id,
+            user_email=user_email,
+            use_general=bool(use_general),
+            use_facebook=bool(use_facebook),
+            priority=0 if admin else 1,
+            max_attempts=Config.REPORT_JOB_MAX_ATTEMPTS
+        ))
+        self.db.session.commit()
+
+    def requeue(self, report_id):
+        """Puts a failed or cancelled job back in the queue with a fresh attempt budget. Returns False if there is none."""
+        updated = self.db.session.query(ReportJob)\
+            .filter(ReportJob.report_id == report_id, ReportJob.status.in_(('failed', 'cancelled')))\
+            .update({'status': 'queued', 'stage': 'queued', 'attempts': 0, 'available_at': datetime.utcnow(),
+                     'finished_at': None, 'cancel_requested': False}, synchronize_session=False)
+        self.db.session.commit()
+        return bool(updated)
+
+    def cancel(self, report_id):
+        """
+        Cancels a queued job right away ('queued') or asks the worker running it to stop ('running', the
+        worker marks the report once its pipeline stopped). None when the job is neither queued nor running.
+        """
+        session = self.db.session
+        cancelled = session.query(ReportJob)\
+            .filter(ReportJob.report_id == report_id, ReportJob.status == 'queued')\
+            .update({'status': 'cancelled', 'stage': 'cancelled', 'finished_at': datetime.utcnow()}, synchronize_session=False)
+        if cancelled:
+            session.commit()
+            self._set_report_status(report_id, 'cancelled')
+            return 'queued'
+
+        requested = session.query(ReportJob)\
+            .filter(ReportJob.report_id == report_id, ReportJob.status == 'running')\
+            .update({'cancel_requested': True}, synchronize_session=False)
+        session.commit()
+        return 'running' if requested else None
+
+    def active_report(self, user_email, query, use_general, use_facebook):
+        """Report id of the user's queued or running job for the same (normalized) query and sources, or None."""
+        return self.db.session.query(ReportJob.report_id)\
+            .join(Report, Report.report_id == ReportJob.report_id)\
+            .filter(ReportJob.user_email == user_email,
+                    ReportJob.status.in_(('queued', 'running')),
+                    ReportJob.use_general == bool(use_general),
+                    ReportJob.use_facebook == bool(use_facebook),
+                    Report.query_key == query_key(query))\
+            .order_by(ReportJob.id.desc())\
+            .limit(1)\
+            .scalar()
+
+    def get_job(self, report_id):
+        return self.db.session.query(ReportJob).filter_by(report_id=report_id).first()
+
+    def queue_position(self, report_id):
+        """{'position', 'eta_seconds'} for a queued job (jobs ahead in claim order), None otherwise."""
+        job = self.get_job(report_id)
+        if job is None or job.status != 'queued':
+            return None
+        ahead = self.db.session.query(func.count(ReportJob.id)).filter(
+            ReportJob.status == 'queued',
+            or_(ReportJob.priority < job.priority,
+                and_(ReportJob.priority == job.priority, ReportJob.available_at < job.available_at),
+                and_(ReportJob.priority == job.priority, ReportJob.available_at == job.available_at, ReportJob.id < job.id))
+        ).scalar() or 0
+        waves = ahead // max(1, Config.REPORT_WORKERS) + 1
+        return {'position': ahead + 1, 'eta_seconds': int(waves * Config.REPORT_ESTIMATED_SECONDS)}
+
+    # ---------- worker side ----------
+
+    def _claimable(self, now):
+        return or_(
+            and_(ReportJob.status == 'queued', ReportJob.available_at <= now),
+            and_(ReportJob.status == 'running', ReportJob.lease_expires_at < now)  # worker died
+        )
+
+    def claim(self, worker_id):
+        """
+        Claims the next job (admins first, then oldest) whose user is below the per-user concurrency cap.
+        Returns the claimed ReportJob or None.
+        """
+        session = self.db.session
+        while True:
+            now = datetime.utcnow()
+            busy_users = session.query(ReportJob.user_email).filter(
+                ReportJob.status == 'running', ReportJob.lease_expires_at >= now
+            ).group_by(ReportJob.user_email).having(func.count(ReportJob.id) >= Config.REPORT_USER_CONCURRENCY)
+
+            job = session.query(ReportJob)\
+                .filter(self._claimable(now), ReportJob.user_email.notin_(busy_users))\
+                .order_by(ReportJob.priority, ReportJob.available_at, ReportJob.id)\
+                .with_for_update(skip_locked=True)\
+                .first()
+            if job is None:
+                session.rollback()
+                return None
+
+            if job.attempts >= job.max_attempts:
+                # lease expired on the last attempt: give up instead of retrying forever
+                self._give_up(job, job.last_error or "worker lost its lease")
+                continue
+
+            claimed = session.query(ReportJob)\
+                .filter(ReportJob.id == job.id, self._claimable(now))\
+                .update({
+                    'status': 'running',
+                    'attempts': ReportJob.attempts + 1,
+                    'lease_owner': worker_id,
+                    'lease_expires_at': now + timedelta(seconds=Config.REPORT_JOB_LEASE_SECONDS),
+                    'heartbeat_at': now
+                }, synchronize_session=False)
+            session.commit()
+            if claimed:
+                session.refresh(job)
+                return job
+            # another worker got it between SELECT and UPDATE (SQLite has no row locks), try the next one
+
+    def heartbeat(self, connection, job_id, worker_id, stage=None):
+        """Extends the lease (on a separate connection). False when the lease was lost to another worker."""
+        now = datetime.utcnow()
+        values = {'lease_expires_at': now + timedelta(seconds=Config.REPORT_JOB_LEASE_SECONDS), 'heartbeat_at': now}
+        if stage:
+            values['stage'] = stage
+        result = connection.execute(
+            update(ReportJob.__table__)
+            .where(ReportJob.__table__.c.id == job_id, ReportJob.__table__.c.lease_owner == worker_id)
+            .values(**values)
+        )
+        return result.rowcount == 1
+
+    def cancel_requested(self, connection, job_id):
+        return bool(connection.execute(
+            select(ReportJob.__table__.c.cancel_requested).where(ReportJob.__table__.c.id == job_id)
+        ).scalar())
+
+    def complete(self, job_id, worker_id):
+        self._finish(job_id, worker_id, {'status': 'completed', 'stage': 'completed', 'finished_at': datetime.utcnow()})
+
+    def cancelled(self, job_id, worker_id, report_id):
+        self._finish(job_id, worker_id, {'status': 'cancelled', 'stage': 'cancelled', 'finished_at': datetime.utcnow()})
+        self._set_report_status(report_id, 'cancelled')
+
+    def reclaimed(self, job_id, worker_id, report_id):
+        """
+        True when another worker took the job over (this worker's lease expired). The stopped attempt marked
+        the report failed/cancelled on its way out; while the new owner runs it, it is "processing" again.
+        """
+        job = self.db.session.get(ReportJob, job_id, populate_existing=True)
+        if job is None or job.lease_owner == worker_id:
+            return False
+        if job.status == 'running':
+            self._set_report_status(report_id, 'processing')
+        return True
+
+    def fail(self, job_id, worker_id, error):
+        """Schedules a retry with exponential backoff, or fails the job for good. Returns True if it will be retried."""
+        job = self.db.session.get(ReportJob, job_id)
+        if job.lease_owner != worker_id:
+            return False  # reclaimed meanwhile, the new owner settles it
+        if job.attempts < job.max_attempts:
+            delay = min(Config.REPORT_JOB_BACKOFF_MAX_SECONDS,
+                        Config.REPORT_JOB_BACKOFF_SECONDS * 2 ** (job.attempts - 1))
+            delay *= random.uniform(0.5, 1.0)  # jitter: retries of a shared outage don't line up
+            self._finish(job_id, worker_id, {
+                'status': 'queued',
+                'stage': 'queued',
+                'available_at': datetime.utcnow() + timedelta(seconds=delay),
+                'lease_owner': None,
+                'lease_expires_at': None,
+                'last_error': str(error)[:2000]
+            })
+            # the pipeline marked the report failed, it is still being worked on
+            self._set_report_status(job.report_id, 'processing')
+            return True
+
+        self._give_up(job, error)
+        return False
+
+    def _finish(self, job_id, worker_id, values):
+        # only the lease owner may settle the job, a reclaimed job belongs to the new worker
+        self.db.session.query(ReportJob)\
+            .filter(ReportJob.id == job_id, ReportJob.lease_owner == worker_id)\
+            .update(values, synchronize_session=False)
+        self.db.session.commit()
+
+    def _give_up(self, job, error):
+        job.status = 'failed'
+        job.stage = 'failed'
+        job.last_error = str(error)[:2000]
+        job.finished_at = datetime.utcnow()
+        job.lease_owner = None
+        job.lease_expires_at = None
+        self.db.session.commit()
+        self._set_report_status(job.report_id, 'failed')
+
+    def _set_report_status(self, report_id, status):
+        self.db.session.query(Report).filter_by(report_id=report_id).update({'status': status}, synchronize_session=False)
+        self.db.session.commit()
+
+
+class _Heartbeat(threading.Thread):
+    """
+    Extends the job lease every report_job_heartbeat_seconds and reports the pipeline stage.
+    In between it checks every report_cancel_poll_seconds whether the job was cancelled.
+    """
+
+    def __init__(self, queue, engine, job_id, report_id, worker_id, cancel_token):
+        super().__init__(name=f'heartbeat-{job_id}', daemon=True)
+        self.queue = queue
+        self.engine = engine
+        self.job_id = job_id
+        self.report_id = report_id
+        self.worker_id = worker_id
+        self.cancel_token = cancel_token
+        self.lease_lost = False
+        self._stop = threading.Event()
+
+    def run(self):
+        poll_seconds = min(Config.REPORT_CANCEL_POLL_SECONDS, Config.REPORT_JOB_HEARTBEAT_SECONDS)
+        next_beat = time.monotonic() + Config.REPORT_JOB_HEARTBEAT_SECONDS
+        while not self._stop.wait(poll_seconds):
+            try:
+                with self.engine.begin() as connection:
+                    if not self.cancel_token.cancelled and self.queue.cancel_requested(connection, self.job_id):
+                        print(f"[WORKER] Job {self.job_id} (report {self.report_id}) cancelled, stopping it")
+                        self.cancel_token.cancel("Report generation was cancelled.")
+                    if time.monotonic() < next_beat:
+                        continue
+                    next_beat = time.monotonic() + Config.REPORT_JOB_HEARTBEAT_SECONDS
+                    progress = report_progress.get(self.report_id)
+                    alive = self.queue.heartbeat(connection, self.job_id, self.worker_id, progress and progress['stage'])
+            except Exception as e:
+                print(f"[WORKER] Heartbeat for job {self.job_id} failed: {e}")
+                continue
+            if not alive:
+                self.lease_lost = True
+                print(f"[WORKER] Lost the lease on job {self.job_id} (report {self.report_id}), another worker reclaimed it")
+                # the new owner runs the report, stop this attempt instead of racing it
+                self.cancel_token.cancel("Another worker took over the job.")
+                return
+
+    def stop(self):
+        self._stop.set()
+
+
+class ReportWorker:
+    """
+    Claims ReportJob rows and runs them through ReportService.run_report.
+    Each worker thread needs an app context; run_forever() pushes one per thread.
+    """
+
+    def __init__(self, app, db, report_service, fb_auth_service, worker_id=None):
+        self.app = app
+        self.db = db
+        self.queue = ReportJobQueue(db)
+        self.report_service = report_service
+        self.fb_auth_service = fb_auth_service
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.stop_event = threading.Event()
+
+    def run_forever(self, concurrency=1):
+        threads = [
+            threading.Thread(target=self._loop, args=(f"{self.worker_id}/{i}",), name=f'report-worker-{i}', daemon=True)
+            for i in range(max(1, concurrency))
+        ]
+        for thread in threads:
+            thread.start()
+        print(f"[WORKER] {self.worker_id} running {len(threads)} report worker thread(s)")
+        try:
+            while any(thread.is_alive() for thread in threads):
+                for thread in threads:
+                    thread.join(timeout=1.0)
+        except KeyboardInterrupt:
+            print("[WORKER] Stopping after the running jobs...")
+            self.stop_event.set()
+            for thread in threads:
+                thread.join()
+
+    def _loop(self, worker_id):
+        with self.app.app_context():
+            while not self.stop_event.is_set():
+                try:
+                    if not self.run_once(worker_id):
+                        # idle: poll with jitter so idle workers don't hit the table in lockstep
+                        self.stop_event.wait(Config.REPORT_WORKER_POLL_SECONDS * random.uniform(0.5, 1.5))
+                except Exception as e:
+                    self.db.session.rollback()
+                    print(f"[WORKER] {worker_id} error: {e}")
+                    self.stop_event.wait(Config.REPORT_WORKER_POLL_SECONDS)
+                finally:
+                    self.db.session.remove()
+
+    def run_once(self, worker_id=None):
+        """Claims and runs one job. Returns False when nothing was claimable."""
+        worker_id = worker_id or self.worker_id
+        job = self.queue.claim(worker_id)
+        if job is None:
+            return False
+
+        job_id, report_id, attempt = job.id, job.report_id, job.attempts
+        user_email, use_general, use_facebook = job.user_email, job.use_general, job.use_facebook
+        query = self.db.session.query(Report.user_query).filter_by(report_id=report_id).scalar()
+        print(f"[WORKER] {worker_id} claimed job {job_id} (report {report_id}, attempt {attempt}/{job.max_attempts})")
+
+        if job.cancel_requested:
+            # cancelled while its previous worker died
+            self.queue.cancelled(job_id, worker_id, report_id)
+            return True
+
+        report_events.reset(report_id)
+        cancel_token = CancellationToken()
+        heartbeat = _Heartbeat(self.queue, self.db.engine, job_id, report_id, worker_id, cancel_token)
+        heartbeat.start()
+        started = time.monotonic()
+        try:
+            # a retry resumes from the report's checkpoints (see ReportService._run_pipeline)
+            fb_cookies = self.fb_auth_service.get_cookies(user_email) if use_facebook else None
+            with profile_job(f"report {report_id}"):
+                self.report_service.run_report(report_id, query, fb_cookies, use_facebook=use_facebook,
+                                               use_general=use_general, cancel_token=cancel_token)
+        except ReportCancelled:
+            if self.queue.reclaimed(job_id, worker_id, report_id):
+                # lease lost (see _Heartbeat): the new owner reports progress from now on
+                report_progress.discard(report_id)
+                print(f"[WORKER] Job {job_id} (report {report_id}) stopped, it is running on another worker now")
+                return True
+            # checkpoints are kept, a retry resumes from them
+            self.queue.cancelled(job_id, worker_id, report_id)
+            report_progress.update(report_id, 'cancelled')
+            print(f"[WORKER] Job {job_id} (report {report_id}) cancelled after {time.monotonic() - started:.1f}s")
+        except Exception as e:
+            self.db.session.rollback()
+            if self.queue.reclaimed(job_id, worker_id, report_id):
+                # not this worker's to retry or give up: the new owner settles the job
+                report_progress.discard(report_id)
+                print(f"[WORKER] Job {job_id} attempt {attempt} failed after another worker took it over: {e}")
+                return True
+            retried = self.queue.fail(job_id, worker_id, e)
+            print(f"[WORKER] Job {job_id} attempt {attempt} failed: {e}" + (" - will retry" if retried else " - giving up"))
+            report_progress.update(report_id, 'queued' if retried else 'failed',
+                                   message=None if retried else 'Report generation failed.')
+        else:
+            self.queue.complete(job_id, worker_id)
+            report_progress.update(report_id, 'completed')
+            print(f"[WORKER] Job {job_id} (report {report_id}) completed in {time.monotonic() - started:.1f}s")
+        finally:
+            heartbeat.stop()
+            report_progress.discard_finished()
+        return True
@@ -0,0 +1,49 @@
+from typing import List
+
+
+def generate_executive_summary(query: str, total_findings: int, risk_counts: dict, overall_risk_score: float) -> str:
+    """Generate executive summary based on findings"""
+    risk_level_desc = "Low"
+    if overall_risk_score >= 4:
+        risk_level_desc = "High"
+    elif overall_risk_score >= 1.7:
+        risk_level_desc = "Medium"
+
+    summary = f"Digital footprint analysis for '{query}' reveals {total_findings} information pieces across multiple platforms. "
+    summary += f"Overall risk level: {risk_level_desc} (score: {overall_risk_score:.2f}/10). "
+
+    if risk_counts["high"] > 0:
+        summary += f"Found {risk_counts['high']} high-risk items requiring immediate attention. "
+
+    if risk_counts["medium"] > 0:
+        summary += f"Identified {risk_counts['medium']} medium-risk items for review. "
+
+    return summary
+
+
+def generate_recommendations(risk_counts: dict, source_counts: dict) -> List[str]:
+    """Generate recommendations based on findings"""
+    recommendations = []
+
+    if risk_counts["high"] > 0:
+        recommendations.extend([
+            "Immediately review and secure accounts with compromised information",
+            "Change passwords for all affected accounts",
+            "Enable two-factor authentication where possible",
+            "Monitor credit reports for suspicious activity"
+        ])
+
+    if risk_counts["medium"] > 0:
+        recommendations.extend([
+            "Review privacy settings on social media accounts",
+            "Limit publicly visible personal information",
+            "Consider removing or updating outdated profiles"
+        ])
+
+    if "Social Media" in source_counts and source_counts["Social Media"] > 5:
+        recommendations.append("Consider reducing social media presence or improving privacy controls")
+
+    if len(recommendations) == 0:
+        recommendations.append("Continue monitoring digital footprint regularly")
+
+    return recommendations[:6]  # Limit to 6 recommendations
@@ -0,0 +1,181 @@
+import os
+import json
+import time
+import argparse
+
+from sqlalchemy import select
+
+from backend.models import InformationPiece, InformationCategory, Report
+from backend.engines.risk_assessment_engine import RiskAssessmentEngine
+from backend.utils.config import Config
+from backend.utils.report_summary import generate_executive_summary, generate_recommendations
+from backend.utils.sql_profiler import profile_job
+
+DEFAULT_STATE_PATH = os.path.join(Config.DATA_DIR, 'rescoring_state.json')
+
+
+class RiskRescoringJob:
+    """
+    Recomputes stored risk scores after the risk model changed (risk_* settings in cfg.yaml).
+
+    Pieces are streamed report by report through a server-side cursor, scored with the vectorized
+    RiskAssessmentEngine.score() and written back with bulk updates; every report's overall score,
+    risk distribution, executive summary and recommendations are recomputed right after its pieces
+    (in the same commit, so a report never quotes numbers of the old model). Progress is saved to
+    data_dir/rescoring_state.json after each committed report, so an interrupted run continues where
+    it stopped (progress is tied to the current model parameters; after changing them the next run
+    starts from the beginning).
+
+    Run: python -m backend.utils.risk_rescoring [--batch-size N] [--restart]
+    """
+
+    PIECE_COLUMNS = (
+        InformationPiece.id, InformationPiece.report_id, InformationPiece.content, InformationPiece.snippet,
+        InformationPiece.content_hash, InformationPiece.relevance_score, InformationPiece.category_id,
+        InformationPiece.created_at
+    )
+
+    def __init__(self, db, state_path=DEFAULT_STATE_PATH):
+        self.db = db
+        self.state_path = state_path
+        self.risk_engine = RiskAssessmentEngine(db)
+
+    def run(self, batch_size=2000, restart=False, commit_every=2000):
+        state = self._load_state()
+        if restart or state.get('model') != self._model_fingerprint():
+            # saved progress belongs to another risk model, start over
+            state = self._new_state()
+        if state['last_report_id']:
+            print(f"[RESCORE] Resuming after report {state['last_report_id']} "
+                  f"({state['reports']} reports, {state['pieces']} pieces done)")
+
+        cat_map = {c.id: c.name for c in self.db.session.query(InformationCategory).all()}
+        reports = {
+            r.report_id: (r.id, r.user_query, r.source_distribution)
+            for r in self.db.session.query(Report.id, Report.report_id, Report.user_query, Report.source_distribution)
+        }
+
+        stmt = select(*self.PIECE_COLUMNS).order_by(InformationPiece.report_id, InformationPiece.id)
+        if state['last_report_id']:
+            stmt = stmt.where(InformationPiece.report_id > state['last_report_id'])
+
+        started = time.monotonic()
+        pending_pieces, pending_reports = [], []
+        processed = 0
+
+        # separate connection for the server-side cursor, so committing the updates does not close it
+        with self.db.engine.connect().execution_options(stream_results=True, yield_per=batch_size) as conn:
+            current_id, rows = None, []
+
+            for partition in conn.execute(stmt).partitions():
+                for row in partition:
+                    if row.report_id != current_id and rows:
+                        self._score_report(current_id, rows, reports, cat_map, pending_pieces, pending_reports)
+                        processed += len(rows)
+                        rows = []
+                        if len(pending_pieces) >= commit_every:
+                            self._flush(state, pending_pieces, pending_reports, current_id)
+                            self._print_progress(state, processed, started)
+                    current_id = row.report_id
+                    rows.append(row)
+
+            if rows:
+                self._score_report(current_id, rows, reports, cat_map, pending_pieces, pending_reports)
+                processed += len(rows)
+            self._flush(state, pending_pieces, pending_reports, current_id)
+
+        self._print_progress(state, processed, started)
+        print("[RESCORE] Done")
+        return state
+
+    def _score_report(self, report_id, rows, reports, cat_map, pending_pieces, pending_reports):
+        report_pk, user_query, source_distribution = reports.get(report_id, (None, None, None))
+        if report_pk is None:
+            return  # orphaned pieces, removed by the retention jobs
+
+        risk_scores, risk_levels = self.risk_engine.score(rows, user_query, cat_map=cat_map)
+        pending_pieces.extend(
+            {'id': row.id, 'risk_score': score, 'risk_level': level}
+            for row, score, level in zip(rows, risk_scores.tolist(), risk_levels.tolist())
+        )
+
+        overall, risk_counts = self.risk_engine.summarize_report_risk(risk_scores)
+        pending_reports.append({
+            'id': report_pk,
+            'overall_risk_score': overall,
+            'risk_distribution': json.dumps(risk_counts),
+            'executive_summary': generate_executive_summary(user_query, len(rows), risk_counts, overall),
+            'recommendations': json.dumps(
+                generate_recommendations(risk_counts, json.loads(source_distribution or '{}'))
+            )
+        })
+
+    def _flush(self, state, pending_pieces, pending_reports, last_report_id):
+        if not pending_reports and not pending_pieces:
+            return
+        try:
+            self.db.session.bulk_update_mappings(InformationPiece, pending_pieces)
+            self.db.session.bulk_update_mappings(Report, pending_reports)
+            self.db.session.commit()
+        except Exception:
+            self.db.session.rollback()
+            raise
+
+        state['pieces'] += len(pending_pieces)
+        state['reports'] += len(pending_reports)
+        state['last_report_id'] = last_report_id
+        self._save_state(state)
+
+        pending_pieces.clear()
+        pending_reports.clear()
+
+    def _print_progress(self, state, processed, started):
+        elapsed = max(time.monotonic() - started, 1e-9)
+        print(f"[RESCORE] {state['reports']} reports, {state['pieces']} pieces total | "
+              f"{processed / elapsed:.0f} pieces/s this run")
+
+    # =============== State ===============
+
+    def _model_fingerprint(self):
+        engine = self.risk_engine
+        return json.dumps({
+            'alpha': engine.ALPHA,
+            'lambda_decay': engine.LAMBDA_DECAY,
+            'impact_scores': engine.IMPACT_SCORES,
+            'corroboration_source': Config.RISK_CORROBORATION_SOURCE,
+            'validation_mode': Config.RISK_VALIDATION_MODE,
+        }, sort_keys=True)
+
+    def _new_state(self):
+        return {'model': self._model_fingerprint(), 'last_report_id': None, 'reports': 0, 'pieces': 0}
+
+    def _load_state(self):
+        if not os.path.exists(self.state_path):
+            return {}
+        with open(self.state_path, 'r') as f:
+            return json.load(f)
+
+    def _save_state(self, state):
+        os.makedirs(os.path.dirname(os.path.abspath(self.state_path)), exist_ok=True)
+        tmp_path = self.state_path + '.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f)
+        os.replace(tmp_path, self.state_path)
+
+
+if __name__ == '__main__':
+    from flask import Flask
+    from backend.models import db
+
+    parser = argparse.ArgumentParser(description="Recompute stored risk scores with the current risk model")
+    parser.add_argument('--batch-size', type=int, default=2000, help="rows fetched per cursor round trip")
+    parser.add_argument('--restart', action='store_true', help="ignore saved progress and rescore everything")
+    parser.add_argument('--state-file', default=DEFAULT_STATE_PATH)
+    args = parser.parse_args()
+
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    db.init_app(app)
+
+    with app.app_context(), profile_job('risk_rescoring'):
+        RiskRescoringJob(db, state_path=args.state_file).run(batch_size=args.batch_size, restart=args.restart)
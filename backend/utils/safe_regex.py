@@ -0,0 +1,110 @@
+import re
+import time
+
+# Optional engines, best first:
+# - re2 (google-re2 / pyre2): linear-time automaton, no backtracking at all
+# - regex: backtracking, but supports a per-call timeout (already installed with transformers)
+# - re: stdlib fallback, protected only by the text size cap (it cannot be interrupted, so
+#   regex_time_budget_seconds is only checked between patterns, not during a match)
+try:
+    import re2
+except ImportError:
+    re2 = None
+
+try:
+    import regex
+except ImportError:
+    regex = None
+
+from backend.utils.config import Config
+
+if re2 is None and regex is None:
+    print("[REGEX] Neither re2 nor regex is installed, matches are limited by text size only")
+
+# \b, \d, \w, \s (and their negations) are Unicode-aware in re/regex but ASCII-only in RE2,
+# where e.g. r'\bгрн\b' never matches (cyrillic letters are not word characters there).
+# Such patterns are not compiled with RE2.
+_UNICODE_CLASS_RE = re.compile(r'\\[bBdDwWsS]')
+
+
+class RegexBudget:
+    """
+    Shared size/time budget for all patterns applied to one untrusted text.
+    Once the deadline passes every further match call returns nothing, so a single
+    pathological page cannot stall the worker.
+    """
+
+    def __init__(self, time_limit=None, max_chars=None):
+        self.time_limit = Config.REGEX_TIME_BUDGET_SECONDS if time_limit is None else time_limit
+        self.max_chars = Config.REGEX_MAX_TEXT_CHARS if max_chars is None else max_chars
+        self.deadline = time.monotonic() + self.time_limit
+        self.exhausted = False
+
+    def clip(self, text):
+        if text and self.max_chars and len(text) > self.max_chars:
+            return text[:self.max_chars]
+        return text or ""
+
+    def remaining(self):
+        left = self.deadline - time.monotonic()
+        if left <= 0:
+            self.exhausted = True
+            return 0.0
+        return left
+
+
+class SafePattern:
+    """
+    Precompiled pattern that uses the linear-time RE2 engine when it is installed and the pattern
+    is RE2-compatible (no lookarounds/backreferences) and matches the same on non-ASCII text
+    (no Unicode-aware classes), otherwise falls back to `regex` with a timeout. Every engine
+    returns the same matches as `re` would.
+    """
+
+    def __init__(self, pattern, flags=0, name=None):
+        self.pattern = pattern
+        self.flags = flags
+        self.name = name or pattern
+        self.engine, self._compiled = self._compile(pattern, flags)
+
+    @staticmethod
+    def _compile(pattern, flags):
+        if re2 is not None and not _UNICODE_CLASS_RE.search(pattern):
+            try:
+                inline = '(?i)' if flags & re.IGNORECASE else ''
+                return 're2', re2.compile(inline + pattern)
+            except Exception:
+                pass
+        if regex is not None:
+            return 'regex', regex.compile(pattern, flags)
+        return 're', re.compile(pattern, flags)
+
+    def findall(self, text, budget=None):
+        return self._run('findall', text, budget) or []
+
+    def finditer(self, text, budget=None):
+        """Returns a list (not a lazy iterator) so the time limit covers the whole scan."""
+        return self._run('finditer', text, budget) or []
+
+    def search(self, text, budget=None):
+        return self._run('search', text, budget)
+
+    def _run(self, method, text, budget):
+        budget = budget or RegexBudget()
+        text = budget.clip(text)
+        remaining = budget.remaining()
+        if not text or remaining <= 0:
+            return None
+
+        try:
+            if self.engine == 'regex':
+                if method == 'finditer':
+                    return list(self._compiled.finditer(text, timeout=remaining))
+                return getattr(self._compiled, method)(text, timeout=remaining)
+
+            result = getattr(self._compiled, method)(text)
+            return list(result) if method == 'finditer' else result
+        except TimeoutError:
+            budget.exhausted = True
+            print(f"[REGEX] Time budget exhausted on pattern '{self.name}' ({len(text)} chars), skipping")
+            return None
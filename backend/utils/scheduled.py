@@ -1,6 +1,11 @@
 from apscheduler.schedulers.background import BackgroundScheduler
 from datetime import datetime, timedelta
 from models import Report, InformationPiece
+from backend.utils.blind_index import blind_index
+from backend.utils.corroboration import trim_corroboration, backfill_corroboration
+from backend.utils.report_checkpoints import delete_old_checkpoints
+from backend.utils.config import Config
+from backend.utils.sql_profiler import profile_job
 
 def delete_old_reports(db):
     try:
@@ -21,11 +26,91 @@ def delete_old_datapieces(db):
         print("Failed to delete old data pieces:", e)
 
 
-def start_scheduler(db):
+def backfill_content_hashes(db, app, batch_size=1000):
+    """Fills InformationPiece.content_hash for rows stored before the blind index existed."""
+    with app.app_context(), profile_job('backfill_content_hashes'):
+        try:
+            last_id, updated = 0, 0
+            while True:
+                rows = db.session.query(InformationPiece.id, InformationPiece.content)\
+                    .filter(InformationPiece.content_hash.is_(None))\
+                    .filter(InformationPiece.id > last_id)\
+                    .order_by(InformationPiece.id.asc())\
+                    .limit(batch_size)\
+                    .all()
+                if not rows:
+                    break
+
+                # undecryptable rows keep NULL, paging by id keeps them from being fetched again
+                mappings = [
+                    {'id': row.id, 'content_hash': blind_index(row.content)}
+                    for row in rows if row.content and row.content != "[Decryption Error]"
+                ]
+                if mappings:
+                    db.session.bulk_update_mappings(InformationPiece, mappings)
+                    db.session.commit()
+
+                updated += len(mappings)
+                last_id = rows[-1].id
+
+            print(f"Content hashes backfilled: {updated} pieces.")
+        except Exception as e:
+            db.session.rollback()
+            print("Failed to backfill content hashes:", e)
+
+
+def delete_old_corroborations(db, app):
+    """Trims the corroboration summary; kept longer than the pieces themselves (corroboration history)."""
+    with app.app_context(), profile_job('delete_old_corroborations'):
+        try:
+            cutoff = datetime.utcnow() - timedelta(days=Config.CORROBORATION_RETENTION_DAYS)
+            deleted = trim_corroboration(db, cutoff)
+            db.session.commit()
+            print(f"Old corroboration entries deleted: {deleted}.")
+        except Exception as e:
+            db.session.rollback()
+            print("Failed to delete old corroboration entries:", e)
+
+
+def build_corroboration_summary(db, app):
+    """Fills the corroboration summary from stored pieces when the table is still empty."""
+    with app.app_context(), profile_job('build_corroboration_summary'):
+        try:
+            recorded = backfill_corroboration(db)
+            if recorded:
+                print(f"Corroboration summary built from {recorded} pieces.")
+        except Exception as e:
+            db.session.rollback()
+            print("Failed to build corroboration summary:", e)
+
+
+def delete_old_checkpoints_job(db, app):
+    """Checkpoints of failed reports that were never retried."""
+    with app.app_context(), profile_job('delete_old_checkpoints'):
+        try:
+            cutoff = datetime.utcnow() - timedelta(days=Config.CHECKPOINT_RETENTION_DAYS)
+            deleted = delete_old_checkpoints(db, cutoff)
+            db.session.commit()
+            print(f"Old report checkpoints deleted: {deleted}.")
+        except Exception as e:
+            db.session.rollback()
+            print("Failed to delete old report checkpoints:", e)
+
+
+def start_scheduler(db, app=None):
     scheduler = BackgroundScheduler()
     
     scheduler.add_job(lambda: delete_old_reports(db), 'interval', days=1)
     scheduler.add_job(lambda: delete_old_reports(db), 'interval', days=1)
     
+    if app is not None:
+        # once on startup, then daily for rows written by older app instances
+        scheduler.add_job(lambda: backfill_content_hashes(db, app), 'date')
+        scheduler.add_job(lambda: backfill_content_hashes(db, app), 'interval', days=1)
+        
+        scheduler.add_job(lambda: build_corroboration_summary(db, app), 'date')
+        scheduler.add_job(lambda: delete_old_corroborations(db, app), 'interval', days=1)
+        scheduler.add_job(lambda: delete_old_checkpoints_job(db, app), 'interval', days=1)
+    
     scheduler.start()
 
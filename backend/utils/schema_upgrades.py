@@ -0,0 +1,85 @@
+from sqlalchemy import inspect, text
+
+from backend.utils.config import Config
+from backend.utils.vector_type import Vector
+
+# db.create_all() only creates missing tables, it never alters existing ones.
+# Columns/indexes added to existing models are listed here and applied on startup.
+
+# (table, column, DDL type or column type)
+COLUMN_UPGRADES = [
+    ('information_piece', 'content_hash', 'VARCHAR(64)'),
+    ('information_piece', 'embedding', Vector(Config.PIECE_EMBEDDING_DIMENSIONS)),
+    ('report_job', 'cancel_requested', 'BOOLEAN NOT NULL DEFAULT FALSE'),
+    ('report', 'query_key', 'VARCHAR(64)'),
+    ('report', 'use_general', 'BOOLEAN'),
+    ('report', 'use_facebook', 'BOOLEAN'),
+    ('report', 'cached_from', 'VARCHAR(50)'),
+]
+
+# (index name, table, column) - names match the ones create_all() generates for index=True
+INDEX_UPGRADES = [
+    ('ix_information_piece_content_hash', 'information_piece', 'content_hash'),
+    ('ix_report_query_key', 'report', 'query_key'),
+]
+
+# PostgreSQL + pgvector statements (ANN indexes), skipped when the extension is unavailable
+POSTGRES_UPGRADES = [
+    'CREATE INDEX IF NOT EXISTS ix_information_piece_embedding ON information_piece '
+    'USING hnsw (embedding vector_cosine_ops)',
+]
+
+
+def prepare_database(db):
+    """
+    Enables extensions the models depend on. Call before db.create_all() inside an app context.
+    Without pgvector the app still starts: piece embeddings and embedding validation are turned off.
+    """
+    if db.engine.dialect.name != 'postgresql':
+        return
+    try:
+        db.session.execute(text('CREATE EXTENSION IF NOT EXISTS vector'))
+        db.session.commit()
+        return
+    except Exception as e:
+        db.session.rollback()
+        error = e
+
+    # e.g. no CREATE privilege, but an administrator may have installed it already
+    installed = db.session.execute(text("SELECT 1 FROM pg_extension WHERE extname = 'vector'")).first()
+    if installed:
+        return
+
+    print(f"[SCHEMA] pgvector is not available ({error}), piece embeddings disabled")
+    Vector.available = False
+    Config.PIECE_EMBEDDINGS_ENABLED = False
+    if Config.RISK_VALIDATION_MODE == 'embedding':
+        print("[SCHEMA] risk_validation_mode 'embedding' needs pgvector, falling back to 'exact'")
+        Config.RISK_VALIDATION_MODE = 'exact'
+
+
+def apply_schema_upgrades(db):
+    """Adds missing columns and indexes. Idempotent, call after db.create_all() inside an app context."""
+    inspector = inspect(db.engine)
+
+    try:
+        for table, column, ddl_type in COLUMN_UPGRADES:
+            existing = {c['name'] for c in inspector.get_columns(table)}
+            if column not in existing:
+                if not isinstance(ddl_type, str):
+                    ddl_type = ddl_type.compile(dialect=db.engine.dialect)
+                db.session.execute(text(f'ALTER TABLE {table} ADD COLUMN {column} {ddl_type}'))
+                print(f"[SCHEMA] Added column {table}.{column}")
+
+        for name, table, column in INDEX_UPGRADES:
+            db.session.execute(text(f'CREATE INDEX IF NOT EXISTS {name} ON {table} ({column})'))
+
+        if db.engine.dialect.name == 'postgresql' and Vector.available:
+            for statement in POSTGRES_UPGRADES:
+                db.session.execute(text(statement))
+
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"[SCHEMA] Upgrade failed: {e}")
+        raise
@@ -0,0 +1,153 @@
+import re
+import time
+import os
+import traceback
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from flask import g, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from backend.utils.config import Config
+
+# Per-request / per-job SQL statistics.
+# Every statement executed on any engine is counted against the profile active in the current
+# context (Flask request or profile_job block). Statements are grouped by shape (literals and
+# IN-lists collapsed), so per-row query loops (N+1) show up as one shape with a high count.
+
+_current_profile = ContextVar('sql_profile', default=None)
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_WHITESPACE_RE = re.compile(r'\s+')
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r'\b\d+(?:\.\d+)?\b')
+_SELECT_LIST_RE = re.compile(r'^SELECT .+? FROM ')
+_PARAM_LIST_RE = re.compile(r'\((?:\s*(?:\?|%\(\w+\)s|%s|:\w+|__\[POSTCOMPILE_\w+\])\s*,?)+\)')
+
+
+def statement_shape(statement):
+    shape = _WHITESPACE_RE.sub(' ', statement).strip()
+    shape = _STRING_RE.sub('?', shape)
+    shape = _NUMBER_RE.sub('?', shape)
+    return _PARAM_LIST_RE.sub('(...)', shape)
+
+
+def _call_site():
+    """Innermost application frame outside this module (file:line in function)."""
+    for frame in reversed(traceback.extract_stack()[:-3]):
+        if frame.filename.startswith(_BACKEND_DIR) and not frame.filename.endswith('sql_profiler.py'):
+            return f"{os.path.relpath(frame.filename, _BACKEND_DIR)}:{frame.lineno} in {frame.name}"
+    return "unknown"
+
+
+class SQLProfile:
+    """Query count, DB time and statement shapes collected for one request or job."""
+
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.total_seconds = 0.0
+        self.shapes = {}  # shape -> [count, seconds, call site of the first execution]
+
+    def record(self, statement, seconds):
+        self.count += 1
+        self.total_seconds += seconds
+
+        shape = statement_shape(statement)
+        entry = self.shapes.get(shape)
+        if entry is None:
+            self.shapes[shape] = [1, seconds, _call_site()]
+        else:
+            entry[0] += 1
+            entry[1] += seconds
+
+    @property
+    def total_ms(self):
+        return self.total_seconds * 1000.0
+
+    def repeated(self, threshold):
+        """Shapes executed at least `threshold` times, most frequent first."""
+        return sorted(
+            ((shape, count, seconds, site) for shape, (count, seconds, site) in self.shapes.items() if count >= threshold),
+            key=lambda item: item[1], reverse=True
+        )
+
+    def report(self):
+        """Prints a warning when the query count or a repeated statement shape crosses the thresholds."""
+        repeated = self.repeated(Config.SQL_REPEAT_WARN_THRESHOLD)
+        if self.count < Config.SQL_QUERY_WARN_THRESHOLD and not repeated:
+            return
+
+        print(f"[SQL] WARNING {self.name}: {self.count} queries, {self.total_ms:.1f} ms in DB")
+        for shape, count, seconds, site in repeated[:5]:
+            print(f"[SQL]   {count}x ({seconds * 1000:.1f} ms) at {site}: {_SELECT_LIST_RE.sub('SELECT ... FROM ', shape)[:200]}")
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current_profile.get() is not None:
+        conn.info.setdefault('sql_profiler_started', []).append(time.perf_counter())
+
+
+@event.listens_for(Engine, 'after_cursor_execute')
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    started = conn.info.get('sql_profiler_started')
+    if profile is None or not started:
+        return
+    profile.record(statement, time.perf_counter() - started.pop())
+
+
+@contextmanager
+def profile_job(name):
+    """Collects SQL statistics for a background job (scheduler, worker thread) and reports them at the end."""
+    if not Config.SQL_PROFILER_ENABLED:
+        yield None
+        return
+
+    profile = SQLProfile(name)
+    token = _current_profile.set(profile)
+    try:
+        yield profile
+    finally:
+        _current_profile.reset(token)
+        profile.report()
+
+
+def install_sql_profiler(app):
+    """Per-request SQL statistics; in debug mode the totals are returned as X-DB-* response headers."""
+    if not Config.SQL_PROFILER_ENABLED:
+        return
+
+    @app.before_request
+    def _start_sql_profile():
+        g.sql_profile = SQLProfile(f"{request.method} {request.path}")
+        g.sql_profile_token = _current_profile.set(g.sql_profile)
+
+    @app.after_request
+    def _sql_profile_headers(response):
+        profile = g.get('sql_profile')
+        if profile is not None and app.debug:
+            response.headers['X-DB-Query-Count'] = str(profile.count)
+            response.headers['X-DB-Time-Ms'] = f"{profile.total_ms:.1f}"
+        if profile is not None and response.is_streamed:
+            # streamed responses (report events over SSE) keep polling the database until the client
+            # leaves, which is not an N+1: only the view itself is profiled, not the stream
+            g.pop('sql_profile')
+            _current_profile.set(None)
+            profile.report()
+        return response
+
+    @app.teardown_request
+    def _finish_sql_profile(exc):
+        profile = g.pop('sql_profile', None)
+        token = g.pop('sql_profile_token', None)
+        if token is not None:
+            try:
+                _current_profile.reset(token)
+            except ValueError:
+                _current_profile.set(None)  # teardown ran in a different context
+        if profile is not None:
+            profile.report()
@@ -0,0 +1,191 @@
+# backend/utils/thread_budget.py
+"""
+CPU thread budget for model inference.
+
+Torch (and the OpenMP/MKL kernels under it) use every core for a single call by default.
+Under Flask's threaded server several reports run at once, each model call spins up a
+full pool and the host ends up oversubscribed. This module:
+  - fixes the Torch / OpenMP / MKL / tokenizers thread counts for the process
+    (call apply_thread_budget() before anything imports torch)
+  - runs all model calls on a small dedicated pool, so at most `inference_workers`
+    calls compete for the `torch_threads` cores
+  - keeps utilization counters for the health endpoint
+
+Autotune on the target host:
+    python -m backend.utils.thread_budget --autotune
+"""
+import os
+import sys
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from backend.utils.config import Config
+
+_THREAD_ENV_VARS = ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS', 'NUMEXPR_NUM_THREADS')
+
+_applied = None
+
+
+def resolve_budget(workers=None, threads=None, interop_threads=None):
+    """
+    Returns (inference_workers, torch_threads, interop_threads) for this process.
+    'auto' threads split the cores between the inference workers, unless OMP_NUM_THREADS
+    was already set for this process (e.g. per gunicorn worker), which then wins.
+    """
+    cores = os.cpu_count() or 1
+    workers = max(1, int(workers or Config.INFERENCE_WORKERS))
+    threads = Config.TORCH_THREADS if threads is None else threads
+    interop_threads = Config.TORCH_INTEROP_THREADS if interop_threads is None else interop_threads
+
+    if threads in (None, 'auto'):
+        preset = os.environ.get('OMP_NUM_THREADS')
+        threads = int(preset) if preset and preset.isdigit() else cores // workers
+    return workers, max(1, int(threads)), max(1, int(interop_threads or 1))
+
+
+def apply_thread_budget():
+    """Sets the thread limits for this process. Safe to call more than once, only the first call applies."""
+    global _applied
+    if _applied:
+        return _applied
+
+    workers, threads, interop_threads = resolve_budget()
+
+    for var in _THREAD_ENV_VARS:
+        os.environ[var] = str(threads)
+    os.environ['TOKENIZERS_PARALLELISM'] = 'true' if Config.TOKENIZERS_PARALLELISM else 'false'
+
+    try:
+        import torch
+        torch.set_num_threads(threads)
+        try:
+            torch.set_num_interop_threads(interop_threads)
+        except RuntimeError:
+            # only allowed before the first parallel op, keep whatever torch already uses
+            interop_threads = torch.get_num_interop_threads()
+    except ImportError:
+        pass
+
+    _applied = (workers, threads, interop_threads)
+    print(f"[THREADS] {workers} inference workers x {threads} torch threads "
+          f"(interop {interop_threads}, {os.cpu_count()} cores)")
+    return _applied
+
+
+class InferencePool:
+    """
+    Dedicated executor for model calls (NER pipelines, sentence embeddings).
+    Request threads block on run() while the call executes on one of the pool threads.
+    """
+
+    def __init__(self, workers=None):
+        self.workers = workers or resolve_budget()[0]
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='inference')
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+
+        self.calls = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.busy_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def run(self, fn, *args, **kwargs):
+        # nested calls from a pool thread would deadlock a fully busy pool
+        if threading.current_thread().name.startswith('inference'):
+            return fn(*args, **kwargs)
+
+        submitted = time.monotonic()
+        with self._lock:
+            self.in_flight += 1
+        return self._executor.submit(self._timed, submitted, fn, args, kwargs).result()
+
+    def _timed(self, submitted, fn, args, kwargs):
+        started = time.monotonic()
+        failed = False
+        try:
+            return fn(*args, **kwargs)
+        except Exception:
+            failed = True
+            raise
+        finally:
+            finished = time.monotonic()
+            with self._lock:
+                self.in_flight -= 1
+                self.calls += 1
+                self.failures += failed
+                self.busy_seconds += finished - started
+                self.wait_seconds += started - submitted
+
+    def stats(self):
+        with self._lock:
+            uptime = max(time.monotonic() - self._started, 1e-9)
+            return {
+                'workers': self.workers,
+                'torch_threads': (_applied or resolve_budget())[1],
+                'calls': self.calls,
+                'failures': self.failures,
+                'in_flight': self.in_flight,
+                'queued': max(0, self.in_flight - self.workers),
+                'busy_seconds': round(self.busy_seconds, 2),
+                'utilization': round(self.busy_seconds / (uptime * self.workers), 4),
+                'avg_wait_ms': round(self.wait_seconds / self.calls * 1000, 2) if self.calls else 0.0,
+            }
+
+
+inference_pool = InferencePool()
+
+
+# ==================== AUTOTUNE ====================
+
+def _candidate_budgets(cores):
+    threads = sorted({1, 2, 4, 8, 16, cores} & set(range(1, cores + 1)))
+    return [(w, t) for w in (1, 2, 3, 4) for t in threads if w * t <= cores]
+
+
+def autotune(sample_texts=None, rounds=3):
+    """
+    Benchmarks NER throughput for each (inference_workers, torch_threads) pair that fits the
+    host and prints the cfg.yaml settings with the best texts/second.
+    """
+    import torch
+    from transformers import pipeline
+
+    cores = os.cpu_count() or 1
+    texts = sample_texts or [
+        "Oleksandr Shevchenko works as a software engineer at SoftServe in Lviv, Ukraine.",
+        "Maria Kowalska graduated from the University of Warsaw and moved to Berlin in 2019.",
+        "Іван Петренко закінчив Київський політехнічний інститут і працює в Харкові.",
+        "Contact John Smith at the Toronto office of GlobalLogic for details.",
+    ] * 4
+
+    print(f"[AUTOTUNE] Loading {Config.NER_MODEL} ({cores} cores)...")
+    ner = pipeline("ner", model=Config.NER_MODEL, grouped_entities=True)
+    ner(texts[:2])  # warm-up
+
+    results = []
+    for workers, threads in _candidate_budgets(cores):
+        torch.set_num_threads(threads)
+        chunks = [texts[i::workers] for i in range(workers)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            started = time.perf_counter()
+            for _ in range(rounds):
+                list(executor.map(lambda chunk: ner(chunk, batch_size=Config.NER_BATCH_SIZE), chunks))
+            elapsed = time.perf_counter() - started
+        throughput = len(texts) * rounds / elapsed
+        results.append((throughput, workers, threads))
+        print(f"[AUTOTUNE] workers={workers} threads={threads}: {throughput:.1f} texts/s")
+
+    _, best_workers, best_threads = max(results)
+    print("\n# recommended cfg.yaml settings for this host")
+    print(f"inference_workers: {best_workers}")
+    print(f"torch_threads: {best_threads}")
+    return best_workers, best_threads
+
+
+if __name__ == '__main__':
+    if '--autotune' in sys.argv:
+        autotune()
+    else:
+        print("usage: python -m backend.utils.thread_budget --autotune")
@@ -0,0 +1,40 @@
+from sqlalchemy.types import UserDefinedType, Float
+
+
+class Vector(UserDefinedType):
+    """
+    pgvector `vector(n)` column type.
+    Values are lists of floats (or numpy arrays on bind); sent and read in pgvector's text form '[x,y,...]'.
+    Requires the `vector` extension on PostgreSQL (see utils/schema_upgrades.py).
+    """
+    cache_ok = True
+
+    # False when the pgvector extension is unavailable (see prepare_database): the column is then
+    # created as TEXT in the same '[x,y,...]' form, and embeddings are neither written nor queried
+    available = True
+
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+
+    def get_col_spec(self, **kw):
+        if not Vector.available:
+            return "TEXT"
+        return f"VECTOR({self.dimensions})"
+
+    def bind_processor(self, dialect):
+        def process(value):
+            if value is None:
+                return None
+            return '[' + ','.join(str(float(v)) for v in value) + ']'
+        return process
+
+    def result_processor(self, dialect, coltype):
+        def process(value):
+            if value is None or isinstance(value, list):
+                return value
+            return [float(v) for v in value.strip('[]').split(',') if v]
+        return process
+
+    class comparator_factory(UserDefinedType.Comparator):
+        def cosine_distance(self, other):
+            return self.op('<=>', return_type=Float)(other)
@@ -0,0 +1,73 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# throwaway keys for the encrypted columns / blind indexes, set before the models are imported
+os.environ.setdefault('DB_ENCRYPTION_KEY_HEX', 'ab' * 32)
+os.environ.setdefault('DB_BLIND_INDEX_KEY_HEX', 'cd' * 32)
+
+# engines and services also import their siblings as top-level modules ('from models import db'), like app.py
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'backend'))
+
+from flask import Flask
+from sqlalchemy import event
+
+from backend.models import db, User, Report
+from backend.utils.corroboration import query_key
+
+
+@pytest.fixture
+def app():
+    """Flask app on a fresh SQLite file (WAL, so worker threads and heartbeats can share it)."""
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + path
+    db.init_app(app)
+
+    with app.app_context():
+        @event.listens_for(db.engine, 'connect')
+        def _sqlite_pragmas(connection, record):
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA busy_timeout=5000')
+
+        db.create_all()
+        yield app
+        db.session.remove()
+        db.engine.dispose()
+
+    os.remove(path)
+
+
+@pytest.fixture
+def make_report(app):
+    """Creates a user (once per email) and a processing report for it."""
+    def make(report_id, email='user@example.com', query='Jane Doe'):
+        user = db.session.query(User).filter_by(email=email).first()
+        if user is None:
+            user = User(email=email, password_hash='x')
+            db.session.add(user)
+            db.session.flush()
+        db.session.add(Report(report_id=report_id, user_id=user.id, user_query=query,
+                              status='processing', query_key=query_key(query)))
+        db.session.commit()
+        return report_id
+    return make
+
+
+@pytest.fixture(params=['re2', 'regex', 're'])
+def regex_backend(request, monkeypatch):
+    """SafePattern limited to the given engine and the fallbacks after it (as if the better ones were not installed)."""
+    from backend.utils import safe_regex
+
+    if request.param == 're2':
+        pytest.importorskip('re2')
+    else:
+        monkeypatch.setattr(safe_regex, 're2', None)
+    if request.param == 'regex':
+        pytest.importorskip('regex')
+    elif request.param == 're':
+        monkeypatch.setattr(safe_regex, 'regex', None)
+    return request.param
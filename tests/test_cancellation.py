@@ -0,0 +1,133 @@
+import asyncio
+import os
+import threading
+import time
+
+import pytest
+
+from backend.utils.cancellation import CancellationToken, ReportCancellations, ReportCancelled
+from backend.utils.config import Config
+
+
+def cancel_later(token, delay=0.1, reason=None):
+    timer = threading.Timer(delay, token.cancel, args=(reason,))
+    timer.start()
+    return timer
+
+
+def test_wait_returns_after_timeout_and_raises_once_cancelled():
+    token = CancellationToken()
+    token.wait(0.01)
+    token.raise_if_cancelled()
+
+    cancel_later(token, reason='user cancelled')
+    started = time.monotonic()
+    with pytest.raises(ReportCancelled, match='user cancelled'):
+        token.wait(5)
+    assert time.monotonic() - started < 2
+    assert token.cancelled
+
+
+def test_callbacks_run_once_and_only_inside_the_block():
+    token, calls = CancellationToken(), []
+
+    with token.callback(lambda: calls.append('outer')):
+        pass
+    with token.callback(lambda: calls.append('inner')):
+        token.cancel()
+        token.cancel()
+    assert calls == ['inner']
+
+    # registered after cancellation: runs immediately
+    with token.callback(lambda: calls.append('late')):
+        assert calls == ['inner', 'late']
+
+
+def test_failing_callback_does_not_stop_the_others():
+    token, calls = CancellationToken(), []
+
+    def broken():
+        raise RuntimeError('browser already closed')
+
+    with token.callback(broken), token.callback(lambda: calls.append('closed')):
+        token.cancel()
+    assert calls == ['closed']
+
+
+def test_registry_keeps_the_newest_attempt():
+    cancellations = ReportCancellations()
+    first = cancellations.register('R1')
+    second = cancellations.register('R1')
+
+    cancellations.discard('R1', first)
+    assert cancellations.get('R1') is second
+    assert cancellations.cancel('R1') and second.cancelled and not first.cancelled
+    cancellations.discard('R1')
+    assert cancellations.cancel('R1') is False
+
+
+# ---------- crawl4ai fetch ----------
+
+def test_get_markdown_cancels_the_crawl_task(monkeypatch):
+    pytest.importorskip('crawl4ai')
+    try:
+        from backend.services.internal.web_scraping_service import WebScrapingService
+    except ImportError as e:  # backend.services imports every service
+        pytest.skip(f'needs the services dependencies ({e})')
+
+    service = WebScrapingService()
+    closed = []
+
+    async def fetch(url, user_query, enable_cache=False, cancel_token=None):
+        try:
+            await asyncio.sleep(30)
+        finally:
+            closed.append(url)  # the crawler's `async with` closes the browser here
+
+    monkeypatch.setattr(service, '_fetch_markdown', fetch)
+    token = CancellationToken()
+    cancel_later(token)
+    started = time.monotonic()
+    with pytest.raises(ReportCancelled):
+        service._get_markdown('https://example.com', 'Jane Doe', cancel_token=token)
+    assert time.monotonic() - started < 5
+    assert closed == ['https://example.com']
+
+    with pytest.raises(ReportCancelled):
+        service._get_markdown('https://example.com', 'Jane Doe', cancel_token=token)  # no new crawl
+    assert closed == ['https://example.com']
+
+
+# ---------- abandoned event streams (needs the full application environment) ----------
+
+@pytest.fixture
+def api(monkeypatch):
+    if not os.environ.get('DB_HOST'):
+        pytest.skip('needs the configured PostgreSQL database (DB_* settings)')
+    for module in ('bcrypt', 'requests', 'flask_cors', 'flask_jwt_extended', 'bleach', 'transformers', 'crawl4ai'):
+        pytest.importorskip(module)
+
+    from backend import app as api_module
+
+    cancelled = []
+    monkeypatch.setattr(Config, 'REPORT_CANCEL_DISCONNECT_GRACE_SECONDS', 0.1)
+    monkeypatch.setattr(api_module, 'cancel_report_generation', lambda report_id: cancelled.append(report_id) or 'running')
+    return api_module, cancelled
+
+
+def test_abandoned_report_is_cancelled_after_the_grace_period(api):
+    api_module, cancelled = api
+    api_module.cancel_when_abandoned('R1')
+    time.sleep(0.4)
+    assert cancelled == ['R1']
+
+
+def test_reconnected_report_keeps_running(api):
+    api_module, cancelled = api
+    api_module.report_events.attach('R2')
+    try:
+        api_module.cancel_when_abandoned('R2')
+        time.sleep(0.4)
+    finally:
+        api_module.report_events.detach('R2')
+    assert cancelled == []
@@ -0,0 +1,23 @@
+from datetime import datetime
+
+from backend.models import db, ContentCorroboration
+from backend.utils.blind_index import blind_index
+from backend.utils.corroboration import record_occurrences, remove_occurrences
+
+
+def test_remove_occurrences_takes_back_a_failed_attempt(app):
+    seen_at = datetime.utcnow()
+    record_occurrences(db, [('Acme Corp', 'Jane Doe', seen_at), ('Acme Corp', 'John Roe', seen_at)])
+    db.session.commit()
+
+    # retried attempt: the same pieces are recorded again after the first attempt's pieces were dropped
+    first_attempt = [('Acme Corp', 'Jane Doe', seen_at), ('Acme Corp', 'Jane Doe', seen_at), ('Kyiv', 'Jane Doe', seen_at)]
+    record_occurrences(db, first_attempt)
+    db.session.commit()
+    remove_occurrences(db, 'Jane Doe', [blind_index(content) for content, _, _ in first_attempt])
+    db.session.commit()
+
+    acme, kyiv = blind_index('Acme Corp'), blind_index('Kyiv')
+    rows = db.session.query(ContentCorroboration.content_hash, ContentCorroboration.occurrence_count).all()
+    assert sorted(count for content_hash, count in rows if content_hash == acme) == [1, 1]  # Jane Doe, John Roe
+    assert kyiv not in {content_hash for content_hash, _ in rows}  # count dropped to zero
@@ -0,0 +1,259 @@
+import re
+import threading
+
+import pytest
+
+pytest.importorskip('transformers')
+pytest.importorskip('sentence_transformers')
+
+from backend.models import db, InformationPiece
+from backend.data_processing.gazetteer import Gazetteer
+from backend.data_processing.piece_candidate import PieceCandidate
+from backend.data_processing.query_matcher import QueryMatcher
+from backend.utils.config import Config
+from backend.utils.safe_regex import SafePattern
+
+try:
+    from backend.engines.data_processing_engine import DataProcessingEngine
+except OSError as e:  # the module-level singleton loads the NER / semantic models
+    pytest.skip(f'models are not available: {e}', allow_module_level=True)
+
+
+class FakeNerRouter:
+    """Tags every occurrence of the known words (word -> entity group), like a grouped NER pipeline."""
+
+    def __init__(self, entities):
+        self.entities = entities
+
+    def run(self, texts):
+        results = []
+        for text in texts:
+            found = []
+            for word, group in self.entities.items():
+                for match in re.finditer(re.escape(word), text):
+                    found.append({'word': word, 'entity_group': group, 'score': 0.9,
+                                  'start': match.start(), 'end': match.end()})
+            results.append(found)
+        return results
+
+
+class StubEngine(DataProcessingEngine):
+    """The engine with its models replaced: fixed NER output, every entity specific, relevance by length."""
+
+    def __new__(cls, *args, **kwargs):
+        return object.__new__(cls)
+
+    def __init__(self, entities=None, gazetteer=None):
+        self.ner_pipeline = None
+        self.ner_router = FakeNerRouter(entities or {})
+        self.semantic_model = None
+        self.embedding_model = None
+        self.gazetteer = gazetteer or Gazetteer()
+        self.db = db
+        self.categories_cache = {}
+        self.sources_cache = {}
+        self._initialized = True
+
+    def _validate_entity_specificity(self, text, category):
+        return False
+
+    def _calculate_context_relevance(self, content, snippet, user_query):
+        return round(min(1.0, len(content) / 20), 2)
+
+
+@pytest.fixture(autouse=True)
+def no_piece_embeddings(monkeypatch):
+    monkeypatch.setattr(Config, 'PIECE_EMBEDDINGS_ENABLED', False)
+
+
+def page(text, link='https://example.com/profile'):
+    return {'valuable_text': text, 'title': '', 'link': link}
+
+
+def contents(report_id):
+    db.session.expire_all()
+    return sorted(piece.content for piece in db.session.query(InformationPiece).filter_by(report_id=report_id))
+
+
+@pytest.mark.parametrize('text', ['Andrii', 'Matsevytyi Andrii', 'Andriy Matsevytyi', 'Мацевитий'])
+def test_query_variants_fail_validation(text):
+    engine = StubEngine()
+    assert not engine._validate_rules(text, QueryMatcher('Андрій Мацевитий'), 'Social Connections')
+    assert engine._validate_rules('Olena Koval', QueryMatcher('Андрій Мацевитий'), 'Social Connections')
+
+
+def test_transliterated_query_is_not_a_finding(app, make_report):
+    make_report('R1', query='Андрій Мацевитий')
+    engine = StubEngine({'Andrii Matsevytyi': 'PER', 'Olena Koval': 'PER'})
+
+    engine.process_raw_data([page('Andrii Matsevytyi and Olena Koval met in Kyiv.')], 'R1', 'Андрій Мацевитий', db)
+
+    found = contents('R1')
+    assert 'Olena' in found  # glued-word cleanup keeps the first name
+    assert not [content for content in found if QueryMatcher('Андрій Мацевитий').is_query_like(content)]
+
+
+def test_duplicates_merge_into_one_row_per_entity(app, make_report):
+    make_report('R1')
+    gazetteer = Gazetteer({'Location Data': [{'name': 'Kharkiv', 'aliases': ['Харків']}]})
+    engine = StubEngine({'Olena Koval': 'PER'}, gazetteer)
+
+    local_cache = {}
+    pieces = engine.process_raw_data(
+        [['Olena Koval moved to Kharkiv.', 'Olena Koval, Харків', 'Kharkiv again']], 'R1', 'Jane Doe', db,
+        local_cache=local_cache
+    )
+
+    assert sorted((piece.content, piece.repetition_count) for piece in pieces) == [('Kharkiv', 3), ('Olena', 2)]
+    assert len(contents('R1')) == 2
+    # merging worked on slotted candidates, which now point at their rows
+    assert all(isinstance(candidate, PieceCandidate) for candidate in local_cache.values())
+    assert sorted(candidate.piece_id for candidate in local_cache.values()) == sorted(piece.id for piece in pieces)
+
+
+def test_gazetteer_hits_keep_their_canonical_name(app, make_report):
+    make_report('R1')
+    gazetteer = Gazetteer({'Professional Details': [{'name': 'EPAM Systems', 'aliases': ['EPAM']}]})
+    engine = StubEngine({'EPAM': 'ORG'}, gazetteer)
+
+    engine.process_raw_data([['Jane Doe joined EPAM in 2015.']], 'R1', 'Jane Doe', db)
+
+    assert contents('R1') == ['EPAM Systems']  # not re-tagged by NER, not title-cased to 'Epam Systems'
+
+
+CLASS_PATTERNS = [
+    DataProcessingEngine.EMAIL_PATTERN, DataProcessingEngine.FINANCIAL_PATTERN, DataProcessingEngine.PHONE_PATTERN,
+    DataProcessingEngine.SOCIAL_PATTERN, DataProcessingEngine.STATEMENT_PATTERN, DataProcessingEngine.IDENTIFIER_PATTERN,
+    *DataProcessingEngine.PROFESSION_PATTERNS.values(),
+]
+
+UKRAINIAN_PAGE = (
+    'Андрій — developerом у компанії, потім CEO стартапу. Він said, що заробляє 500 грн або 20 євро '
+    '($1,200.50 на місяць), не гривнями з грнівки. Пишіть @andrii_m або на andrii.m@example.com, '
+    'тел. +380 67 123 4567. Паспорт: passport АВ123456, ID: 778899.'
+)
+
+
+@pytest.mark.parametrize('pattern', CLASS_PATTERNS, ids=lambda pattern: pattern.name)
+def test_class_patterns_match_like_re_on_every_engine(regex_backend, pattern):
+    compiled = SafePattern(pattern.pattern, pattern.flags, pattern.name)
+    assert compiled.findall(UKRAINIAN_PAGE) == re.findall(pattern.pattern, UKRAINIAN_PAGE, pattern.flags)
+
+
+def test_financial_pattern_finds_cyrillic_currencies(regex_backend):
+    compiled = SafePattern(DataProcessingEngine.FINANCIAL_PATTERN.pattern, name='financial')
+    assert compiled.findall(UKRAINIAN_PAGE) == ['грн', 'євро', '$1,200.50']
+
+
+def test_ner_sees_only_sentences_near_the_query_on_crawled_pages(app, make_report, monkeypatch):
+    monkeypatch.setattr(Config, 'SENTENCE_FILTER_ENABLED', True)
+    monkeypatch.setattr(Config, 'SENTENCE_FILTER_WINDOW', 1)
+    make_report('R1')
+    engine = StubEngine({'Olena Koval': 'PER', 'Ivan Bondar': 'PER'})
+    text = 'Olena Koval runs the shop. Weather is fine. Nothing else. Jane Doe met Ivan Bondar there.'
+
+    engine.process_raw_data([page(text), ['Olena Koval wrote a post.']], 'R1', 'Jane Doe', db)
+
+    # the crawled page only yields the entity next to the query mention; social media posts are not filtered
+    db.session.expire_all()
+    assert sorted((piece.content, piece.source, piece.repetition_count) for piece in db.session.query(InformationPiece)) == [
+        ('Ivan', 'https://example.com/profile', 1), ('Olena', 'Social Media', 1)
+    ]
+
+
+PIPELINE_ENTITIES = {'Olena Koval': 'PER', 'Ivan Bondar': 'PER', 'Harlequin Defense': 'ORG', 'Lviv': 'LOC'}
+
+PIPELINE_DATA = [
+    [f'Post {i}: Olena Koval and Ivan Bondar, call +380 67 123 45{i:02d} or olena{i % 3}@example.com' for i in range(12)],
+    page('Jane Doe works at Harlequin Defense. She is a developer in Lviv, paid 500 грн.'),
+    page('Jane Doe said hi to OLENA KOVAL. Harlequin Defense hires.', link='https://example.com/news'),
+]
+
+
+@pytest.fixture
+def small_pipeline(monkeypatch):
+    monkeypatch.setattr(Config, 'PIPELINE_CHUNK_SIZE', 2)
+    monkeypatch.setattr(Config, 'PIPELINE_QUEUE_SIZE', 1)
+
+
+def processed(pieces):
+    return [(p.content, p.category_id, p.source, p.snippet, p.relevance_score, p.repetition_count) for p in pieces]
+
+
+def test_pipelined_mode_matches_sequential(app, make_report, small_pipeline):
+    make_report('SEQ')
+    make_report('PIPE')
+    engine = StubEngine(PIPELINE_ENTITIES)
+
+    sequential = engine.process_raw_data(PIPELINE_DATA, 'SEQ', 'Jane Doe', db, mode='sequential')
+    pipelined = engine.process_raw_data(PIPELINE_DATA, 'PIPE', 'Jane Doe', db, mode='pipelined')
+
+    assert len(sequential) > 5
+    assert processed(pipelined) == processed(sequential)
+
+
+class FailingEngine(StubEngine):
+    """Raises in the given pipeline stage once the first few entries went through."""
+
+    def __init__(self, stage):
+        super().__init__(PIPELINE_ENTITIES)
+        self.stage = stage
+        self.calls = 0
+
+    def _fail(self, stage):
+        if self.stage == stage:
+            self.calls += 1
+            if self.calls > 2:
+                raise RuntimeError(f'{stage} failed')
+
+    def _extract_stage(self, entries, ner_texts, query_matcher):
+        self._fail('ner')
+        return super()._extract_stage(entries, ner_texts, query_matcher)
+
+    def _score_stage(self, *args):
+        self._fail('scoring')
+        return super()._score_stage(*args)
+
+    def _resolve_source_id(self, db, source):
+        self._fail('persistence')
+        return super()._resolve_source_id(db, source)
+
+
+@pytest.mark.parametrize('stage', ['ner', 'scoring', 'persistence'])
+def test_failing_stage_stops_the_pipeline(app, make_report, small_pipeline, stage):
+    make_report('R1')
+
+    with pytest.raises(RuntimeError, match=f'{stage} failed'):
+        FailingEngine(stage).process_raw_data(PIPELINE_DATA, 'R1', 'Jane Doe', db, mode='pipelined')
+
+    assert not [t for t in threading.enumerate() if t.name in ('ner-stage', 'scoring-stage')]
+    db.session.rollback()
+    assert contents('R1') == []
+
+
+def stored_rows(report_id):
+    db.session.expire_all()
+    return sorted(
+        (p.content, p.content_hash, p.category_id, p.source, p.snippet, p.relevance_score, p.repetition_count)
+        for p in db.session.query(InformationPiece).filter_by(report_id=report_id)
+    )
+
+
+def test_preview_phase_ends_with_the_same_rows(app, make_report):
+    """Snippets processed first (preview) and merged into by the deep crawl give the rows of a single pass."""
+    make_report('OFF')
+    make_report('ON')
+    engine = StubEngine({'Olena Koval': 'PER'})
+    snippets = [['olena@example.com wrote about Olena Koval']]
+    deep = [['Contact Olena@example.com', 'Olena Koval again, olena@example.com', 'Ivan wrote to ivan@example.com']]
+
+    engine.process_raw_data(snippets + deep, 'OFF', 'Jane Doe', db, local_cache={})
+
+    local_cache = {}
+    engine.process_raw_data(snippets, 'ON', 'Jane Doe', db, local_cache=local_cache)
+    engine.process_raw_data(deep, 'ON', 'Jane Doe', db, local_cache=local_cache)
+
+    rows = stored_rows('ON')
+    assert rows == stored_rows('OFF')
+    # the preview row took the better-cased content and all later occurrences
+    assert ('Olena@example.com', 3) in [(row[0], row[-1]) for row in rows]
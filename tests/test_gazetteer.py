@@ -0,0 +1,60 @@
+import pytest
+
+from backend.data_processing.gazetteer import Gazetteer
+from backend.utils.config import Config
+
+
+@pytest.fixture
+def gazetteer():
+    return Gazetteer({
+        'Location Data': [
+            {'name': 'United States of America', 'aliases': ['USA', 'США']},
+            'United States Virgin Islands',
+            {'name': 'Kharkiv', 'aliases': ['Харків']},
+        ],
+        'Professional Details': [{'name': 'EPAM Systems', 'aliases': ['EPAM']}],
+    })
+
+
+def spans(gazetteer, text):
+    return [(text[m['start']:m['end']], m['word'], m['category']) for m in gazetteer.tag(text)]
+
+
+def test_multi_token_entry(gazetteer):
+    assert spans(gazetteer, 'She moved to the United States of America in 2019') == [
+        ('United States of America', 'United States of America', 'Location Data')
+    ]
+    # a shared prefix of two entries is not a match on its own
+    assert spans(gazetteer, 'Moved to the United States later') == []
+
+
+def test_longest_match_wins(gazetteer):
+    gazetteer.add('EPAM', 'Uncategorized')
+    assert spans(gazetteer, 'Works at EPAM Systems since 2015') == [
+        ('EPAM Systems', 'EPAM Systems', 'Professional Details')
+    ]
+
+
+def test_aliases_and_transliterations_get_the_canonical_name(gazetteer):
+    assert spans(gazetteer, 'Переїхала до США, потім у Харків') == [
+        ('США', 'United States of America', 'Location Data'),
+        ('Харків', 'Kharkiv', 'Location Data'),
+    ]
+    assert [m['word'] for m in gazetteer.tag('Then EPAM, EPAM Systems')] == ['EPAM Systems', 'EPAM Systems']
+    assert [m['method'] for m in gazetteer.tag('Kharkiv')] == ['GAZETTEER']
+
+
+def test_lowercase_mentions_are_not_tagged(gazetteer):
+    assert gazetteer.tag('the united states of america and kharkiv') == []
+
+
+def test_from_file(tmp_path):
+    assert Gazetteer.from_file(str(tmp_path / 'missing.yaml')).tag('Kharkiv') == []
+
+    path = tmp_path / 'gazetteer.yaml'
+    path.write_text('Location Data:\n  - name: Lviv\n    aliases: [Львів, Lvov]\n', encoding='utf-8')
+    assert [m['word'] for m in Gazetteer.from_file(str(path)).tag('Lvov, Львів')] == ['Lviv', 'Lviv']
+
+
+def test_shipped_gazetteer_loads():
+    assert Gazetteer.from_file(Config.GAZETTEER_PATH).size > 0
@@ -0,0 +1,82 @@
+import pytest
+
+pytest.importorskip('transformers')
+
+from backend.data_processing import language_router
+from backend.data_processing.language_router import NerRouter, detect_language
+
+
+class FakePipeline:
+    """Records the batches it was called with and tags every text with the model name."""
+
+    def __init__(self, name, fail_batches=False):
+        self.name = name
+        self.fail_batches = fail_batches
+        self.calls = []
+
+    def __call__(self, texts, batch_size=None):
+        self.calls.append(texts)
+        if isinstance(texts, str):
+            return [{'word': self.name, 'text': texts}]
+        if self.fail_batches:
+            raise RuntimeError('batch too large')
+        return [[{'word': self.name, 'text': text}] for text in texts]
+
+
+@pytest.mark.parametrize('text, language', [
+    ('The company is based in the city of London and this is it', 'en'),
+    ('Андрій живе у Харкові і працює інженером', 'uk'),
+    ('Андрей живет в Москве и работает, ы', 'ru'),
+    ('Андрей Москва', 'other'),       # cyrillic, but nothing language specific
+    ('Der Mann ist in München', 'other'),
+    ('Mixed текст here і там', 'other'),
+    ('12345', 'other'),
+    ('', 'other'),
+])
+def test_detect_language(text, language):
+    assert detect_language(text) == language
+
+
+def test_routes_batches_per_language(monkeypatch):
+    loaded = {}
+    monkeypatch.setattr(language_router, 'pipeline', lambda task, model, **kwargs: loaded.setdefault(model, FakePipeline(model)))
+    fallback = FakePipeline('multilingual')
+    router = NerRouter(fallback, {'en': 'english-ner', 'uk': 'ukrainian-ner', 'ru': ''})
+
+    texts = [
+        'He said that the company is in the city of London',
+        'Андрій живе у Харкові і працює',
+        '',
+        'Андрей живет в Москве, ы',
+        'This is the office of the firm and it is open',
+    ]
+    results = router.run(texts)
+
+    assert [[entity['word'] for entity in entities] for entities in results] == [
+        ['english-ner'], ['ukrainian-ner'], [], ['multilingual'], ['english-ner']
+    ]
+    # one call per model, empty texts are not sent anywhere
+    assert loaded['english-ner'].calls == [[texts[0], texts[4]]]
+    assert loaded['ukrainian-ner'].calls == [[texts[1]]]
+    assert fallback.calls == [[texts[3]]]
+
+
+def test_unloadable_model_falls_back(monkeypatch):
+    def broken(task, model, **kwargs):
+        raise OSError('no such model')
+
+    monkeypatch.setattr(language_router, 'pipeline', broken)
+    fallback = FakePipeline('multilingual')
+    router = NerRouter(fallback, {'en': 'missing-ner'})
+
+    assert router.run(['The office of the firm is in the city'])[0][0]['word'] == 'multilingual'
+
+
+def test_failed_batch_is_retried_one_by_one():
+    fallback = FakePipeline('multilingual', fail_batches=True)
+    router = NerRouter(fallback)
+
+    results = router.run(['Kyiv', 'Lviv'])
+
+    assert [entities[0]['text'] for entities in results] == ['Kyiv', 'Lviv']
+    assert fallback.calls == [['Kyiv', 'Lviv'], 'Kyiv', 'Lviv']
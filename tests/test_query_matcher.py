@@ -0,0 +1,41 @@
+import pytest
+
+from backend.data_processing.query_matcher import QueryMatcher
+from backend.data_processing.transliteration import to_cyrillic, to_latin, variants
+
+
+def test_transliteration_round_trip():
+    assert to_latin('Андрій Мацевитий') == 'andrii matsevytyi'
+    assert to_latin('Юлія Їжак') == 'yuliia yizhak'  # word-initial forms
+    assert to_cyrillic('andrii matsevytyi') == 'андрій мацевитий'
+    assert variants('Андрій') == ['андрій', 'andrii']
+
+
+@pytest.mark.parametrize('query', ['Андрій Мацевитий', 'Andrii Matsevytyi'])
+@pytest.mark.parametrize('text', [
+    'Andrii',                   # substring of the romanized query
+    'Андрій',                   # substring of the cyrillic query
+    'Matsevytyi Andrii',        # rotation
+    'Мацевитий Андрій',
+    'Andriy Matsevytyi',        # other romanization, fuzzy
+    'Andrii Matsevitiy',        # typo, fuzzy
+])
+def test_query_variants_are_query_like(query, text):
+    assert QueryMatcher(query).is_query_like(text)
+
+
+@pytest.mark.parametrize('text', ['Харків', 'EPAM Systems', 'Anna Koval', 'Kyiv Polytechnic'])
+def test_other_entities_are_kept(text):
+    assert not QueryMatcher('Андрій Мацевитий').is_query_like(text)
+
+
+def test_mask_keeps_input_order():
+    matcher = QueryMatcher('Андрій Мацевитий')
+    assert matcher.query_like_mask(['Харків', 'Andrii', 'EPAM Systems', 'Matsevytyi']) == [False, True, False, True]
+    assert matcher.query_like_mask([]) == []
+
+
+def test_empty_query_matches_nothing():
+    matcher = QueryMatcher('')
+    assert not matcher
+    assert matcher.query_like_mask(['Andrii', 'Харків']) == [False, False]
@@ -0,0 +1,162 @@
+import threading
+import time
+
+import pytest
+
+from backend.utils.config import Config
+from backend.utils.cancellation import report_cancellations
+from backend.utils.report_jobs import ReportJobExecutor, ReportSingleFlight, report_progress
+
+
+class FakeRunner:
+    """Stands in for ReportService.run_report: records the start order and blocks until released."""
+
+    def __init__(self):
+        self.started = []
+        self._gates = {}
+        self._cond = threading.Condition()
+
+    def __call__(self, report_id, cancel_token=None):
+        with self._cond:
+            self.started.append(report_id)
+            self._cond.notify_all()
+        self._gate(report_id).wait(5)
+
+    def _gate(self, report_id):
+        with self._cond:
+            return self._gates.setdefault(report_id, threading.Event())
+
+    def release(self, *report_ids):
+        for report_id in report_ids:
+            self._gate(report_id).set()
+
+    def wait_started(self, count):
+        with self._cond:
+            assert self._cond.wait_for(lambda: len(self.started) >= count, 5), self.started
+            return list(self.started)
+
+
+@pytest.fixture
+def executor_for(app, monkeypatch):
+    monkeypatch.setattr(Config, 'REPORT_USER_CONCURRENCY', 1)
+    monkeypatch.setattr(Config, 'REPORT_USER_QUEUE_LIMIT', 5)
+    monkeypatch.setattr(Config, 'REPORT_ADMIN_WEIGHT', 4.0)
+    monkeypatch.setattr(Config, 'REPORT_ESTIMATED_SECONDS', 10)
+
+    def make(max_workers=1, queue_limit=20):
+        return ReportJobExecutor(app, max_workers=max_workers, queue_limit=queue_limit)
+    return make
+
+
+def test_weighted_fair_dispatch_order_and_etas(executor_for):
+    executor, runner = executor_for(), FakeRunner()
+    executor.submit('X1', 'x@example.com', runner, 'X1')
+    runner.wait_started(1)  # the only worker is busy, everything below queues
+
+    for report_id in ('A1', 'A2', 'A3', 'A4'):
+        executor.submit(report_id, 'a@example.com', runner, report_id)
+    executor.submit('B1', 'b@example.com', runner, 'B1')
+    executor.submit('C1', 'c@example.com', runner, 'C1')
+    executor.submit('D1', 'admin@example.com', runner, 'D1', admin=True)
+
+    positions = {report_id: executor.queue_position(report_id) for report_id in ('A1', 'A2', 'A3', 'A4', 'B1', 'C1', 'D1')}
+    estimated = sorted(positions, key=lambda report_id: positions[report_id]['position'])
+    # admin first, then one job per user before the heavy user's backlog
+    assert estimated == ['D1', 'A1', 'B1', 'C1', 'A2', 'A3', 'A4']
+    assert [positions[report_id]['eta_seconds'] for report_id in estimated] == [10, 20, 30, 40, 50, 60, 70]
+    assert report_progress.get('A4')['queue'] == positions['A4']
+
+    runner.release(*estimated, 'X1')
+    assert runner.wait_started(8)[1:] == estimated
+
+
+def test_user_concurrency_cap(executor_for):
+    executor, runner = executor_for(max_workers=2), FakeRunner()
+    executor.submit('A1', 'a@example.com', runner, 'A1')
+    executor.submit('A2', 'a@example.com', runner, 'A2')
+    executor.submit('B1', 'b@example.com', runner, 'B1')
+
+    assert sorted(runner.wait_started(2)) == ['A1', 'B1']  # a free worker does not take A2
+    assert executor.queue_position('A2') == {'position': 1, 'eta_seconds': 10}
+
+    runner.release('A1')
+    assert runner.wait_started(3)[2] == 'A2'
+    runner.release('A2', 'B1')
+
+
+def test_queue_limits(executor_for, monkeypatch):
+    monkeypatch.setattr(Config, 'REPORT_USER_QUEUE_LIMIT', 2)
+    executor, runner = executor_for(queue_limit=3), FakeRunner()
+    executor.submit('X1', 'x@example.com', runner, 'X1')
+    runner.wait_started(1)
+
+    executor.submit('A1', 'a@example.com', runner, 'A1')
+    executor.submit('A2', 'a@example.com', runner, 'A2')
+    with pytest.raises(RuntimeError, match='too many reports waiting'):
+        executor.submit('A3', 'a@example.com', runner, 'A3')
+
+    executor.submit('A3', 'a@example.com', runner, 'A3', admin=True)  # admins are not capped per user
+    with pytest.raises(RuntimeError, match='Too many reports'):
+        executor.submit('B1', 'b@example.com', runner, 'B1', admin=True)  # but the global limit holds
+
+    assert executor.pending == 4
+    runner.release('X1', 'A1', 'A2', 'A3')
+    runner.wait_started(4)
+
+
+def test_cancel_queued_job(executor_for):
+    executor, runner = executor_for(), FakeRunner()
+    executor.submit('X1', 'x@example.com', runner, 'X1')
+    runner.wait_started(1)
+    executor.submit('A1', 'a@example.com', runner, 'A1')
+    executor.submit('A2', 'a@example.com', runner, 'A2')
+
+    assert executor.cancel('A1') == 'queued'
+    assert report_progress.get('A1')['stage'] == 'cancelled'
+    assert executor.queue_position('A2') == {'position': 1, 'eta_seconds': 10}
+    assert executor.cancel('missing') is None
+
+    runner.release('X1', 'A2')
+    assert runner.wait_started(2) == ['X1', 'A2']
+
+
+def wait_for_stage(report_id, stages=('completed', 'failed', 'cancelled')):
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        entry = report_progress.get(report_id)
+        if entry and entry['stage'] in stages:
+            return entry['stage']
+        time.sleep(0.01)
+    return report_progress.get(report_id)['stage']
+
+
+def test_cancelled_running_job_is_marked_cancelled_not_failed(executor_for, monkeypatch):
+    executor = executor_for()
+    flights = ReportSingleFlight(window_seconds=60)
+    monkeypatch.setattr(executor, 'single_flight', flights)
+    key = flights.key('a@example.com', 'Jane Doe', True, False)
+    started = threading.Event()
+
+    def pipeline(report_id, cancel_token=None):
+        started.set()
+        for _ in range(50):
+            cancel_token.wait(0.1)
+
+    assert flights.join(key, lambda: 'A1') == ('A1', True)
+    executor.submit('A1', 'a@example.com', pipeline, 'A1')
+    assert started.wait(5)
+
+    assert executor.cancel('A1') == 'running'
+    assert wait_for_stage('A1') == 'cancelled'
+    assert report_cancellations.get('A1') is None
+    assert flights.join(key, lambda: 'A2') == ('A2', True)  # a cancelled report is not reused
+
+
+def test_failing_job_is_marked_failed(executor_for):
+    executor = executor_for()
+
+    def pipeline(report_id, cancel_token=None):
+        raise RuntimeError('scraper crashed')
+
+    executor.submit('A1', 'a@example.com', pipeline, 'A1')
+    assert wait_for_stage('A1') == 'failed'
@@ -0,0 +1,240 @@
+import threading
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.models import db, Report, ReportJob
+from backend.utils.config import Config
+from backend.utils.cancellation import ReportCancelled
+from backend.utils.report_queue import ReportJobQueue, ReportWorker
+
+
+@pytest.fixture
+def queue(app, monkeypatch):
+    monkeypatch.setattr(Config, 'REPORT_QUEUE_LIMIT', 20)
+    monkeypatch.setattr(Config, 'REPORT_USER_QUEUE_LIMIT', 5)
+    monkeypatch.setattr(Config, 'REPORT_USER_CONCURRENCY', 1)
+    monkeypatch.setattr(Config, 'REPORT_JOB_MAX_ATTEMPTS', 3)
+    monkeypatch.setattr(Config, 'REPORT_JOB_LEASE_SECONDS', 120)
+    monkeypatch.setattr(Config, 'REPORT_JOB_BACKOFF_SECONDS', 30)
+    monkeypatch.setattr(Config, 'REPORT_JOB_BACKOFF_MAX_SECONDS', 600)
+    return ReportJobQueue(db)
+
+
+def job_of(report_id):
+    db.session.expire_all()
+    return db.session.query(ReportJob).filter_by(report_id=report_id).one()
+
+
+def report_status(report_id):
+    db.session.expire_all()
+    return db.session.query(Report.status).filter_by(report_id=report_id).scalar()
+
+
+def make_available(report_id):
+    """Skips the retry backoff."""
+    db.session.query(ReportJob).filter_by(report_id=report_id)\
+        .update({'available_at': datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False)
+    db.session.commit()
+
+
+def test_claim_is_exclusive(app, queue, make_report):
+    queue.enqueue(make_report('R1'), 'user@example.com')
+
+    claims = []
+
+    def claim(worker_id):
+        with app.app_context():
+            job = ReportJobQueue(db).claim(worker_id)
+            claims.append(job and (job.report_id, worker_id))
+
+    threads = [threading.Thread(target=claim, args=(f'w{i}',)) for i in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    won = [claim for claim in claims if claim]
+    assert len(won) == 1
+    job = job_of('R1')
+    assert (job.status, job.attempts, job.lease_owner) == ('running', 1, won[0][1])
+    assert queue.claim('late') is None
+
+
+def test_claim_respects_per_user_concurrency(queue, make_report):
+    queue.enqueue(make_report('A1', 'a@example.com'), 'a@example.com')
+    queue.enqueue(make_report('A2', 'a@example.com'), 'a@example.com')
+    queue.enqueue(make_report('B1', 'b@example.com'), 'b@example.com')
+
+    assert queue.claim('w1').report_id == 'A1'
+    assert queue.claim('w2').report_id == 'B1'  # A2 waits while A1 runs
+    assert queue.claim('w3') is None
+
+    queue.complete(job_of('A1').id, 'w1')
+    assert queue.claim('w3').report_id == 'A2'
+
+
+def test_enqueue_rejects_full_user_queue(queue, make_report, monkeypatch):
+    monkeypatch.setattr(Config, 'REPORT_USER_QUEUE_LIMIT', 1)
+    queue.enqueue(make_report('R1'), 'user@example.com')
+
+    with pytest.raises(RuntimeError):
+        queue.enqueue(make_report('R2'), 'user@example.com')
+    queue.enqueue(make_report('R3'), 'user@example.com', admin=True)  # admins are not capped
+
+
+def test_fail_retries_with_exponential_backoff(queue, make_report, monkeypatch):
+    monkeypatch.setattr('backend.utils.report_queue.random.uniform', lambda low, high: high)
+    queue.enqueue(make_report('R1'), 'user@example.com')
+
+    delays = []
+    for attempt in (1, 2):
+        job = queue.claim('w1')
+        before = datetime.utcnow()
+        assert queue.fail(job.id, 'w1', RuntimeError('boom')) is True
+
+        job = job_of('R1')
+        assert (job.status, job.attempts, job.lease_owner) == ('queued', attempt, None)
+        assert job.last_error == 'boom'
+        assert report_status('R1') == 'processing'
+        assert queue.claim('w1') is None  # still backing off
+        delays.append((job.available_at - before).total_seconds())
+        make_available('R1')
+
+    assert delays[0] == pytest.approx(30, abs=1)
+    assert delays[1] == pytest.approx(60, abs=1)
+
+
+def test_gives_up_after_max_attempts(queue, make_report, monkeypatch):
+    monkeypatch.setattr(Config, 'REPORT_JOB_MAX_ATTEMPTS', 2)
+    queue.enqueue(make_report('R1'), 'user@example.com')
+
+    job = queue.claim('w1')
+    assert queue.fail(job.id, 'w1', RuntimeError('first')) is True
+    make_available('R1')
+
+    job = queue.claim('w1')
+    assert job.attempts == 2
+    assert queue.fail(job.id, 'w1', RuntimeError('second')) is False
+
+    job = job_of('R1')
+    assert (job.status, job.last_error) == ('failed', 'second')
+    assert job.finished_at is not None
+    assert report_status('R1') == 'failed'
+    assert queue.claim('w1') is None
+
+
+def test_expired_lease_is_reclaimed(queue, make_report):
+    queue.enqueue(make_report('R1'), 'user@example.com')
+    job_id = queue.claim('dead').id
+    assert queue.claim('w2') is None  # lease still valid
+
+    db.session.query(ReportJob).filter_by(id=job_id)\
+        .update({'lease_expires_at': datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False)
+    db.session.commit()
+
+    job = queue.claim('w2')
+    assert (job.id, job.attempts, job.lease_owner) == (job_id, 2, 'w2')
+
+    # the old owner can neither extend nor settle the job any more
+    with db.engine.begin() as connection:
+        assert queue.heartbeat(connection, job_id, 'dead') is False
+    assert queue.fail(job_id, 'dead', RuntimeError('late')) is False
+    assert queue.reclaimed(job_id, 'dead', 'R1') is True
+    assert queue.reclaimed(job_id, 'w2', 'R1') is False
+    assert job_of('R1').status == 'running'
+
+
+def test_expired_lease_on_last_attempt_gives_up(queue, make_report, monkeypatch):
+    monkeypatch.setattr(Config, 'REPORT_JOB_MAX_ATTEMPTS', 1)
+    queue.enqueue(make_report('R1'), 'user@example.com')
+    job_id = queue.claim('dead').id
+
+    db.session.query(ReportJob).filter_by(id=job_id)\
+        .update({'lease_expires_at': datetime.utcnow() - timedelta(seconds=1)}, synchronize_session=False)
+    db.session.commit()
+
+    assert queue.claim('w2') is None
+    assert job_of('R1').status == 'failed'
+    assert report_status('R1') == 'failed'
+
+
+def test_cancel_queued_job_and_requeue(queue, make_report):
+    queue.enqueue(make_report('R1'), 'user@example.com')
+
+    assert queue.cancel('R1') == 'queued'
+    assert job_of('R1').status == 'cancelled'
+    assert report_status('R1') == 'cancelled'
+    assert queue.claim('w1') is None
+    assert queue.cancel('R1') is None
+
+    assert queue.requeue('R1') is True
+    job = job_of('R1')
+    assert (job.status, job.attempts, job.cancel_requested) == ('queued', 0, False)
+    assert queue.claim('w1').report_id == 'R1'
+    assert queue.requeue('R1') is False  # running jobs are not requeued
+
+
+def test_cancel_running_job_is_requested_from_the_worker(queue, make_report):
+    queue.enqueue(make_report('R1'), 'user@example.com')
+    job_id = queue.claim('w1').id
+
+    assert queue.cancel('R1') == 'running'
+    with db.engine.begin() as connection:
+        assert queue.cancel_requested(connection, job_id) is True
+
+    queue.cancelled(job_id, 'w1', 'R1')
+    assert job_of('R1').status == 'cancelled'
+    assert report_status('R1') == 'cancelled'
+
+    assert queue.requeue('R1') is True
+    assert job_of('R1').cancel_requested is False
+
+
+def test_active_report_matches_queued_and_running_jobs(queue, make_report):
+    queue.enqueue(make_report('R1', query='Jane Doe'), 'user@example.com')
+
+    assert queue.active_report('user@example.com', '  jane   DOE ', True, False) == 'R1'
+    assert queue.active_report('user@example.com', 'Jane Doe', True, True) is None
+    assert queue.active_report('other@example.com', 'Jane Doe', True, False) is None
+
+    queue.cancel('R1')
+    assert queue.active_report('user@example.com', 'Jane Doe', True, False) is None
+
+
+class _StolenLeaseReportService:
+    """Another worker takes the job over while the pipeline runs."""
+
+    def __init__(self, app):
+        self.app = app
+
+    def run_report(self, report_id, query, fb_cookies, use_facebook, use_general, cancel_token):
+        with self.app.app_context():
+            db.session.query(ReportJob).update({'lease_owner': 'other'}, synchronize_session=False)
+            db.session.commit()
+        try:
+            cancel_token.wait(10)
+        except ReportCancelled:
+            with self.app.app_context():
+                # what ReportService.mark_cancelled does on the way out
+                db.session.query(Report).update({'status': 'cancelled'}, synchronize_session=False)
+                db.session.commit()
+            raise
+
+
+class _NoCookies:
+    def get_cookies(self, user_email):
+        return None
+
+
+def test_worker_stops_when_its_lease_is_lost(app, queue, make_report, monkeypatch):
+    monkeypatch.setattr(Config, 'REPORT_JOB_HEARTBEAT_SECONDS', 0.1)
+    monkeypatch.setattr(Config, 'REPORT_CANCEL_POLL_SECONDS', 0.1)
+    queue.enqueue(make_report('R1'), 'user@example.com')
+
+    worker = ReportWorker(app, db, _StolenLeaseReportService(app), _NoCookies(), worker_id='w1')
+    assert worker.run_once() is True
+
+    job = job_of('R1')
+    assert (job.status, job.lease_owner) == ('running', 'other')
+    assert report_status('R1') == 'processing'
@@ -0,0 +1,159 @@
+import math
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import insert, literal, select
+
+from backend.models import db, InformationPiece, InformationCategory, DiscoverSource, Report, ContentCorroboration
+from backend.engines.risk_assessment_engine import RiskAssessmentEngine
+from backend.utils.config import Config
+from backend.utils.corroboration import record_occurrences, backfill_corroboration
+
+# (report, query, content, category, days ago, relevance, snippet)
+CORPUS = [
+    ('R1', 'Jane Doe', 'Acme Corp', 'Professional Details', 3, 0.9, 'Jane Doe, CEO at Acme Corp'),
+    ('R1', 'Jane Doe', 'jane@example.com', 'Contact Information', 45, None, 'found in a leaked password dump'),
+    ('R1', 'Jane Doe', 'Kyiv', 'Location Data', 400, 0.2, ''),
+    ('R1', 'Jane Doe', 'Chess club', None, 10, 0.5, 'weekend chess club'),
+    ('R2', 'Jane Doe', 'Acme Corp', 'Professional Details', 100, 0.8, ''),
+    ('R2', 'Jane Doe', 'Kyiv', 'Location Data', 20, 0.4, ''),
+    ('R3', 'John Roe', 'Acme Corp', 'Professional Details', 1, 0.7, ''),
+    ('R3', 'John Roe', 'jane@example.com', 'Contact Information', 5, 0.6, ''),
+    ('R3', 'John Roe', 'Kyiv', 'Location Data', 2, 0.6, ''),
+]
+
+
+@pytest.fixture
+def risk_engine(app, make_report, monkeypatch):
+    """Engine over a few stored reports; pieces and the corroboration summary are written as the pipeline does."""
+    monkeypatch.setattr(Config, 'RISK_VALIDATION_MODE', 'exact')
+    source = DiscoverSource(name='Web Data')
+    db.session.add(source)
+    categories = {}
+    for name in {row[3] for row in CORPUS if row[3]}:
+        categories[name] = InformationCategory(name=name, weight=0.5)
+        db.session.add(categories[name])
+    db.session.flush()
+
+    for report_id, query in dict.fromkeys(row[:2] for row in CORPUS):
+        make_report(report_id, query=query)
+
+    now = datetime.utcnow()
+    for report_id, query, content, category, days_ago, relevance, snippet in CORPUS:
+        created_at = now - timedelta(days=days_ago, hours=6)
+        db.session.add(InformationPiece(
+            report_id=report_id, source_id=source.id, category_id=category and categories[category].id,
+            source='https://example.com', content=content, snippet=snippet, relevance_score=relevance,
+            created_at=created_at
+        ))
+        record_occurrences(db, [(content, query, created_at)])
+        db.session.commit()
+
+    return RiskAssessmentEngine(db)
+
+
+def pieces_of(report_id):
+    return db.session.query(InformationPiece).filter_by(report_id=report_id).order_by(InformationPiece.id).all()
+
+
+@pytest.mark.parametrize('report_id, query', [('R1', 'Jane Doe'), ('R3', 'John Roe')])
+def test_summary_and_pieces_sources_agree(risk_engine, monkeypatch, report_id, query):
+    pieces = pieces_of(report_id)
+
+    counts, earliest = risk_engine._summary_lookup(pieces, query)
+    assert counts == risk_engine._corroboration_counts(pieces, query)
+    assert earliest == risk_engine._earliest_occurrences(pieces, query)
+    assert earliest == risk_engine._summary_earliest(pieces, query)
+
+    scores = {}
+    for source in ('summary', 'pieces'):
+        monkeypatch.setattr(Config, 'RISK_CORROBORATION_SOURCE', source)
+        scores[source] = risk_engine.score(pieces, query)[0].tolist()
+    assert scores['summary'] == pytest.approx(scores['pieces'])
+
+
+def test_corroboration_counts_per_query(risk_engine):
+    pieces = pieces_of('R1')
+    counts, _ = risk_engine._summary_lookup(pieces, 'Jane Doe')
+
+    by_content = {piece.content: counts.get(piece.content_hash) for piece in pieces}
+    assert by_content == {
+        'Acme Corp': (2, 1), 'jane@example.com': (1, 1), 'Kyiv': (2, 1), 'Chess club': (1, 0)
+    }
+
+
+def clone_report(report_id, clone_id):
+    """What ReportService._clone_report stores: a cached_from report and a copy of every piece column."""
+    source = db.session.query(Report).filter_by(report_id=report_id).one()
+    db.session.add(Report(report_id=clone_id, user_id=source.user_id, user_query=source.user_query,
+                          status='completed', query_key=source.query_key, cached_from=report_id))
+    db.session.flush()
+    pieces = InformationPiece.__table__
+    columns = [c for c in pieces.columns if c.name not in ('id', 'report_id')]
+    db.session.execute(insert(pieces).from_select(
+        ['report_id'] + [c.name for c in columns],
+        select(literal(clone_id), *columns).where(pieces.c.report_id == report_id)
+    ))
+    db.session.commit()
+
+
+def test_cached_copies_are_not_counted_twice(risk_engine, monkeypatch):
+    pieces = pieces_of('R1')
+
+    def lookups():
+        scores = {}
+        for source in ('summary', 'pieces'):
+            monkeypatch.setattr(Config, 'RISK_CORROBORATION_SOURCE', source)
+            scores[source] = risk_engine.score(pieces, 'Jane Doe')[0].tolist()
+        return (risk_engine._corroboration_counts(pieces, 'Jane Doe'),
+                risk_engine._earliest_occurrences(pieces, 'Jane Doe'), scores)
+
+    before = lookups()
+    clone_report('R1', 'C1')
+    clone_report('R3', 'C3')  # other query: would add contradicting evidence
+
+    assert lookups() == before
+    assert risk_engine.score(pieces_of('C1'), 'Jane Doe')[0].tolist() == before[2]['pieces']
+
+    # the summary table rebuilt from the stored pieces skips the copies as well
+    db.session.query(ContentCorroboration).delete()
+    backfill_corroboration(db)
+    assert risk_engine._summary_lookup(pieces, 'Jane Doe') == before[:2]
+
+
+def baseline_score(content, category, relevance, snippet, query):
+    """The original per-piece model, computed straight from CORPUS (one piece at a time, no database)."""
+    text = (content + ' ' + snippet).lower()
+    s_word = 1.0 if any(word in text for word in RiskAssessmentEngine.RISK_KEYWORDS) else 0.0
+    s_relevance = (1 - Config.RISK_ALPHA) * s_word + Config.RISK_ALPHA * (0.5 if relevance is None else relevance)
+
+    same_content = [row for row in CORPUS if row[2] == content]
+    supporting = sum(row[1] == query for row in same_content) + 1
+    contradicting = sum(row[1] != query for row in same_content)
+    s_validation = supporting / (supporting + contradicting + RiskAssessmentEngine.EPSILON)
+
+    # months = whole days since the earliest occurrence for this query / 30
+    days = max(row[4] for row in same_content if row[1] == query)
+    s_recency = math.exp(-Config.RISK_LAMBDA_DECAY * days / 30.0)
+
+    impact = Config.RISK_IMPACT_SCORES.get(category or 'Uncategorized', 0.5)
+    return max(0.1, min(impact * (s_relevance + s_validation + s_recency) / 3.0 * 10.0, 10.0))
+
+
+@pytest.mark.parametrize('source', ['summary', 'pieces'])
+def test_score_matches_the_baseline_formula(risk_engine, monkeypatch, source):
+    monkeypatch.setattr(Config, 'RISK_CORROBORATION_SOURCE', source)
+    pieces = pieces_of('R1')
+
+    scores, levels = risk_engine.score(pieces, 'Jane Doe')
+
+    expected = [baseline_score(*row[2:4], row[5], row[6], 'Jane Doe') for row in CORPUS if row[0] == 'R1']
+    assert scores.tolist() == pytest.approx(expected)
+    assert levels.tolist() == ['high' if s >= 7 else 'medium' if s >= 4 else 'low' for s in expected]
+
+
+def test_summarize_report_risk():
+    overall, counts = RiskAssessmentEngine.summarize_report_risk([9.0, 7.5, None, 5.0, 4.0, 2.0, 1.0])
+    assert overall == pytest.approx((9.0 + 7.5) / 2)  # mean of the top 20%, rounded up to 2 of 6
+    assert counts == {'high': 2, 'medium': 2, 'low': 2}
+    assert RiskAssessmentEngine.summarize_report_risk([]) == (0.0, {'high': 0, 'medium': 0, 'low': 0})
@@ -0,0 +1,85 @@
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from backend.models import db, InformationPiece, InformationCategory, DiscoverSource, Report
+from backend.utils.report_summary import generate_recommendations
+from backend.utils.risk_rescoring import RiskRescoringJob
+
+
+@pytest.fixture
+def reports(app, make_report):
+    source = DiscoverSource(name='Social Media')
+    category = InformationCategory(name='Contact Information', weight=0.5)
+    db.session.add_all([source, category])
+    db.session.flush()
+
+    report_ids = ['R1', 'R2', 'R3', 'R4']
+    for i, report_id in enumerate(report_ids):
+        make_report(report_id, query=f'Person {i % 2}')
+        report = db.session.query(Report).filter_by(report_id=report_id).one()
+        report.status = 'completed'
+        report.overall_risk_score = 0.0
+        report.executive_summary = 'stale'
+        report.recommendations = json.dumps(['stale'])
+        report.source_distribution = json.dumps({'Social Media': 6})
+        for j in range(3):
+            db.session.add(InformationPiece(
+                report_id=report_id, source_id=source.id, category_id=category.id, source='Social Media',
+                content=f'leaked password {j}', snippet='', relevance_score=0.9,
+                created_at=datetime.utcnow() - timedelta(days=j)
+            ))
+    db.session.commit()
+    return report_ids
+
+
+def stored(report_id):
+    db.session.expire_all()
+    return db.session.query(Report).filter_by(report_id=report_id).one()
+
+
+def test_summary_and_recommendations_follow_the_new_scores(reports, tmp_path):
+    RiskRescoringJob(db, state_path=str(tmp_path / 'state.json')).run(batch_size=2, commit_every=1)
+
+    for report_id in reports:
+        report = stored(report_id)
+        risk_counts = json.loads(report.risk_distribution)
+        assert report.overall_risk_score > 0
+        assert sum(risk_counts.values()) == 3
+        assert f'(score: {report.overall_risk_score:.2f}/10)' in report.executive_summary
+        assert f"'{report.user_query}' reveals 3 information pieces" in report.executive_summary
+        assert json.loads(report.recommendations) == generate_recommendations(risk_counts, {'Social Media': 6})
+
+
+def test_resumed_run_skips_committed_reports(reports, tmp_path, monkeypatch):
+    state_path = str(tmp_path / 'state.json')
+    score_report = RiskRescoringJob._score_report
+    scored = []
+
+    def interrupted(self, report_id, *args):
+        if report_id == 'R3':
+            raise KeyboardInterrupt
+        scored.append(report_id)
+        return score_report(self, report_id, *args)
+
+    monkeypatch.setattr(RiskRescoringJob, '_score_report', interrupted)
+    with pytest.raises(KeyboardInterrupt):
+        RiskRescoringJob(db, state_path=state_path).run(batch_size=2, commit_every=1)
+
+    assert scored == ['R1', 'R2']
+    assert [stored(report_id).executive_summary == 'stale' for report_id in reports] == [False, False, True, True]
+    with open(state_path) as f:
+        assert json.load(f)['last_report_id'] == 'R2'
+
+    def resumed(self, report_id, *args):
+        scored.append(report_id)
+        return score_report(self, report_id, *args)
+
+    monkeypatch.setattr(RiskRescoringJob, '_score_report', resumed)
+    scored.clear()
+    state = RiskRescoringJob(db, state_path=state_path).run(batch_size=2, commit_every=1)
+
+    assert scored == ['R3', 'R4']
+    assert (state['reports'], state['pieces'], state['last_report_id']) == (4, 12, 'R4')
+    assert not [report_id for report_id in reports if stored(report_id).executive_summary == 'stale']
@@ -0,0 +1,49 @@
+import re
+
+import pytest
+
+from backend.utils.safe_regex import RegexBudget, SafePattern
+
+UKRAINIAN_SAMPLES = [
+    'Заплатив 500 грн за консультацію, або 20 євро.',
+    'Гривня не грнівка; ціна 1200грн',
+    'Паспорт: passport АВ123456, ID: 778899',
+    'Пишіть @андрій_м або @andrii_m у телеграм',
+    'Номер ٣٤٥ і №12 – не ASCII цифри',
+]
+
+
+@pytest.mark.parametrize('pattern', [r'\bгрн\b', r'\d+', r'passport[:\s]*\w+\d+', r' @\S+', r'\W+\d'])
+def test_unicode_classes_match_like_re(regex_backend, pattern):
+    safe = SafePattern(pattern)
+    assert safe.engine != 're2'
+    for text in UKRAINIAN_SAMPLES:
+        assert safe.findall(text) == re.findall(pattern, text)
+
+
+def test_ascii_only_pattern_uses_the_best_engine(regex_backend):
+    safe = SafePattern(r'[a-z]+@[a-z]+\.(?:com|ua)', re.IGNORECASE)
+    assert safe.engine == regex_backend
+    assert safe.findall('Пошта: Andrii@Example.com, андрій@пошта.ua') == ['Andrii@Example.com']
+
+
+def test_text_is_clipped_to_the_size_cap(regex_backend):
+    budget = RegexBudget(max_chars=10)
+    assert SafePattern(r'\d+').findall('12345 6789 101112', budget) == ['12345', '6789']
+
+
+def test_exhausted_budget_matches_nothing(regex_backend):
+    budget = RegexBudget(time_limit=0)
+    assert SafePattern(r'\d+').findall('12345', budget) == []
+    assert SafePattern(r'\d+').search('12345', budget) is None
+    assert budget.exhausted
+
+
+def test_regex_timeout_exhausts_the_budget(regex_backend):
+    if regex_backend != 'regex':
+        pytest.skip('only the regex package can stop a running match')
+    budget = RegexBudget(time_limit=0.2)
+
+    assert SafePattern(r'(a|aa)+$').search('a' * 40 + '!', budget) is None
+    assert budget.exhausted
+    assert SafePattern(r'a').findall('aaa', budget) == []  # later patterns on the same text are skipped
@@ -0,0 +1,43 @@
+from backend.data_processing.query_matcher import QueryMatcher
+from backend.data_processing.sentence_filter import SentenceFilter
+
+PAGE = 'Погода гарна. Сьогодні конференція. Виступав Мацевитого Андрія колега. Потім обід. Далі вечеря. Кінець.'
+
+
+def test_keeps_the_mention_and_its_window():
+    sentence_filter = SentenceFilter(QueryMatcher('Андрій Мацевитий'), window=1)
+    # inflected form ('Мацевитого Андрія') matches through the token prefixes
+    assert sentence_filter.filter(PAGE) == 'Сьогодні конференція. Виступав Мацевитого Андрія колега. Потім обід.'
+
+
+def test_window_zero_keeps_only_the_mention():
+    sentence_filter = SentenceFilter(QueryMatcher('Андрій Мацевитий'), window=0)
+    assert sentence_filter.filter(PAGE) == 'Виступав Мацевитого Андрія колега.'
+
+
+def test_romanized_mentions_match_a_cyrillic_query():
+    sentence_filter = SentenceFilter(QueryMatcher('Андрій Мацевитий'), window=1)
+    text = 'Intro. Menu. Talk by Andrii Matsevytyi today! Then lunch. Later coffee.'
+    assert sentence_filter.filter(text) == 'Menu. Talk by Andrii Matsevytyi today! Then lunch.'
+
+
+def test_page_without_a_mention_is_dropped():
+    sentence_filter = SentenceFilter(QueryMatcher('Андрій Мацевитий'))
+    assert sentence_filter.filter('Nothing about the person here. Or here.') == ''
+
+
+def test_stats_count_kept_sentences():
+    sentence_filter = SentenceFilter(QueryMatcher('Андрій Мацевитий'), window=1)
+    sentence_filter.filter(PAGE)
+    sentence_filter.filter('Nothing here. At all.')
+
+    stats = sentence_filter.stats
+    assert (stats.entries, stats.sentences_total, stats.sentences_kept) == (2, 8, 3)
+    assert stats.chars_total == len(PAGE) + len('Nothing here. At all.')
+    assert str(stats).startswith('kept 3/8 sentences')
+
+
+def test_short_queries_disable_the_filter():
+    sentence_filter = SentenceFilter(QueryMatcher('Li'))
+    assert not sentence_filter
+    assert sentence_filter.filter(PAGE) == PAGE
@@ -0,0 +1,153 @@
+import os
+import threading
+import time
+import uuid
+
+import pytest
+
+from backend.utils.config import Config
+from backend.utils.report_jobs import ReportSingleFlight
+
+
+def starter(report_ids, delay=0.0):
+    """start() for join(): creates the next report id after `delay` (while other callers arrive)."""
+    started = []
+
+    def start():
+        time.sleep(delay)
+        started.append(report_ids[len(started)])
+        return started[-1]
+    return start, started
+
+
+def join_concurrently(flights, key, start, callers=4):
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flights.join(key, start))) for _ in range(callers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_concurrent_identical_requests_share_one_report():
+    flights = ReportSingleFlight(window_seconds=60)
+    start, started = starter(['R1', 'R2'], delay=0.2)
+
+    results = join_concurrently(flights, flights.key('user@example.com', 'Jane Doe', True, False), start)
+
+    assert started == ['R1']
+    assert sorted(results) == [('R1', False), ('R1', False), ('R1', False), ('R1', True)]
+
+
+def test_key_normalizes_the_query_and_keeps_sources_apart():
+    key = ReportSingleFlight.key
+    assert key('user@example.com', '  jane   DOE ', True, False) == key('user@example.com', 'Jane Doe', True, False)
+    assert key('user@example.com', 'Jane Doe', True, True) != key('user@example.com', 'Jane Doe', True, False)
+    assert key('other@example.com', 'Jane Doe', True, False) != key('user@example.com', 'Jane Doe', True, False)
+
+
+def test_finished_report_is_reused_until_the_window_expires():
+    flights = ReportSingleFlight(window_seconds=0.2)
+    key = flights.key('user@example.com', 'Jane Doe', True, False)
+    start, started = starter(['R1', 'R2', 'R3'])
+
+    assert flights.join(key, start) == ('R1', True)
+    flights.finished('R1')
+    assert flights.join(key, start) == ('R1', False)
+    assert flights.join(key, start, reuse_finished=False) == ('R2', True)  # force refresh
+
+    flights.finished('R2')
+    time.sleep(0.3)
+    assert flights.join(key, start) == ('R3', True)
+
+
+def test_failed_and_forgotten_reports_are_not_joined():
+    flights = ReportSingleFlight(window_seconds=60)
+    key = flights.key('user@example.com', 'Jane Doe', True, False)
+    start, started = starter(['R1', 'R2', 'R3'])
+
+    flights.join(key, start)
+    flights.finished('R1', failed=True)
+    assert flights.join(key, start) == ('R2', True)
+
+    flights.forget('R2')
+    assert flights.join(key, start) == ('R3', True)
+
+
+def test_leader_failing_to_create_the_report_lets_the_others_start():
+    flights = ReportSingleFlight(window_seconds=60)
+    key = flights.key('user@example.com', 'Jane Doe', True, False)
+
+    def broken():
+        raise RuntimeError('database down')
+
+    with pytest.raises(RuntimeError):
+        flights.join(key, broken)
+    assert flights.join(key, lambda: 'R1') == ('R1', True)
+
+
+# ---------- /api/search through the Flask test client (needs the full application environment) ----------
+
+@pytest.fixture
+def api(monkeypatch):
+    if not os.environ.get('DB_HOST'):
+        pytest.skip('needs the configured PostgreSQL database (DB_* settings)')
+    for module in ('bcrypt', 'requests', 'flask_cors', 'flask_jwt_extended', 'bleach', 'transformers', 'crawl4ai'):
+        pytest.importorskip(module)
+
+    from flask_jwt_extended import create_access_token
+    from backend import app as api_module
+
+    monkeypatch.setattr(Config, 'REPORT_QUEUE_BACKEND', 'local')
+    monkeypatch.setattr(api_module.report_single_flight, 'window_seconds', 0.5)
+
+    started, submitted = [], []
+
+    def start_report(user_email, query, use_general, use_facebook):
+        time.sleep(0.3)  # the other request arrives while this one creates the report
+        started.append(f'test-{uuid.uuid4().hex[:12]}')
+        return started[-1]
+
+    monkeypatch.setattr(api_module.report_service, 'start_report', start_report)
+    monkeypatch.setattr(api_module.report_service, 'use_cached_report', lambda *args: None)
+    monkeypatch.setattr(api_module.fb_auth_service, 'get_cookies', lambda user_email: None)
+    monkeypatch.setattr(api_module.report_jobs, 'submit', lambda report_id, *args, **kwargs: submitted.append(report_id))
+
+    app, db, User = api_module.app, api_module.db, api_module.User
+    email = f'single-flight-{uuid.uuid4().hex[:8]}@example.com'
+    with app.app_context():
+        db.session.add(User(email=email, password_hash='x', is_deactivated=False))
+        db.session.commit()
+        headers = {'Authorization': f'Bearer {create_access_token(identity=email)}'}
+
+    def search():
+        return app.test_client().post('/api/search', json={'query': 'Jane Doe'}, headers=headers)
+
+    yield search, started, submitted, api_module.report_single_flight
+
+    with app.app_context():
+        db.session.query(User).filter_by(email=email).delete()
+        db.session.commit()
+
+
+def test_search_attaches_identical_requests(api):
+    search, started, submitted, flights = api
+    responses = []
+    threads = [threading.Thread(target=lambda: responses.append(search())) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [response.status_code for response in responses] == [202, 202]
+    assert {response.json['report_id'] for response in responses} == set(started)
+    assert sorted(bool(response.json.get('attached')) for response in responses) == [False, True]
+    assert submitted == started
+
+    # a finished report answers identical searches within the window only
+    flights.finished(started[0])
+    assert search().json['report_id'] == started[0]
+    time.sleep(0.6)
+    assert search().json['report_id'] != started[0]
+    assert len(started) == 2
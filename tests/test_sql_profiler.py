@@ -0,0 +1,67 @@
+import pytest
+from flask import Response, stream_with_context
+
+from backend.models import db, User
+from backend.utils.config import Config
+from backend.utils.sql_profiler import install_sql_profiler, profile_job, statement_shape
+
+
+@pytest.fixture
+def client(app, monkeypatch):
+    monkeypatch.setattr(Config, 'SQL_PROFILER_ENABLED', True)
+    monkeypatch.setattr(Config, 'SQL_QUERY_WARN_THRESHOLD', 50)
+    monkeypatch.setattr(Config, 'SQL_REPEAT_WARN_THRESHOLD', 5)
+
+    def lookup():
+        db.session.query(User).filter_by(email='user@example.com').first()
+
+    @app.route('/users')
+    def users():
+        for _ in range(6):  # N+1
+            lookup()
+        return {'ok': True}
+
+    @app.route('/events')
+    def events():
+        lookup()
+
+        def generate():
+            for i in range(6):  # polling while streaming
+                lookup()
+                yield f"data: {i}\n\n"
+        return Response(stream_with_context(generate()), mimetype='text/event-stream')
+
+    install_sql_profiler(app)
+    app.debug = True
+    return app.test_client()
+
+
+def test_repeated_queries_are_reported(client, capsys):
+    response = client.get('/users')
+
+    assert response.headers['X-DB-Query-Count'] == '6'
+    assert '[SQL] WARNING GET /users: 6 queries' in capsys.readouterr().out
+
+
+def test_streamed_responses_only_profile_the_view(client, capsys):
+    response = client.get('/events')
+
+    assert response.headers['X-DB-Query-Count'] == '1'
+    assert response.get_data(as_text=True).count('data:') == 6
+    assert '[SQL] WARNING' not in capsys.readouterr().out
+
+    # profiling is back for the next request
+    client.get('/users')
+    assert '[SQL] WARNING GET /users' in capsys.readouterr().out
+
+
+def test_profile_job_counts_statement_shapes(app, monkeypatch):
+    monkeypatch.setattr(Config, 'SQL_PROFILER_ENABLED', True)
+    with profile_job('job') as profile:
+        for i in range(3):
+            db.session.query(User).filter(User.id.in_([i, i + 1])).all()
+
+    assert profile.count == 3
+    assert [count for _, count, _, _ in profile.repeated(3)] == [3]
+    assert statement_shape("SELECT a FROM t WHERE x = 'abc' AND y IN (?, ?, ?) AND z = 12") == \
+        'SELECT a FROM t WHERE x = ? AND y IN (...) AND z = ?'